@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Batch cohort report generation.
+
+Reads a CSV or JSON file of clients and writes one PDF report per client
+using a process pool. A failing client is reported and skipped without
+stopping the batch.
+
+JSON input is a list of client objects (or {"clients": [...]})::
+
+    {"client_name": "Jane Doe", "unit": "mph",
+     "ramp": [{"Speed": 2.0, "RPE": 1}, ...],          # or ["2.0:1", ...]
+     "wingate_speeds": [9.0, 9.5, 9.2, 8.8, 8.5, 8.0],  # optional
+     "trainings": [{"training_type": "endurance", "duration": 30}],
+     "threshold_method": "piecewise"}                   # optional, default "band"
+
+CSV input has one row per client with the columns client_name, unit,
+ramp ("2.0:1;2.5:2;..."), wingate_speeds ("9;9.5;...", optional),
+trainings ("endurance:30;explosive:10") and threshold_method (optional).
+
+Usage:
+    python -m cardio_app.batch_reports clients.csv -o reports --workers 4
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from cardio_app.logic.data_collection import collect_wingate_data
+from cardio_app.logic.thresholds import check_method
+from cardio_app.webapp.report_service import render_report, report_filename
+
+
+def _split(text):
+    return [part for part in re.split(r"[;\s]+", text or "") if part]
+
+
+def _parse_ramp(ramp):
+    """Accept records, a {"Speed": [...], "RPE": [...]} dict, or "speed:rpe" strings"""
+    if isinstance(ramp, str):
+        ramp = _split(ramp)
+    if isinstance(ramp, dict):
+        ramp = [{"Speed": s, "RPE": r} for s, r in zip(ramp["Speed"], ramp["RPE"])]
+    records = []
+    for item in ramp or []:
+        if isinstance(item, str):
+            speed, rpe = item.split(":")
+        else:
+            speed, rpe = item["Speed"], item["RPE"]
+        records.append({"Speed": float(speed), "RPE": float(rpe)})
+    if not records:
+        raise ValueError("No ramp test data provided.")
+    return records
+
+
+def _parse_trainings(trainings):
+    if isinstance(trainings, str):
+        trainings = _split(trainings)
+    parsed = []
+    for item in trainings or []:
+        if isinstance(item, str):
+            training_type, duration = item.split(":")
+        else:
+            training_type, duration = item["training_type"], item["duration"]
+        parsed.append({"training_type": training_type.strip().lower(), "duration": int(duration)})
+    if not parsed:
+        raise ValueError("At least one training is required.")
+    return parsed
+
+
+def normalize_client(raw):
+    """Turn one CSV row / JSON object into render_report keyword arguments"""
+    unit = (raw.get("unit") or "mph").lower()
+    wingate = raw.get("wingate_speeds")
+    if isinstance(wingate, str):
+        wingate = [float(v) for v in re.split(r"[;,\s]+", wingate) if v]
+    wingate_data = None
+    if wingate:
+        wingate_data = collect_wingate_data(unit=unit, speed_inputs=[float(v) for v in wingate]).to_records(unit)
+
+    return {
+        "client_name": (raw.get("client_name") or "client").strip(),
+        "unit": unit,
+        "ramp_data": _parse_ramp(raw.get("ramp")),
+        "wingate_data": wingate_data,
+        "trainings": _parse_trainings(raw.get("trainings")),
+        "threshold_method": check_method(raw.get("threshold_method")),
+    }
+
+
+def load_clients(path):
+    """Load raw client records from a .csv or .json file"""
+    if path.lower().endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data["clients"] if isinstance(data, dict) else data
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def _generate_client_report(raw, output_path):
+    """Worker: build one report and write it; never raises"""
+    name = raw.get("client_name") or "client"
+    start = time.perf_counter()
+    try:
+        client = normalize_client(raw)
+        pdf_bytes = render_report(**client)
+        with open(output_path, "wb") as f:
+            f.write(pdf_bytes)
+        return {"client_name": name, "path": output_path, "size": len(pdf_bytes),
+                "seconds": time.perf_counter() - start, "error": None}
+    except Exception as e:
+        return {"client_name": name, "path": None, "size": 0,
+                "seconds": time.perf_counter() - start, "error": f"{type(e).__name__}: {e}"}
+
+
+def _output_paths(clients, output_dir):
+    """One report path per client; repeated names get the first free numeric suffix"""
+    paths, seen = [], set()
+    for raw in clients:
+        base = report_filename(raw.get("client_name") or "client")
+        filename, count = base, 1
+        # Track final names: "Ann", "Ann" and "Ann 2" must not share Ann_2
+        while filename in seen:
+            count += 1
+            filename = base.replace("_cardio_report.pdf", f"_{count}_cardio_report.pdf")
+        seen.add(filename)
+        paths.append(os.path.join(output_dir, filename))
+    return paths
+
+
+def _print_progress(done, total, result):
+    state = "ok" if result["error"] is None else f"FAILED ({result['error']})"
+    print(f"[{done}/{total}] {result['client_name']}: {state}")
+
+
+def run_batch(clients, output_dir, workers=None, progress=_print_progress):
+    """
+    Generate a report for every client and return a summary dict with
+    per-client results, failures and throughput (reports/sec).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    paths = _output_paths(clients, output_dir)
+    total = len(clients)
+    results = []
+    start = time.perf_counter()
+
+    if workers == 1:
+        for raw, path in zip(clients, paths):
+            results.append(_generate_client_report(raw, path))
+            if progress:
+                progress(len(results), total, results[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(_generate_client_report, raw, path): raw
+                       for raw, path in zip(clients, paths)}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as e:  # worker process died
+                    result = {"client_name": futures[future].get("client_name") or "client",
+                              "path": None, "size": 0, "seconds": 0.0,
+                              "error": f"{type(e).__name__}: {e}"}
+                results.append(result)
+                if progress:
+                    progress(len(results), total, result)
+
+    elapsed = time.perf_counter() - start
+    failures = [r for r in results if r["error"] is not None]
+    succeeded = total - len(failures)
+    return {
+        "total": total,
+        "succeeded": succeeded,
+        "failed": len(failures),
+        "failures": failures,
+        "results": results,
+        "elapsed_sec": elapsed,
+        "reports_per_sec": succeeded / elapsed if elapsed > 0 else 0.0,
+        "bytes_written": sum(r["size"] for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate cardio reports for a cohort of clients.")
+    parser.add_argument("input", help="CSV or JSON file of clients")
+    parser.add_argument("-o", "--output-dir", default="reports", help="Directory for the PDF reports")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    clients = load_clients(args.input)
+    summary = run_batch(clients, args.output_dir, workers=args.workers,
+                        progress=None if args.quiet else _print_progress)
+
+    print(f"\n{summary['succeeded']}/{summary['total']} reports written to {args.output_dir} "
+          f"in {summary['elapsed_sec']:.1f}s ({summary['reports_per_sec']:.2f} reports/sec)")
+    for failure in summary["failures"]:
+        print(f"  FAILED {failure['client_name']}: {failure['error']}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the cardio pipeline (run each module with python -m)
+"""
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: calculate_metrics in a per-client loop vs calculate_cohort_metrics.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_cohort_metrics [--sizes 1000 10000 100000]
+        [--threshold-method band|linear|logistic|piecewise]
+
+The per-client loop is timed on at most --max-loop clients and scaled up
+linearly for larger cohorts (marked "extrapolated"), since running it on
+100k clients takes minutes.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from cardio_app.logic.cohort_metrics import calculate_cohort_metrics
+from cardio_app.logic.metrics import calculate_metrics
+from cardio_app.logic.thresholds import THRESHOLD_METHODS
+
+
+def make_cohort(n_clients, seed=0):
+    """Synthetic long-format ramp and Wingate frames for n_clients"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(8, 25, n_clients)
+    client_ids = np.repeat(np.arange(n_clients), lengths)
+    step = np.concatenate([np.arange(n) for n in lengths])
+    speed = 2.0 + 0.5 * step
+    rpe = np.minimum(10, np.round(step * 10 / (np.repeat(lengths, lengths) - 1) * 2) / 2)
+    ramp = pd.DataFrame({"client_id": client_ids, "Speed": speed, "RPE": rpe})
+
+    wing_ids = np.repeat(np.arange(n_clients), 6)
+    wing_speed = rng.uniform(6, 12, n_clients * 6).round(1)
+    wingate = pd.DataFrame({"client_id": wing_ids, "Speed": wing_speed})
+    return ramp, wingate
+
+
+def time_loop(ramp, wingate, n_clients, unit="mph", threshold_method="band"):
+    ramp_groups = dict(tuple(ramp.groupby("client_id")))
+    wing_groups = dict(tuple(wingate.groupby("client_id")))
+    start = time.perf_counter()
+    for client_id in range(n_clients):
+        calculate_metrics(ramp_groups[client_id][["Speed", "RPE"]],
+                          wing_groups[client_id][["Speed"]], unit, threshold_method)
+    return time.perf_counter() - start
+
+
+def run(sizes, max_loop, threshold_method="band"):
+    print(f"{'clients':>10} {'loop (s)':>14} {'cohort (s)':>12} {'speedup':>9}")
+    extrapolated = False
+    for n_clients in sizes:
+        ramp, wingate = make_cohort(n_clients)
+
+        start = time.perf_counter()
+        calculate_cohort_metrics(ramp, wingate, unit="mph", threshold_method=threshold_method)
+        cohort_sec = time.perf_counter() - start
+
+        loop_clients = min(n_clients, max_loop)
+        loop_sec = time_loop(ramp, wingate, loop_clients, threshold_method=threshold_method) * n_clients / loop_clients
+        note = "*" if loop_clients < n_clients else " "
+        extrapolated |= loop_clients < n_clients
+        print(f"{n_clients:>10} {loop_sec:>13.3f}{note} {cohort_sec:>12.3f} {loop_sec / cohort_sec:>8.0f}x")
+    if extrapolated:
+        print(f"* extrapolated from the first {max_loop} clients")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--max-loop", type=int, default=5000,
+                        help="Largest cohort timed with the per-client loop")
+    parser.add_argument("--threshold-method", choices=THRESHOLD_METHODS, default="band")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.max_loop, args.threshold_method)
+
+
+if __name__ == "__main__":
+    main()
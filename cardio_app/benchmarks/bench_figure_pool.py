@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: pooled vs fresh Matplotlib figures under sustained load.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_figure_pool [--renders 200] [--threads 1]
+
+Each thread renders a rotating mix of ramp plots, program plots, metrics
+tables and program tables (plot cache disabled) first with a fresh figure
+per render (pool size 0), then through the figure pool. Reports per-render
+p50/p95 latency, the traced allocation peak and how many garbage
+collections ran.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from cardio_app.benchmarks.bench_pipeline import _percentile, make_client
+from cardio_app.reports import plot_cache
+from cardio_app.reports.figure_pool import figure_pool
+from cardio_app.reports.pdf_tables import create_metrics_table_image, create_program_table_image
+from cardio_app.reports.pdf_visuals import create_program_speed_plot, create_ramp_test_plot
+
+
+def render_mix(client):
+    unit, metrics, ramp_df = client["unit"], client["metrics"], client["ramp_df"]
+    programs = list(client["programs"].values())
+    mix = [lambda: create_ramp_test_plot(ramp_df, metrics, unit=unit),
+           lambda: create_metrics_table_image(metrics)]
+    for program in programs:
+        mix.append(lambda p=program: create_program_speed_plot(p, unit=unit))
+        mix.append(lambda p=program: create_program_table_image(p, unit=unit))
+    return mix
+
+
+def _worker(mix, renders):
+    samples = []
+    for i in range(renders):
+        start = time.perf_counter()
+        mix[i % len(mix)]()
+        samples.append(time.perf_counter() - start)
+    figure_pool.clear()
+    return samples
+
+
+def run(mix, renders, threads, pool_size, trace=False):
+    figure_pool.max_idle = pool_size
+    _worker(mix, len(mix))  # warm-up: fonts, imports, one pass of figures
+    collections = sum(s["collections"] for s in gc.get_stats())
+    if trace:
+        tracemalloc.start()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(_worker, [mix] * threads, [renders] * threads))
+    peak = tracemalloc.get_traced_memory()[1] if trace else 0
+    if trace:
+        tracemalloc.stop()
+    samples = [s for worker in results for s in worker]
+    return {
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "peak_kb": peak / 1024,
+        "gc_runs": sum(s["collections"] for s in gc.get_stats()) - collections,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--renders", type=int, default=200, help="renders per thread")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    plot_cache.plot_cache.max_entries = 0
+    plot_cache.plot_cache.disk_dir = None
+    mix = render_mix(make_client(20, 2))
+
+    print(f"{'figures':<8} {'p50 ms':>8} {'p95 ms':>8} {'peak KB':>9} {'gc runs':>8}")
+    for label, pool_size in (("fresh", 0), ("pooled", args.pool_size)):
+        timing = run(mix, args.renders, args.threads, pool_size)
+        memory = run(mix, max(len(mix), args.renders // 10), args.threads, pool_size, trace=True)
+        print(f"{label:<8} {timing['p50_ms']:>8.2f} {timing['p95_ms']:>8.2f} "
+              f"{memory['peak_kb']:>9.0f} {timing['gc_runs']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
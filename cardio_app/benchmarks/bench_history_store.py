@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: history store writes and trend queries on a large test history.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_history_store [--tests 100000] [--per-athlete 8]
+        [--progress-tests 150]
+
+Fills a fresh SQLite file with --tests synthetic ramp tests (athletes
+retested --per-athlete times) through record_test, then times the queries
+the coaches run: the last five tests of one athlete, every athlete whose
+VO2max speed dropped more than 5%, and the columnar export. Finally one
+athlete gets --progress-tests tests and their progress report is timed:
+the metric work (HistoryStore.progress) and the whole PDF.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from cardio_app.benchmarks.bench_pipeline import _percentile, time_stage
+from cardio_app.logic.history_store import HistoryStore
+from cardio_app.logic.ramp_data import RampData
+from cardio_app.reports.pdf_report import PDFReportBuilder
+
+
+def fill(store, n_tests, per_athlete, seed=0):
+    rng = np.random.default_rng(seed)
+    n_athletes = max(1, n_tests // per_athlete)
+    tops = rng.uniform(7.0, 11.0, n_athletes)
+    start = time.perf_counter()
+    for i in range(n_tests):
+        athlete, visit = i % n_athletes, i // n_athletes
+        top = round(tops[athlete] * rng.uniform(0.9, 1.08), 1)
+        speeds = np.round(np.linspace(3.0, top, 12), 2).tolist()
+        rpe = np.floor(np.linspace(1, 10, 12)).tolist()
+        store.record_test(f"Athlete {athlete}", "mph", RampData(speeds, rpe), tested_at=visit * 35 * 86400.0)
+    return time.perf_counter() - start, n_athletes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tests", type=int, default=100000)
+    parser.add_argument("--per-athlete", type=int, default=8)
+    parser.add_argument("--progress-tests", type=int, default=150)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.db"))
+        fill_sec, n_athletes = fill(store, args.tests, args.per_athlete)
+        print(f"recorded {args.tests} tests for {n_athletes} athletes in {fill_sec:.1f} s "
+              f"({fill_sec / args.tests * 1e6:.0f} us per test)")
+
+        rng = np.random.default_rng(1)
+        names = [f"Athlete {i}" for i in rng.integers(0, n_athletes, args.iterations)]
+        samples = []
+        for name in names:
+            start = time.perf_counter()
+            store.last_tests(name, n=5)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{'last_tests(n=5)':<26} p50 {_percentile(samples, 50):>8.3f} ms  p95 {_percentile(samples, 95):>8.3f} ms")
+
+        drops = time_stage(lambda: store.vo2max_drops(0.05), max(1, args.iterations // 4))
+        print(f"{'vo2max_drops(5%)':<26} p50 {drops['p50_ms']:>8.1f} ms  "
+              f"({len(store.vo2max_drops(0.05))} athletes)")
+
+        export = time_stage(lambda: store.export(os.path.join(tmp, "history.npz")), 3)
+        print(f"{'export(.npz)':<26} p50 {export['p50_ms']:>8.1f} ms")
+
+        for visit in range(args.progress_tests):
+            speeds = [3.0, 5.0, 6.5, round(8.0 + 0.01 * visit, 2)]
+            store.record_test("Progress Athlete", "mph", RampData(speeds, [1, 4, 8, 10]),
+                              tested_at=visit * 28 * 86400.0)
+        progress = time_stage(lambda: store.progress("Progress Athlete"), args.iterations)
+        print(f"{'progress metrics':<26} p50 {progress['p50_ms']:>8.3f} ms  ({args.progress_tests} tests)")
+
+        def progress_report():
+            builder = PDFReportBuilder({}, {}, "Progress Athlete", report_mode="progress",
+                                       progress=store.progress("Progress Athlete"), plot_mode="vector")
+            builder.build_pdf()
+            return builder.save_pdf(in_memory=True)
+
+        report = time_stage(progress_report, max(1, args.iterations // 4))
+        print(f"{'progress report (vector)':<26} p50 {report['p50_ms']:>8.1f} ms")
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: web worker import time and first-request latency.
+
+Each measurement runs in a fresh interpreter. "eager" emulates the old
+behaviour by importing pandas, Matplotlib/pyplot and fpdf up front, the
+way cardio_app.webapp.routes used to through the reports package.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_import_time [--repeat 5]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+EAGER_IMPORTS = (
+    "import pandas, matplotlib; matplotlib.use('Agg'); "
+    "import matplotlib.pyplot, fpdf"
+)
+
+FIRST_REPORT = '''
+import time
+t0 = time.perf_counter()
+{preload}
+import cardio_app.webapp.routes
+from cardio_app.webapp.report_service import render_report
+t1 = time.perf_counter()
+{warmup}
+t2 = time.perf_counter()
+render_report("Bench", "mph", [{{"Speed": 2.0 + 0.5 * i, "RPE": r}} for i, r in enumerate(range(1, 11))],
+              None, [{{"training_type": "endurance", "duration": 20}}])
+t3 = time.perf_counter()
+print(t1 - t0, t2 - t1, t3 - t2)
+'''
+
+
+def _run(code):
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code],
+                         capture_output=True, text=True, check=True).stdout
+    return [float(v) for v in out.split()]
+
+
+def _median(samples, i):
+    return statistics.median(s[i] for s in samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the web worker")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    scenarios = {
+        "eager (before)": FIRST_REPORT.format(preload=EAGER_IMPORTS, warmup=""),
+        "lazy": FIRST_REPORT.format(preload="", warmup=""),
+        "lazy + warm_up()": FIRST_REPORT.format(
+            preload="", warmup="from cardio_app.reports.pdf_report import warm_up; warm_up()"),
+    }
+
+    print(f"{'scenario':<18} {'import (ms)':>12} {'warm-up (ms)':>13} {'1st report (ms)':>16}")
+    for name, code in scenarios.items():
+        samples = [_run(code) for _ in range(args.repeat)]
+        print(f"{name:<18} {_median(samples, 0) * 1000:>12.0f} {_median(samples, 1) * 1000:>13.0f} "
+              f"{_median(samples, 2) * 1000:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: per-report savings from the process-level PDF resource cache.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_pdf_resources [--iterations 10] [--font PATH]
+
+Builds and saves the same client's report repeatedly, once with the
+resource cache cleared before every report (each document parses its font
+and recompresses its images, as before the cache) and once with it warm:
+
+    unicode-font  vector tables and plots, rendered with a TTF font
+                  (Matplotlib's DejaVu Sans unless --font is given)
+    png           Matplotlib tables and plots in the core font; the plot
+                  cache stays on, so every report embeds the same PNGs
+"""
+
+import argparse
+from pathlib import Path
+
+from cardio_app.benchmarks.bench_pipeline import PROFILES, make_client, time_stage
+from cardio_app.reports.pdf_report import PDFReportBuilder
+from cardio_app.reports.pdf_resources import resource_cache
+
+
+def default_font():
+    import matplotlib
+
+    return str(Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf")
+
+
+def _report(client, cold, username, **options):
+    if cold:
+        resource_cache.clear()
+    builder = PDFReportBuilder(client["metrics"], client["programs"], username,
+                               unit=client["unit"], ramp_df=client["ramp_df"], **options)
+    builder.build_pdf()
+    return builder.save_pdf(in_memory=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--font", default=None, help="TTF file (default: DejaVu Sans)")
+    args = parser.parse_args(argv)
+
+    scenarios = {
+        "unicode-font": {"username": "Zoë Łukaszewicz", "table_mode": "vector", "plot_mode": "vector",
+                         "font_path": args.font or default_font()},
+        "png": {"username": "Zoe Lukaszewicz", "table_mode": "png", "plot_mode": "png"},
+    }
+    print(f"{'report':<26} {'cold ms':>9} {'warm ms':>9} {'saved ms':>9} {'bytes':>8}")
+    for profile, (ramp_steps, n_programs) in PROFILES.items():
+        client = make_client(ramp_steps, n_programs)
+        for scenario, options in scenarios.items():
+            cold = time_stage(lambda: _report(client, True, **options), args.iterations)
+            warm = time_stage(lambda: _report(client, False, **options), args.iterations)
+            print(f"{profile + '/' + scenario:<26} {cold['p50_ms']:>9.1f} {warm['p50_ms']:>9.1f} "
+                  f"{cold['p50_ms'] - warm['p50_ms']:>9.1f} {warm['output_bytes']:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
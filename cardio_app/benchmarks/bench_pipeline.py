@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the report-generation pipeline.
+
+Times each stage separately on synthetic clients (varying ramp length and
+program count) and reports p50/p95 latency, peak allocation and output
+size, followed by the process's peak RSS:
+
+    calculate_metrics, build_program (per training type),
+    create_metrics_table_image, create_program_table_image,
+    create_ramp_test_plot, create_program_speed_plot,
+    PDFReportBuilder.build_pdf + save_pdf, Flask POST /generate
+
+The plot and program caches and the report store are disabled so every
+iteration does the work.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_pipeline --iterations 20
+    python -m cardio_app.benchmarks.bench_pipeline --save-baseline baseline.json
+    python -m cardio_app.benchmarks.bench_pipeline --compare baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+from cardio_app.logic.metrics import calculate_metrics
+from cardio_app.logic.program_cache import program_cache
+from cardio_app.logic.ramp_data import RampData
+from cardio_app.reports import plot_cache
+from cardio_app.reports.pdf_report import PDFReportBuilder
+from cardio_app.reports.pdf_tables import create_metrics_table_image, create_program_table_image
+from cardio_app.reports.pdf_visuals import create_program_speed_plot, create_ramp_test_plot
+from cardio_app.webapp.report_service import build_programs
+from cardio_app.webapp.report_store import report_store
+
+TRAINING_TYPES = ("explosive", "power_endurance", "endurance")
+
+# (ramp steps, number of programs) per synthetic client profile
+PROFILES = {
+    "small": (10, 1),
+    "medium": (20, 3),
+    "large": (30, 6),
+}
+
+
+def make_client(ramp_steps, n_programs, unit="mph"):
+    """Synthetic client: ramp data, metrics, programs and web-form inputs"""
+    speeds = [2.0 + 0.5 * i for i in range(ramp_steps)]
+    rpe = [min(10.0, round(10.0 * i / (ramp_steps - 1) * 2) / 2) for i in range(ramp_steps)]
+    ramp = RampData(speeds, rpe)
+    ramp_df = ramp.to_dataframe()
+    metrics = calculate_metrics(ramp_df, None, unit)
+
+    trainings = [{"training_type": TRAINING_TYPES[i % 3], "duration": 15 + 5 * i} for i in range(n_programs)]
+    # The web flow keys programs by training type; number them so every
+    # requested program lands in the benchmarked report
+    programs = {f"{tr['training_type'].capitalize()} {i + 1}": build_program(metrics, ramp, tr, unit)
+                for i, tr in enumerate(trainings)}
+    return {"unit": unit, "ramp": ramp, "ramp_df": ramp_df, "metrics": metrics,
+            "trainings": trainings, "programs": programs}
+
+
+def build_program(metrics, ramp, training, unit):
+    """Build one program with the same builder arguments as the web route"""
+    return next(iter(build_programs([training], metrics, ramp, unit).values()))
+
+
+def _output_size(result):
+    if result is None:
+        return 0
+    if isinstance(result, (bytes, bytearray)):
+        return len(result)
+    if hasattr(result, "getbuffer"):
+        return result.getbuffer().nbytes
+    return 0
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _peak_alloc_mb(fn):
+    """
+    Peak memory traced by tracemalloc during one fn() call. Covers Python
+    and NumPy allocations, not C buffers such as Agg's canvas.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def time_stage(fn, iterations):
+    """
+    Run fn() iterations times; return latency percentiles, peak allocation
+    and output size. The allocation comes from one extra traced call, so
+    tracing does not slow down the timed ones.
+    """
+    fn()  # warm-up run, not measured
+    samples, size = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - start)
+        size = _output_size(result)
+    return {
+        "p50_ms": _percentile(samples, 50) * 1000,
+        "p95_ms": _percentile(samples, 95) * 1000,
+        "peak_alloc_mb": _peak_alloc_mb(fn),
+        "output_bytes": size,
+    }
+
+
+def _flask_client(client):
+    from cardio_app.webapp import create_app
+
+    app = create_app()
+    app.config["TESTING"] = True
+    test_client = app.test_client()
+    ramp = client["ramp"]
+    test_client.post("/next", data={
+        "client_name": "Bench Client",
+        "unit": client["unit"],
+        "ramp_rpe_inputs": [f"{s}:{r}" for s, r in zip(ramp.speeds, ramp.rpe)],
+    })
+    for tr in client["trainings"]:
+        test_client.post("/add_training", data=tr)
+    return test_client
+
+
+def _generate(test_client):
+    response = test_client.post("/generate")
+    if response.status_code != 200:
+        raise RuntimeError(f"/generate returned {response.status_code}")
+    return response.data
+
+
+def _build_and_save(client):
+    builder = PDFReportBuilder(client["metrics"], client["programs"], "Bench Client",
+                               unit=client["unit"], ramp_df=client["ramp_df"])
+    builder.build_pdf()
+    return builder.save_pdf(in_memory=True)
+
+
+def stages_for(client):
+    """Return {stage name: zero-argument callable} for one synthetic client"""
+    unit = client["unit"]
+    first_program = next(iter(client["programs"].values()))
+    stages = {
+        "calculate_metrics": lambda: calculate_metrics(client["ramp_df"], None, unit),
+    }
+    for training_type in TRAINING_TYPES:
+        training = {"training_type": training_type, "duration": 30}
+        stages[f"build_program[{training_type}]"] = (
+            lambda t=training: build_program(client["metrics"], client["ramp"], t, unit))
+    stages.update({
+        "create_metrics_table_image": lambda: create_metrics_table_image(client["metrics"]),
+        "create_program_table_image": lambda: create_program_table_image(first_program, unit=unit),
+        "create_ramp_test_plot": lambda: create_ramp_test_plot(client["ramp_df"], client["metrics"], unit=unit),
+        "create_program_speed_plot": lambda: create_program_speed_plot(first_program, unit=unit),
+        "build_pdf+save_pdf": lambda: _build_and_save(client),
+    })
+    test_client = _flask_client(client)
+    stages["flask /generate"] = lambda: _generate(test_client)
+    return stages
+
+
+def run(iterations, profiles):
+    # Measure real work, not cache or report store lookups
+    saved = (plot_cache.plot_cache.max_entries, plot_cache.plot_cache.disk_dir,
+             program_cache.max_entries, report_store.max_bytes)
+    plot_cache.plot_cache.max_entries = 0
+    plot_cache.plot_cache.disk_dir = None
+    program_cache.max_entries = 0
+    report_store.max_bytes = 0
+    try:
+        results = {}
+        for profile in profiles:
+            ramp_steps, n_programs = PROFILES[profile]
+            client = make_client(ramp_steps, n_programs)
+            for stage, fn in stages_for(client).items():
+                results[f"{profile}/{stage}"] = time_stage(fn, iterations)
+        return results
+    finally:
+        (plot_cache.plot_cache.max_entries, plot_cache.plot_cache.disk_dir,
+         program_cache.max_entries, report_store.max_bytes) = saved
+
+
+def print_results(results, baseline=None):
+    print(f"{'stage':<46} {'p50 ms':>9} {'p95 ms':>9} {'alloc MB':>8} {'bytes':>9} {'vs base':>8}")
+    for name, r in results.items():
+        delta = ""
+        if baseline and name in baseline:
+            delta = f"{(r['p50_ms'] / baseline[name]['p50_ms'] - 1) * 100:+.0f}%"
+        print(f"{name:<46} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['peak_alloc_mb']:>8.1f} "
+              f"{r['output_bytes']:>9} {delta:>8}")
+
+
+def regressions(results, baseline, tolerance, min_delta_ms=1.0):
+    """
+    Stages whose p50 got slower than the baseline by more than tolerance.
+    Sub-millisecond stages jitter by tens of percent, so a stage must also
+    be at least min_delta_ms slower to count.
+    """
+    slower = []
+    for name, r in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]["p50_ms"]
+        if r["p50_ms"] > base * (1 + tolerance) and r["p50_ms"] - base >= min_delta_ms:
+            slower.append(name)
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-stage benchmark of the report pipeline")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    parser.add_argument("--save-baseline", metavar="PATH", help="Write results to a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed relative p50 slowdown before --compare fails (default 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="Ignore slowdowns smaller than this many milliseconds (default 1.0)")
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.profiles)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["stages"]
+    print_results(results, baseline)
+    # ru_maxrss is a lifetime high-water mark, so it is only meaningful once
+    print(f"process peak RSS: {_peak_rss_mb():.0f} MB")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "iterations": args.iterations, "peak_rss_mb": _peak_rss_mb(), "stages": results},
+                      f, indent=2)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        slower = regressions(results, baseline, args.tolerance, args.min_delta_ms)
+        for name in slower:
+            print(f"REGRESSION: {name}")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: PNG (Matplotlib, 150 dpi) vs PDF-native vector plots.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_plot_modes [--iterations 10]
+
+For each plot the PNG path is timed as render + embed on a fresh page and
+the vector path as drawing the same plot on a fresh page; the size is the
+resulting one-page PDF. Whole reports are then built and saved in both
+plot modes for each client profile. The plot cache is disabled so every
+PNG iteration renders.
+"""
+
+import argparse
+
+from fpdf import FPDF
+
+from cardio_app.benchmarks.bench_pipeline import PROFILES, make_client, time_stage
+from cardio_app.reports import plot_cache
+from cardio_app.reports.pdf_report import PDFReportBuilder
+from cardio_app.reports.pdf_vector_plots import draw_program_speed_plot, draw_ramp_test_plot
+from cardio_app.reports.pdf_visuals import create_program_speed_plot, create_ramp_test_plot
+
+
+def _page(draw):
+    pdf = FPDF()
+    pdf.add_page()
+    draw(pdf)
+    return pdf.output()
+
+
+def _embed(image):
+    return lambda pdf: pdf.image(image, x=10, w=190)
+
+
+def plot_stages(client):
+    unit, metrics, ramp_df = client["unit"], client["metrics"], client["ramp_df"]
+    program = next(iter(client["programs"].values()))
+    return {
+        "ramp_plot": (
+            lambda: _page(_embed(create_ramp_test_plot(ramp_df, metrics, unit=unit))),
+            lambda: _page(lambda pdf: draw_ramp_test_plot(pdf, ramp_df, metrics, unit=unit)),
+        ),
+        "program_plot": (
+            lambda: _page(_embed(create_program_speed_plot(program, unit=unit))),
+            lambda: _page(lambda pdf: draw_program_speed_plot(pdf, program, unit=unit)),
+        ),
+    }
+
+
+def _report(client, plot_mode):
+    builder = PDFReportBuilder(client["metrics"], client["programs"], "Bench Client",
+                               unit=client["unit"], ramp_df=client["ramp_df"], plot_mode=plot_mode)
+    builder.build_pdf()
+    return builder.save_pdf(in_memory=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    plot_cache.plot_cache.max_entries = 0
+    plot_cache.plot_cache.disk_dir = None
+
+    print(f"{'stage':<22} {'png ms':>9} {'vector ms':>10} {'png bytes':>10} {'vector bytes':>13}")
+    for profile, (ramp_steps, n_programs) in PROFILES.items():
+        client = make_client(ramp_steps, n_programs)
+        stages = {f"{profile}/{name}": pair for name, pair in plot_stages(client).items()}
+        stages[f"{profile}/report"] = (lambda: _report(client, "png"), lambda: _report(client, "vector"))
+        for name, (png_fn, vector_fn) in stages.items():
+            png = time_stage(png_fn, args.iterations)
+            vector = time_stage(vector_fn, args.iterations)
+            print(f"{name:<22} {png['p50_ms']:>9.2f} {vector['p50_ms']:>10.2f} "
+                  f"{png['output_bytes']:>10} {vector['output_bytes']:>13}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
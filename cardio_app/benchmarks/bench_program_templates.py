@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark: CardioProgramBuilder.build_program vs the program template index.
+
+Usage:
+    python -m cardio_app.benchmarks.bench_program_templates [--clients 2000]
+
+Every template is precomputed first (timed separately), then both paths
+build one program per training type for each synthetic client and the
+results are checked for equality.
+"""
+
+import argparse
+import gc
+import random
+import time
+
+from cardio_app.logic.program_builder import CardioProgramBuilder
+from cardio_app.logic.program_templates import TRAINING_TYPES, TemplateIndex
+
+
+def make_clients(n_clients, seed=0):
+    rng = random.Random(seed)
+    clients = []
+    for _ in range(n_clients):
+        aerobic = round(rng.uniform(3.5, 7.5), 2)
+        clients.append({
+            "total_time": rng.randint(10, 90),
+            "max_speed": round(rng.uniform(7.0, 14.0), 1),
+            "recovery_speed": aerobic,
+            "aerobic_thres": aerobic,
+            "anaerobic_thres": round(aerobic + rng.uniform(0.5, 3.0), 2),
+            "unit": rng.choice(("mph", "kmh")),
+        })
+    return clients
+
+
+def time_builder(clients):
+    start = time.perf_counter()
+    programs = [CardioProgramBuilder(**client).build_program(training_type)
+                for client in clients for training_type in TRAINING_TYPES]
+    return time.perf_counter() - start, programs
+
+
+def time_templates(index, clients):
+    start = time.perf_counter()
+    programs = [index.build_program(training_type, **client)
+                for client in clients for training_type in TRAINING_TYPES]
+    return time.perf_counter() - start, programs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    clients = make_clients(args.clients)
+
+    start = time.perf_counter()
+    index = TemplateIndex().precompute(durations=range(10, 91))
+    precompute_sec = time.perf_counter() - start
+
+    # Like timeit, keep the collector from scanning the growing result lists
+    gc.disable()
+    try:
+        builder_sec, expected = time_builder(clients)
+        template_sec, actual = time_templates(index, clients)
+    finally:
+        gc.enable()
+    n_programs = len(expected)
+
+    print(f"precompute {len(index)} templates: {precompute_sec * 1000:.1f} ms")
+    print(f"{'path':<10} {'total (ms)':>11} {'per program (us)':>17}")
+    print(f"{'builder':<10} {builder_sec * 1000:>11.1f} {builder_sec / n_programs * 1e6:>17.2f}")
+    print(f"{'template':<10} {template_sec * 1000:>11.1f} {template_sec / n_programs * 1e6:>17.2f}")
+    print(f"speedup: {builder_sec / template_sec:.1f}x, identical: {expected == actual}")
+    return 0 if expected == actual else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
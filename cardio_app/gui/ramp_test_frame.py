@@ -124,6 +124,7 @@ class RampTestFrame(ttk.Frame):
         self.controller.shared_data["ramp_df"] = self.result
 
         self.controller.calculate_and_prepare()
+        self.controller.prerender_cover()
 
         answer = messagebox.askyesno("Wingate Test", "Do you want to enter Wingate Test results?", parent=self)
         if answer:
@@ -0,0 +1,135 @@
+"""
+Background PDF building for the Tk app.
+
+build_pdf renders every chart with Matplotlib and takes seconds, which froze
+the window when it ran on the Tk main thread. Report work runs on a single
+worker thread instead. The worker never touches Tk: it posts progress and
+its result to a queue that the main thread drains with after() polling.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tkinter as tk
+from tkinter import ttk
+
+from cardio_app.reports.pdf_report import ReportCancelled
+
+POLL_MS = 50
+
+# One thread for all report work, so a cover pre-rendered while the user
+# picks trainings shares the plot cache and figure pool with the build
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cardio-report")
+        return _executor
+
+
+def run_in_background(fn, *args):
+    """Queue fire-and-forget work (e.g. pre-rendering) on the report thread"""
+    return _get_executor().submit(fn, *args)
+
+
+class ReportJob:
+    """
+    Run work(on_progress, cancelled) on the report thread and call back on
+    the Tk thread: on_progress(done, total, stage) while it runs, then
+    exactly one of on_done(result), on_error(exception) or on_cancelled().
+    Only work raising ReportCancelled counts as cancelled: once it is past
+    its last cancelled() check (e.g. writing the file) it runs to on_done.
+    """
+
+    def __init__(self, widget, work, on_done, on_error=None, on_progress=None, on_cancelled=None,
+                 poll_ms=POLL_MS):
+        self.widget = widget
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancelled = on_cancelled
+        self.poll_ms = poll_ms
+        self._events = queue.Queue()
+        self._cancel = threading.Event()
+        self.future = _get_executor().submit(self._run, work)
+        self.widget.after(self.poll_ms, self._poll)
+
+    def cancel(self):
+        """Ask the worker to stop at its next cancelled() check"""
+        self._cancel.set()
+
+    def _run(self, work):
+        # Worker thread: no Tk calls past this point
+        def on_progress(done, total, stage):
+            self._events.put(("progress", (done, total, stage)))
+
+        try:
+            result = work(on_progress, self._cancel.is_set)
+        except ReportCancelled:
+            self._events.put(("cancelled", None))
+        except Exception as e:
+            self._events.put(("error", e))
+        else:
+            self._events.put(("done", result))
+
+    def _poll(self):
+        # Tk thread: drain what the worker posted since the last poll
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                if self.on_progress is not None:
+                    self.on_progress(*payload)
+            elif kind == "done":
+                self.on_done(payload)
+                return
+            elif kind == "error":
+                if self.on_error is not None:
+                    self.on_error(payload)
+                return
+            else:
+                if self.on_cancelled is not None:
+                    self.on_cancelled()
+                return
+        self.widget.after(self.poll_ms, self._poll)
+
+
+class ReportProgressDialog(tk.Toplevel):
+    """Modal progress bar with a Cancel button for a ReportJob"""
+
+    def __init__(self, master, on_cancel, title="Building PDF Report"):
+        super().__init__(master)
+        self.title(title)
+        self.resizable(False, False)
+        self.transient(master)
+        self.on_cancel = on_cancel
+
+        self.label = ttk.Label(self, text="Preparing report...")
+        self.label.pack(padx=20, pady=(15, 5))
+        self.bar = ttk.Progressbar(self, length=300, mode="determinate")
+        self.bar.pack(padx=20, pady=5)
+        self.cancel_button = ttk.Button(self, text="Cancel", command=self.cancel)
+        self.cancel_button.pack(pady=(5, 15))
+
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.grab_set()
+
+    def update_progress(self, done, total, stage):
+        self.bar.config(maximum=max(total, 1), value=done)
+        self.label.config(text=f"{stage} ({done}/{total})")
+
+    def disable_cancel(self):
+        """The job is past the point where it can stop"""
+        self.cancel_button.config(state="disabled")
+        self.protocol("WM_DELETE_WINDOW", lambda: None)
+
+    def cancel(self):
+        self.cancel_button.config(state="disabled")
+        self.label.config(text="Cancelling...")
+        self.on_cancel()
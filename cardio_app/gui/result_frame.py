@@ -1,7 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-from cardio_app.reports.pdf_report import PDFReportBuilder
-from cardio_app.reports.pdf_utils_common import ask_save_filepath
+from cardio_app.logic.program import Program
+from cardio_app.reports.pdf_utils_common import ask_save_filepath, format_seconds
 
 class ResultFrame(ttk.Frame):
     def __init__(self, master, controller):
@@ -34,12 +34,16 @@ class ResultFrame(ttk.Frame):
         self.text_area.delete('1.0', tk.END)
 
         for training_type, program in all_programs.items():
+            program = Program.coerce(program)
             self.text_area.insert(tk.END, f"--- {training_type.title()} Program ---\n")
-            for phase, duration, start_time, speed in program:
-                mins = duration // 60
-                secs = duration % 60
+            for interval in program:
+                mins = interval.duration // 60
+                secs = interval.duration % 60
                 self.text_area.insert(tk.END,
-                                      f"{phase}: {mins}m {secs}s, Speed: {speed} {unit}\n")
+                                      f"{interval.label}: {mins}m {secs}s, Speed: {interval.speed} {unit}\n")
+            self.text_area.insert(tk.END,
+                                  f"Total: {format_seconds(program.total_duration)}, "
+                                  f"Max speed: {program.max_speed} {unit}\n")
             self.text_area.insert(tk.END, "\n")
 
         # Disable editing
@@ -58,21 +62,10 @@ class ResultFrame(ttk.Frame):
             ramp_df=self.controller.shared_data.get("ramp_df", None)
         )
     def save_pdf(self):
-        pdf_builder = PDFReportBuilder(
-            metrics=self.controller.shared_data.get("metrics"),
-            programs=self.controller.shared_data.get("all_programs"),
-            username=self.controller.shared_data.get("client_name"),
-            unit=self.controller.shared_data.get("unit"),
-            ramp_df=self.controller.shared_data.get("ramp_df")
-        )
-        pdf_builder.build_pdf()
         filename = ask_save_filepath(default_name=f"{self.controller.shared_data.get('client_name', 'cardio')}_cardio_report.pdf")
         if filename:
-            pdf_builder.save_pdf(filename)
-            messagebox.showinfo("Success", f"PDF saved successfully:\n{filename}", parent=self)
-            self.controller.quit()
-
-
+            # Built on the report thread; the app quits once the file is saved
+            self.controller.save_report_in_background(self, filename, on_saved=self.controller.quit)
         else:
             messagebox.showinfo("Cancelled", "Save cancelled. Report not saved.", parent=self)
 
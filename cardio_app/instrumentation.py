@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight per-process timing and counters for the report pipeline.
+
+Enable with CARDIO_METRICS=1 (or enable()). Stages are wrapped with
+timed(), either as a context manager or a decorator, and events are
+counted with incr(). Everything is aggregated in this process and exposed
+in Prometheus text format by render_prometheus() (served at /metrics).
+
+When disabled, timed() hands back a shared no-op context manager and
+incr() returns immediately, so instrumented code pays one flag check.
+Work done inside render pool processes is counted in those processes.
+"""
+
+import functools
+import os
+import threading
+import time
+
+_enabled = os.environ.get("CARDIO_METRICS", "0") == "1"
+_lock = threading.Lock()
+_timers = {}    # stage -> [count, total seconds, max seconds]
+_counters = {}  # (name, ((label, value), ...)) -> total
+
+PREFIX = "cardio"
+
+
+def enabled():
+    return _enabled
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+
+
+def incr(name, amount=1, **labels):
+    """Add amount to the counter name{labels}"""
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(stage, seconds):
+    """Record one duration for stage"""
+    with _lock:
+        timer = _timers.get(stage)
+        if timer is None:
+            _timers[stage] = [1, seconds, seconds]
+        else:
+            timer[0] += 1
+            timer[1] += seconds
+            if seconds > timer[2]:
+                timer[2] = seconds
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            incr("errors", stage=self.stage)
+        return False
+
+
+def timed(stage):
+    """Context manager timing the enclosed block as stage; exceptions count as errors"""
+    return _Timer(stage) if _enabled else _NULL_TIMER
+
+
+def instrumented(stage):
+    """Decorator form of timed(); the flag is checked on every call"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Return {"timers": {stage: {...}}, "counters": {(name, labels): total}}"""
+    with _lock:
+        timers = {stage: {"count": t[0], "sum": t[1], "max": t[2]} for stage, t in _timers.items()}
+        counters = dict(_counters)
+    return {"timers": timers, "counters": counters}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def render_prometheus():
+    """Return the current aggregates in Prometheus text exposition format"""
+    data = snapshot()
+    lines = []
+
+    if data["timers"]:
+        name = f"{PREFIX}_stage_seconds"
+        lines.append(f"# HELP {name} Time spent in each pipeline stage.")
+        lines.append(f"# TYPE {name} summary")
+        for stage, t in sorted(data["timers"].items()):
+            label = _labels([("stage", stage)])
+            lines.append(f"{name}_count{label} {t['count']}")
+            lines.append(f"{name}_sum{label} {t['sum']:.6f}")
+        lines.append(f"# HELP {name}_max Slowest observed run of each stage.")
+        lines.append(f"# TYPE {name}_max gauge")
+        for stage, t in sorted(data["timers"].items()):
+            lines.append(f"{name}_max{_labels([('stage', stage)])} {t['max']:.6f}")
+
+    by_name = {}
+    for (counter, labels), total in data["counters"].items():
+        by_name.setdefault(counter, []).append((labels, total))
+    for counter, samples in sorted(by_name.items()):
+        name = f"{PREFIX}_{counter}_total"
+        lines.append(f"# TYPE {name} counter")
+        for labels, total in sorted(samples):
+            lines.append(f"{name}{_labels(labels)} {total}")
+
+    return "\n".join(lines) + "\n"
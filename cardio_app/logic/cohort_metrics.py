@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized cardio metrics for whole cohorts.
+
+calculate_cohort_metrics computes, for every client at once, the same
+numbers calculate_metrics returns for that client alone. Data is sorted by
+client once and every statistic is a grouped NumPy reduction instead of a
+per-client boolean-masked DataFrame.
+"""
+
+import numpy as np
+import pandas as pd
+
+from cardio_app.logic.thresholds import BAND_METHOD, check_method, fit_thresholds, pad_groups
+
+RAMP_METRICS = ("Aerobic Threshold ({unit})", "Anaerobic Threshold ({unit})",
+                "VO2max Speed ({unit})", "Ramp Avg Speed ({unit})")
+WINGATE_METRICS = ("Wingate Peak Speed ({unit})", "Wingate Average Speed ({unit})",
+                   "Fatigue Index (%)")
+
+
+class _Groups:
+    """Rows sorted by client (stable, so per-client order is kept) with group bounds"""
+
+    def __init__(self, client_ids, clients):
+        codes = pd.Index(clients).get_indexer(client_ids)
+        self.order = np.argsort(codes, kind="stable")
+        self.codes = codes[self.order]
+        self.n_groups = len(clients)
+        self.counts = np.bincount(self.codes, minlength=self.n_groups)
+        self.starts = np.concatenate(([0], np.cumsum(self.counts)[:-1]))
+        self.present = self.counts > 0
+
+    def sort(self, values):
+        return np.asarray(values, dtype=float)[self.order]
+
+
+def _grouped_sum(values, codes, n_groups):
+    """
+    Per-group sum of values (already grouped contiguously by codes).
+
+    Groups with the same length are stacked into one 2-D array and summed
+    along rows, which uses the same pairwise summation as the 1-D sum
+    pandas does for a single client, so results are bit-identical.
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    sums = np.zeros(n_groups)
+    for n in np.unique(counts[counts > 0]):
+        groups = np.flatnonzero(counts == n)
+        rows = values[starts[groups][:, None] + np.arange(n)]
+        sums[groups] = rows.sum(axis=1)
+    return sums, counts
+
+
+def _grouped_mean(values, codes, n_groups):
+    sums, counts = _grouped_sum(values, codes, n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+
+def _band_mean(speed, rpe, codes, n_groups, low, high):
+    mask = (rpe > low) & (rpe < high)
+    return _grouped_mean(speed[mask], codes[mask], n_groups)
+
+
+def _speed_column(df, unit):
+    return f"Speed ({unit})" if f"Speed ({unit})" in df.columns else "Speed"
+
+
+def _as_frame(data, columns):
+    if isinstance(data, pd.DataFrame):
+        return data
+    if isinstance(data, dict):
+        return pd.DataFrame(data)
+    return pd.DataFrame(dict(zip(columns, data)))
+
+
+def calculate_cohort_metrics(ramp, wingate=None, unit="mph", client_col="client_id", threshold_method="band"):
+    """
+    Compute metrics for every client in one grouped pass.
+
+    Parameters:
+    - ramp: long-format DataFrame with columns [client_col, 'Speed', 'RPE']
+            (or 'Speed (<unit>)'), or a (client_ids, speeds, rpe) tuple of arrays.
+    - wingate: optional long-format DataFrame [client_col, 'Speed'] in time
+               order per client, or a (client_ids, speeds) tuple.
+    - unit: 'mph' or 'kmh', used for the metric names.
+    - threshold_method: 'band', or a curve fit from logic.thresholds; every
+                        client's ramp test is fitted in one batch.
+
+    Returns:
+    - pd.DataFrame indexed by client id, one column per calculate_metrics key.
+      Missing thresholds and Wingate metrics for clients without Wingate
+      data are NaN (see cohort_metrics_to_dicts for the per-client dicts).
+    """
+    threshold_method = check_method(threshold_method)
+    ramp = _as_frame(ramp, [client_col, "Speed", "RPE"])
+    speed_col = _speed_column(ramp, unit)
+    clients = pd.unique(ramp[client_col])
+
+    if wingate is not None:
+        wingate = _as_frame(wingate, [client_col, "Speed"])
+        clients = pd.unique(np.concatenate([clients, pd.unique(wingate[client_col])]))
+
+    result = pd.DataFrame(index=pd.Index(clients, name=client_col))
+    names = [name.format(unit=unit) for name in RAMP_METRICS]
+
+    groups = _Groups(ramp[client_col].to_numpy(), clients)
+    speed = groups.sort(ramp[speed_col])
+    rpe = groups.sort(ramp["RPE"])
+    codes, n = groups.codes, groups.n_groups
+
+    if threshold_method == BAND_METHOD:
+        aerobic = _band_mean(speed, rpe, codes, n, 2, 6)
+        anaerobic = _band_mean(speed, rpe, codes, n, 6, 9)
+    else:
+        fitted = fit_thresholds(pad_groups(speed, groups.starts, groups.counts),
+                                pad_groups(rpe, groups.starts, groups.counts), threshold_method)
+        aerobic, anaerobic = fitted[:, 0], fitted[:, 1]
+
+    # VO2max: first speed reaching RPE 10, otherwise the fastest speed
+    vo2max = np.full(n, np.nan)
+    present = groups.present
+    if present.any():
+        vo2max[present] = np.maximum.reduceat(speed, groups.starts[present])
+    at_max = np.flatnonzero(rpe == 10)
+    first_codes, first_idx = np.unique(codes[at_max], return_index=True)
+    vo2max[first_codes] = speed[at_max[first_idx]]
+
+    ramp_avg = _grouped_mean(speed, codes, n)
+
+    result[names[0]] = np.round(aerobic, 2)
+    result[names[1]] = np.round(anaerobic, 2)
+    result[names[2]] = np.where(present, np.round(vo2max, 2), np.nan)
+    result[names[3]] = ramp_avg
+
+    if wingate is not None:
+        wing_col = _speed_column(wingate, unit)
+        w_groups = _Groups(wingate[client_col].to_numpy(), clients)
+        w_speed = w_groups.sort(wingate[wing_col])
+        w_present = w_groups.present
+
+        peak = np.full(n, np.nan)
+        last = np.full(n, np.nan)
+        if w_present.any():
+            peak[w_present] = np.maximum.reduceat(w_speed, w_groups.starts[w_present])
+            last[w_present] = w_speed[w_groups.starts[w_present] + w_groups.counts[w_present] - 1]
+        avg = _grouped_mean(w_speed, w_groups.codes, n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            fatigue = (last / peak) * 100
+
+        w_names = [name.format(unit=unit) for name in WINGATE_METRICS]
+        result[w_names[0]] = np.round(peak, 2)
+        result[w_names[1]] = np.round(avg, 2)
+        result[w_names[2]] = np.round(fatigue, 2)
+
+    return result
+
+
+def cohort_metrics_to_dicts(cohort_df, unit="mph"):
+    """
+    Convert calculate_cohort_metrics output to {client_id: metrics dict},
+    shaped exactly like calculate_metrics output for each client.
+    """
+    ramp_names = [name.format(unit=unit) for name in RAMP_METRICS]
+    wing_names = [name.format(unit=unit) for name in WINGATE_METRICS]
+    out = {}
+    for client_id, row in zip(cohort_df.index, cohort_df.to_dict(orient="records")):
+        metrics = {}
+        if not pd.isna(row.get(ramp_names[3], np.nan)):
+            for name in ramp_names:
+                metrics[name] = None if pd.isna(row[name]) else row[name]
+        if wing_names[0] in row and not pd.isna(row[wing_names[0]]):
+            for name in wing_names:
+                metrics[name] = row[name]
+        out[client_id] = metrics
+    return out
@@ -0,0 +1,465 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent athlete history: ramp and Wingate tests, their metrics and the
+programs built from them.
+
+Results otherwise only live in the Flask session or the Tk app's
+shared_data and are gone once the report is produced. The store keeps them
+in a SQLite file (CARDIO_HISTORY_DB) so athletes retested every few weeks
+can be followed over time:
+
+    history_store.last_tests("Jane Doe", n=5)
+    history_store.vo2max_drops(min_drop=0.05)
+
+A test is identified by the session that produced it (a random id the
+web app keeps in the Flask session and the Tk app in shared_data), so
+saving it again, from /next then /generate or with another threshold
+method, updates the one record, while a retest in a new session always
+adds another, even with identical values. Metrics are stored as plain columns,
+indexed by athlete and date, and export() writes them column-wise.
+
+Each athlete also has running aggregates per metric (count, min, max,
+mean and the sums behind a least-squares slope over time), updated as
+tests are saved, so trends() and progress reports never rescan or
+recompute the athlete's tests. Speeds in the aggregates are in mph.
+
+Without CARDIO_HISTORY_DB the store is disabled: nothing is written and
+queries return nothing.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from cardio_app.logic.metrics import calculate_metrics_fast
+from cardio_app.logic.program import Program
+from cardio_app.logic.program_cache import dataset_fingerprint
+from cardio_app.logic.ramp_data import RampData, WingateData
+
+KMH_PER_MPH = 1.609344
+
+# Column -> calculate_metrics key
+METRIC_COLUMNS = {
+    "aerobic_threshold": "Aerobic Threshold ({unit})",
+    "anaerobic_threshold": "Anaerobic Threshold ({unit})",
+    "vo2max_speed": "VO2max Speed ({unit})",
+    "ramp_avg_speed": "Ramp Avg Speed ({unit})",
+    "wingate_peak_speed": "Wingate Peak Speed ({unit})",
+    "wingate_avg_speed": "Wingate Average Speed ({unit})",
+    "fatigue_index": "Fatigue Index (%)",
+}
+TEST_COLUMNS = ("id", "athlete", "tested_at", "unit", "threshold_method") + tuple(METRIC_COLUMNS)
+# Metrics that are speeds (converted between mph and km/h); the rest are unitless
+SPEED_COLUMNS = tuple(col for col in METRIC_COLUMNS if col != "fatigue_index")
+
+DAY = 86400.0
+
+# Kept apart from SCHEMA so _migrate can create the table under another name
+TESTS_COLUMNS = """
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL UNIQUE,
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    tested_at REAL NOT NULL,
+    unit TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    threshold_method TEXT NOT NULL,
+    ramp TEXT NOT NULL,
+    wingate TEXT,
+    aerobic_threshold REAL,
+    anaerobic_threshold REAL,
+    vo2max_speed REAL,
+    ramp_avg_speed REAL,
+    wingate_peak_speed REAL,
+    wingate_avg_speed REAL,
+    fatigue_index REAL"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS athletes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests ({TESTS_COLUMNS}
+);
+CREATE INDEX IF NOT EXISTS tests_by_athlete_date ON tests (athlete_id, tested_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS programs (
+    id INTEGER PRIMARY KEY,
+    test_id INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    training_type TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    intervals TEXT NOT NULL,
+    UNIQUE (test_id, training_type, duration)
+);
+CREATE TABLE IF NOT EXISTS athlete_trends (
+    athlete_id INTEGER NOT NULL REFERENCES athletes(id),
+    metric TEXT NOT NULL,
+    origin REAL NOT NULL,
+    n INTEGER NOT NULL,
+    sum_t REAL NOT NULL,
+    sum_v REAL NOT NULL,
+    sum_tt REAL NOT NULL,
+    sum_tv REAL NOT NULL,
+    min_v REAL NOT NULL,
+    max_v REAL NOT NULL,
+    first_at REAL NOT NULL,
+    last_at REAL NOT NULL,
+    last_v REAL NOT NULL,
+    PRIMARY KEY (athlete_id, metric)
+);
+"""
+
+
+def _in_mph(col):
+    """SQL for a tests column with speeds in mph, so tests recorded in different units compare"""
+    if col not in SPEED_COLUMNS:
+        return col
+    return f"CASE unit WHEN 'kmh' THEN {col} / {KMH_PER_MPH} ELSE {col} END"
+
+
+_VO2MAX_MPH = _in_mph("vo2max_speed")
+
+
+def _mph_factor(unit):
+    """Multiply an mph speed by this to get it in unit"""
+    return KMH_PER_MPH if unit == "kmh" else 1.0
+
+
+def athlete_key(name):
+    """Athletes are matched on their name, ignoring case and surrounding spaces"""
+    return " ".join((name or "").split()).casefold()
+
+
+class HistoryStore:
+    def __init__(self, path=None):
+        self.path = path
+        self.enabled = bool(path)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if self.path != ":memory:":
+                # Readers in other worker processes do not block the writer
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(conn)
+            conn.execute("PRAGMA foreign_keys=ON")
+            conn.executescript(SCHEMA)
+            # Stores written before the aggregates existed get them once
+            if conn.execute("SELECT EXISTS (SELECT 1 FROM tests) "
+                            "AND NOT EXISTS (SELECT 1 FROM athlete_trends)").fetchone()[0]:
+                with conn:
+                    self._rebuild_trends(conn)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn):
+        """Stores written when tests were unique per (athlete, fingerprint) get a session_id per test"""
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(tests)")]
+        if not columns or "session_id" in columns:
+            return
+        # SQLite cannot drop a constraint: copy into a new table, with
+        # foreign keys off so dropping the old one keeps the programs
+        conn.execute("PRAGMA foreign_keys=OFF")
+        with conn:
+            conn.execute(f"CREATE TABLE tests_migrated ({TESTS_COLUMNS})")
+            conn.execute(f"INSERT INTO tests_migrated (session_id, {', '.join(columns)}) "
+                         f"SELECT 'migrated-' || id, {', '.join(columns)} FROM tests")
+            conn.execute("DROP TABLE tests")
+            conn.execute("ALTER TABLE tests_migrated RENAME TO tests")
+
+    def _athlete_id(self, conn, name):
+        key = athlete_key(name)
+        conn.execute("INSERT INTO athletes (key, name) VALUES (?, ?) "
+                     "ON CONFLICT (key) DO UPDATE SET name = excluded.name", (key, name.strip()))
+        return conn.execute("SELECT id FROM athletes WHERE key = ?", (key,)).fetchone()[0]
+
+    # --- writing --------------------------------------------------------
+
+    def record_test(self, athlete, unit, ramp, wingate=None, metrics=None, threshold_method="band",
+                    tested_at=None, session_id=None):
+        """
+        Save one test and its metrics; returns the test id (None when disabled).
+
+        ramp / wingate may be RampData / WingateData, DataFrames or session
+        records. metrics defaults to calculate_metrics for threshold_method.
+        Saving again with the session_id of a test on record updates that
+        test and keeps its original date; without a session_id every call
+        adds a test.
+        """
+        if not self.enabled:
+            return None
+        ramp = RampData.coerce(ramp, unit)
+        wingate = WingateData.coerce(wingate, unit)
+        if wingate is not None and wingate.empty:
+            wingate = None
+        if metrics is None:
+            metrics = calculate_metrics_fast(ramp, wingate, unit, threshold_method)
+        values = [metrics.get(name.format(unit=unit)) for name in METRIC_COLUMNS.values()]
+        tested_at = tested_at if tested_at is not None else time.time()
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                athlete_id = self._athlete_id(conn, athlete)
+                session_id = session_id or uuid.uuid4().hex
+                known = conn.execute("SELECT athlete_id FROM tests WHERE session_id = ?",
+                                     (session_id,)).fetchone()
+                updated = ("athlete_id", "unit", "fingerprint", "threshold_method", "ramp", "wingate") \
+                    + tuple(METRIC_COLUMNS)
+                conn.execute(
+                    f"INSERT INTO tests (session_id, athlete_id, tested_at, unit, fingerprint, threshold_method, "
+                    f"ramp, wingate, {', '.join(METRIC_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * (8 + len(METRIC_COLUMNS)))}) "
+                    f"ON CONFLICT (session_id) DO UPDATE SET "
+                    + ", ".join(f"{col} = excluded.{col}" for col in updated),
+                    [session_id, athlete_id, tested_at, unit, dataset_fingerprint(ramp, wingate, unit),
+                     threshold_method, json.dumps(ramp.to_columns()),
+                     json.dumps(wingate.to_columns(unit)) if wingate is not None else None] + values,
+                )
+                if known:
+                    # Changed metrics cannot be taken out of a running min/max
+                    self._rebuild_trends(conn, athlete_id)
+                    if known[0] != athlete_id:
+                        self._rebuild_trends(conn, known[0])
+                else:
+                    factor = _mph_factor(unit)
+                    self._add_to_trends(conn, athlete_id, tested_at, {
+                        col: value / factor if col in SPEED_COLUMNS else value
+                        for col, value in zip(METRIC_COLUMNS, values) if value is not None
+                    })
+                return conn.execute("SELECT id FROM tests WHERE session_id = ?", (session_id,)).fetchone()[0]
+
+    def record_programs(self, test_id, programs):
+        """Save (training_type, duration, Program) rows for a test, replacing earlier builds"""
+        if not self.enabled or test_id is None:
+            return
+        rows = [(test_id, training_type.lower(), int(duration),
+                 json.dumps([list(row) for row in Program.coerce(program)], default=float))
+                for training_type, duration, program in programs]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany("INSERT INTO programs (test_id, training_type, duration, intervals) "
+                                 "VALUES (?, ?, ?, ?) ON CONFLICT (test_id, training_type, duration) "
+                                 "DO UPDATE SET intervals = excluded.intervals", rows)
+
+    # --- aggregates -----------------------------------------------------
+
+    @staticmethod
+    def _add_to_trends(conn, athlete_id, tested_at, values):
+        """Fold one new test's {metric: value (mph)} into the athlete's running aggregates"""
+        origins = dict(conn.execute("SELECT metric, origin FROM athlete_trends WHERE athlete_id = ?",
+                                    (athlete_id,)).fetchall())
+        rows = []
+        for metric, v in values.items():
+            origin = origins.get(metric, tested_at)
+            t = (tested_at - origin) / DAY
+            rows.append((athlete_id, metric, origin, t, v, t * t, t * v, v, v, tested_at, tested_at, v))
+        # SET expressions read the row as it was before this update
+        conn.executemany(
+            "INSERT INTO athlete_trends (athlete_id, metric, origin, n, sum_t, sum_v, sum_tt, sum_tv, "
+            "min_v, max_v, first_at, last_at, last_v) VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (athlete_id, metric) DO UPDATE SET n = n + 1, "
+            "sum_t = sum_t + excluded.sum_t, sum_v = sum_v + excluded.sum_v, "
+            "sum_tt = sum_tt + excluded.sum_tt, sum_tv = sum_tv + excluded.sum_tv, "
+            "min_v = MIN(min_v, excluded.min_v), max_v = MAX(max_v, excluded.max_v), "
+            "first_at = MIN(first_at, excluded.first_at), last_at = MAX(last_at, excluded.last_at), "
+            "last_v = CASE WHEN excluded.last_at >= last_at THEN excluded.last_v ELSE last_v END",
+            rows,
+        )
+
+    @staticmethod
+    def _rebuild_trends(conn, athlete_id=None):
+        """Recompute the aggregates of one athlete (or everyone) from the stored metric columns"""
+        where, params = ("WHERE athlete_id = ?", (athlete_id,)) if athlete_id is not None else ("", ())
+        conn.execute(f"DELETE FROM athlete_trends {where}", params)
+        for col in METRIC_COLUMNS:
+            value = _in_mph(col)
+            conn.execute(
+                f"""
+                INSERT INTO athlete_trends (athlete_id, metric, origin, n, sum_t, sum_v, sum_tt, sum_tv,
+                                            min_v, max_v, first_at, last_at, last_v)
+                SELECT athlete_id, '{col}', origin, COUNT(*), SUM(t), SUM(v), SUM(t * t), SUM(t * v),
+                       MIN(v), MAX(v), MIN(tested_at), MAX(tested_at),
+                       (SELECT {value} FROM tests WHERE athlete_id = x.athlete_id AND {col} IS NOT NULL
+                        ORDER BY tested_at DESC, id DESC LIMIT 1)
+                FROM (
+                    SELECT athlete_id, tested_at, {value} AS v, origin, (tested_at - origin) / {DAY} AS t
+                    FROM tests JOIN (SELECT athlete_id, MIN(tested_at) AS origin FROM tests
+                                     {where} GROUP BY athlete_id) USING (athlete_id)
+                    WHERE {col} IS NOT NULL
+                ) AS x
+                GROUP BY athlete_id
+                """,
+                params,
+            )
+
+    def trends(self, athlete, unit="mph"):
+        """
+        {metric column: summary} of the athlete's running aggregates, with
+        speeds in unit. Each summary has tests, min, max, mean, latest,
+        slope_per_week (None with fewer than two test dates), first_at and
+        last_at.
+        """
+        rows = self._query(
+            "SELECT r.* FROM athletes a JOIN athlete_trends r ON r.athlete_id = a.id WHERE a.key = ?",
+            (athlete_key(athlete),),
+        )
+        trends = {}
+        for row in rows:
+            n = row["n"]
+            scale = _mph_factor(unit) if row["metric"] in SPEED_COLUMNS else 1.0
+            spread = n * row["sum_tt"] - row["sum_t"] ** 2
+            slope = None
+            # Tests all on one day have no trend (allow for rounding in the sums)
+            if n > 1 and spread > 1e-9 * n * row["sum_tt"]:
+                slope = (n * row["sum_tv"] - row["sum_t"] * row["sum_v"]) / spread * 7 * scale
+            trends[row["metric"]] = {
+                "tests": n,
+                "min": row["min_v"] * scale,
+                "max": row["max_v"] * scale,
+                "mean": row["sum_v"] / n * scale,
+                "latest": row["last_v"] * scale,
+                "slope_per_week": slope,
+                "first_at": row["first_at"],
+                "last_at": row["last_at"],
+            }
+        return {col: trends[col] for col in METRIC_COLUMNS if col in trends}
+
+    def series(self, athlete, unit="mph"):
+        """The athlete's stored metrics as {'tested_at': [...], metric column: [...]}, oldest first"""
+        rows = self._query(
+            f"SELECT t.tested_at, {', '.join(_in_mph(col) for col in METRIC_COLUMNS)} "
+            "FROM athletes a JOIN tests t ON t.athlete_id = a.id WHERE a.key = ? "
+            "ORDER BY t.tested_at, t.id",
+            (athlete_key(athlete),),
+        )
+        factor = _mph_factor(unit)
+        columns = list(zip(*rows)) if rows else [()] * (len(METRIC_COLUMNS) + 1)
+        series = {"tested_at": list(columns[0])}
+        for col, values in zip(METRIC_COLUMNS, columns[1:]):
+            if col in SPEED_COLUMNS and factor != 1.0:
+                values = [v * factor if v is not None else None for v in values]
+            series[col] = list(values)
+        return series
+
+    def progress(self, athlete, unit="mph"):
+        """Everything a progress report needs, or None without any tests on record"""
+        trends = self.trends(athlete, unit)
+        if not trends:
+            return None
+        return {"unit": unit, "trends": trends, "series": self.series(athlete, unit)}
+
+    # --- queries --------------------------------------------------------
+
+    def _query(self, sql, params=()):
+        if not self.enabled:
+            return []
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def last_tests(self, athlete, n=5):
+        """The athlete's n most recent tests, newest first, as dicts of TEST_COLUMNS"""
+        rows = self._query(
+            f"SELECT t.id, a.name AS athlete, t.tested_at, t.unit, t.threshold_method, "
+            f"{', '.join('t.' + col for col in METRIC_COLUMNS)} "
+            "FROM athletes a JOIN tests t ON t.athlete_id = a.id "
+            "WHERE a.key = ? ORDER BY t.tested_at DESC, t.id DESC LIMIT ?",
+            (athlete_key(athlete), n),
+        )
+        return [dict(row) for row in rows]
+
+    def test_data(self, test_id):
+        """(unit, RampData, WingateData or None) of a stored test, or None"""
+        rows = self._query("SELECT unit, ramp, wingate FROM tests WHERE id = ?", (test_id,))
+        if not rows:
+            return None
+        unit, ramp, wingate = rows[0]
+        ramp = RampData.from_records(json.loads(ramp), unit)
+        wingate = WingateData.from_records(json.loads(wingate), unit) if wingate else None
+        return unit, ramp, wingate
+
+    def programs(self, test_id):
+        """{training_type: Program} saved for a test"""
+        rows = self._query("SELECT training_type, intervals FROM programs WHERE test_id = ? ORDER BY id",
+                           (test_id,))
+        return {row["training_type"]: Program(json.loads(row["intervals"])) for row in rows}
+
+    def vo2max_drops(self, min_drop=0.05):
+        """
+        Athletes whose latest VO2max speed is more than min_drop (a fraction)
+        below the test before it, biggest drop first.
+        """
+        # A few index seeks per athlete on tests_by_athlete_date instead of sorting every test
+        latest = ("SELECT {col} FROM tests WHERE athlete_id = a.id AND vo2max_speed IS NOT NULL "
+                  "ORDER BY tested_at DESC, id DESC LIMIT 1 OFFSET {offset}")
+        rows = self._query(
+            f"""
+            SELECT athlete, tested_at, previous_mph, latest_mph, latest_mph / previous_mph - 1 AS change
+            FROM (
+                SELECT a.name AS athlete,
+                       ({latest.format(col="tested_at", offset=0)}) AS tested_at,
+                       ({latest.format(col=_VO2MAX_MPH, offset=0)}) AS latest_mph,
+                       ({latest.format(col=_VO2MAX_MPH, offset=1)}) AS previous_mph
+                FROM athletes a
+            )
+            WHERE latest_mph < previous_mph * (1 - ?)
+            ORDER BY change
+            """,
+            (min_drop,),
+        )
+        return [dict(row) for row in rows]
+
+    def columns(self):
+        """Every test as {column: list of values}, in TEST_COLUMNS order"""
+        rows = self._query(
+            f"SELECT t.id, a.name, t.tested_at, t.unit, t.threshold_method, "
+            f"{', '.join('t.' + col for col in METRIC_COLUMNS)} "
+            "FROM tests t JOIN athletes a ON a.id = t.athlete_id ORDER BY t.athlete_id, t.tested_at"
+        )
+        values = list(zip(*rows)) if rows else [()] * len(TEST_COLUMNS)
+        return {name: list(column) for name, column in zip(TEST_COLUMNS, values)}
+
+    def export(self, path):
+        """
+        Write every test column-wise to path: .parquet (needs pyarrow), .npz
+        (one NumPy array per column) or .csv.
+        """
+        columns = self.columns()
+        if path.lower().endswith(".npz"):
+            import numpy as np
+
+            np.savez_compressed(path, **{name: np.asarray(values, dtype=float if name in METRIC_COLUMNS else None)
+                                         for name, values in columns.items()})
+            return path
+        import pandas as pd
+
+        frame = pd.DataFrame(columns, columns=list(TEST_COLUMNS))
+        if path.lower().endswith(".parquet"):
+            frame.to_parquet(path, index=False)
+        else:
+            frame.to_csv(path, index=False)
+        return path
+
+    def stats(self):
+        if not self.enabled:
+            return {"enabled": False, "athletes": 0, "tests": 0, "programs": 0}
+        counts = self._query("SELECT (SELECT COUNT(*) FROM athletes), (SELECT COUNT(*) FROM tests), "
+                             "(SELECT COUNT(*) FROM programs)")[0]
+        return {"enabled": True, "athletes": counts[0], "tests": counts[1], "programs": counts[2]}
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+history_store = HistoryStore(os.environ.get("CARDIO_HISTORY_DB") or None)
@@ -3,40 +3,104 @@
 Calculations for cardio metrics
 """
 
-import pandas as pd
+from cardio_app.logic.ramp_data import RampData, WingateData
 
-def calculate_metrics(ramp_df, wingate_df, unit):
+
+def _pairwise_sum(values, start, n):
+    """
+    Sum values[start:start + n] in the same order as NumPy's pairwise float64
+    summation, so results are bit-identical to the pandas/NumPy means this
+    module used to compute.
+    """
+    if n < 8:
+        total = 0.0
+        for i in range(start, start + n):
+            total += values[i]
+        return total
+    if n <= 128:
+        r = list(values[start:start + 8])
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += values[start + i + j]
+            i += 8
+        total = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        for i in range(i, n):
+            total += values[start + i]
+        return total
+    half = n // 2
+    half -= half % 8
+    return _pairwise_sum(values, start, half) + _pairwise_sum(values, start + half, n - half)
+
+
+def _mean(values):
+    """NaN-skipping mean (like Series.mean); None when there is nothing to average"""
+    count = sum(1 for v in values if v == v)
+    if count == 0:
+        return None
+    values = [v if v == v else 0.0 for v in values]
+    return _pairwise_sum(values, 0, len(values)) / count
+
+
+def _round(value, decimals=2):
+    """Round half-to-even after scaling, matching NumPy's round on floats"""
+    scale = 10.0 ** decimals
+    return round(value * scale) / scale
+
+
+def calculate_metrics_fast(ramp, wingate, unit, threshold_method="band"):
+    """
+    Compute metrics from RampData / WingateData without touching pandas.
+    Either argument may be None. threshold_method picks how the aerobic and
+    anaerobic thresholds are found: 'band' (mean speed inside the RPE bands)
+    or one of the curve fits in logic.thresholds.
+    """
     metrics = {}
 
-    if ramp_df is not None and not ramp_df.empty:
-        speed_col = f"Speed ({unit})" if f"Speed ({unit})" in ramp_df.columns else "Speed"
+    if ramp is not None and not ramp.empty:
+        speeds, rpe = ramp.speeds, ramp.rpe
+
+        if threshold_method == "band":
+            # Calculate thresholds using your logic:
+            aerobic_threshold = _mean([s for s, r in zip(speeds, rpe) if 2 < r < 6])
+            anaerobic_threshold = _mean([s for s, r in zip(speeds, rpe) if 6 < r < 9])
+        else:
+            # NumPy is only needed for the curve fits
+            from cardio_app.logic.thresholds import threshold_speeds
 
-        # Calculate thresholds using your logic:
-        aerobic_threshold = ramp_df[(ramp_df["RPE"] > 2) & (ramp_df["RPE"] < 6)][speed_col].mean()
-        anaerobic_threshold = ramp_df[(ramp_df["RPE"] > 6) & (ramp_df["RPE"] < 9)][speed_col].mean()
+            aerobic_threshold, anaerobic_threshold = threshold_speeds(speeds, rpe, threshold_method)
 
-        vo2max_speed = (
-            ramp_df[ramp_df["RPE"] == 10][speed_col].values[0]
-            if not ramp_df[ramp_df["RPE"] == 10].empty
-            else ramp_df[speed_col].max()
-        )
+        vo2max_speed = next((s for s, r in zip(speeds, rpe) if r == 10), None)
+        if vo2max_speed is None:
+            vo2max_speed = max(s for s in speeds if s == s)
 
-        metrics[f"Aerobic Threshold ({unit})"] = round(aerobic_threshold, 2) if not pd.isna(aerobic_threshold) else None
-        metrics[f"Anaerobic Threshold ({unit})"] = round(anaerobic_threshold, 2) if not pd.isna(anaerobic_threshold) else None
-        metrics[f"VO2max Speed ({unit})"] = round(vo2max_speed, 2)
+        metrics[f"Aerobic Threshold ({unit})"] = _round(aerobic_threshold, 2) if aerobic_threshold is not None else None
+        metrics[f"Anaerobic Threshold ({unit})"] = _round(anaerobic_threshold, 2) if anaerobic_threshold is not None else None
+        metrics[f"VO2max Speed ({unit})"] = _round(vo2max_speed, 2)
 
-        metrics[f"Ramp Avg Speed ({unit})"] = ramp_df[speed_col].mean()
+        metrics[f"Ramp Avg Speed ({unit})"] = _mean(speeds)
 
-    if wingate_df is not None and not wingate_df.empty:
-        wing_col = f"Speed ({unit})" if f"Speed ({unit})" in wingate_df.columns else "Speed"
-        peak_speed = wingate_df[wing_col].max()
-        avg_speed = wingate_df[wing_col].mean()
-        fatigue_index = (wingate_df[wing_col].iloc[-1] / peak_speed) * 100
+    if wingate is not None and not wingate.empty:
+        speeds = wingate.speeds
+        peak_speed = max(speeds)
+        avg_speed = _mean(speeds)
+        fatigue_index = (speeds[-1] / peak_speed) * 100
 
         metrics.update({
-            f"Wingate Peak Speed ({unit})": round(peak_speed, 2),
-            f"Wingate Average Speed ({unit})": round(avg_speed, 2),
-            "Fatigue Index (%)": round(fatigue_index, 2)
+            f"Wingate Peak Speed ({unit})": _round(peak_speed, 2),
+            f"Wingate Average Speed ({unit})": _round(avg_speed, 2),
+            "Fatigue Index (%)": _round(fatigue_index, 2)
         })
 
     return metrics
+
+
+def calculate_metrics(ramp_df, wingate_df, unit, threshold_method="band"):
+    """
+    DataFrame adapter around calculate_metrics_fast.
+
+    ramp_df / wingate_df may be DataFrames (speed column 'Speed' or
+    'Speed (<unit>)'), RampData / WingateData, session records, or None.
+    """
+    return calculate_metrics_fast(RampData.coerce(ramp_df, unit), WingateData.coerce(wingate_df, unit), unit,
+                                  threshold_method)
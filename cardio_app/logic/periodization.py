@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Multi-week periodized training plans.
+
+generate_plan() lazily yields one PlannedSession per training session of an
+8-16 week plan. Weeks move through Base, Build and Peak phases with a
+deload every 4th week. Session durations grow week on week, and explosive
+sessions get more sprints and higher intensities. Programs come from the
+template index and are shared between sessions with identical parameters,
+so a long plan builds only a handful of distinct programs.
+"""
+
+from typing import NamedTuple
+
+from cardio_app.logic.program import Program
+from cardio_app.logic.program_cache import metrics_fingerprint
+from cardio_app.logic.program_templates import template_index
+
+MIN_WEEKS, MAX_WEEKS = 8, 16
+DELOAD_EVERY = 4
+
+# Session mix per phase, cycled through for the week's session count;
+# deload weeks drop one session
+PHASE_SESSIONS = {
+    "Base": ("endurance", "power_endurance", "endurance"),
+    "Build": ("endurance", "power_endurance", "explosive"),
+    "Peak": ("power_endurance", "explosive", "endurance"),
+    "Deload": ("endurance", "power_endurance"),
+}
+
+SHORT_NAMES = {"explosive": "Exp", "power_endurance": "PE", "endurance": "End"}
+
+# Training types whose programs read num_sprints and the intensities; the
+# others are shared between weeks whatever those are
+PROGRESSED_TYPES = ("explosive",)
+
+
+class PlannedSession(NamedTuple):
+    week: int            # 1-based
+    day: int             # 1-7 within the week
+    phase: str
+    training_type: str
+    duration: int        # minutes
+    num_sprints: int
+    max_intensity: float
+    program: Program
+
+
+def week_phase(week, weeks):
+    """Phase of a 1-based week in a plan of the given length"""
+    if week % DELOAD_EVERY == 0:
+        return "Deload"
+    progress = (week - 1) / (weeks - 1)
+    if progress < 0.4:
+        return "Base"
+    return "Build" if progress < 0.75 else "Peak"
+
+
+def _session_days(sessions_per_week):
+    """Spread sessions over a 7-day week (3 sessions -> days 1, 3, 5)"""
+    return [1 + (i * 7) // sessions_per_week for i in range(sessions_per_week)]
+
+
+def generate_plan(metrics, max_speed, unit="mph", weeks=12, sessions_per_week=3,
+                  base_duration=20, duration_step=2, max_duration=60,
+                  start_intensity=0.85, peak_intensity=0.95, programs=None):
+    """
+    Yield the PlannedSession of every session in a periodized plan.
+
+    metrics: calculate_metrics output (thresholds feed the builder)
+    max_speed: highest ramp test speed
+    programs: optional dict shared across plans (and athletes) to deduplicate
+              programs; keys include the metrics fingerprint and max speed
+              like ProgramCache, one is created per plan otherwise
+    """
+    if not MIN_WEEKS <= weeks <= MAX_WEEKS:
+        raise ValueError(f"weeks must be between {MIN_WEEKS} and {MAX_WEEKS}, got {weeks}")
+    if not 1 <= sessions_per_week <= 7:
+        raise ValueError("sessions_per_week must be between 1 and 7")
+
+    aerobic = metrics.get(f"Aerobic Threshold ({unit})")
+    anaerobic = metrics.get(f"Anaerobic Threshold ({unit})")
+    recovery = aerobic if aerobic else 6.0  # same fallback as the report
+    programs = {} if programs is None else programs
+    fingerprint = metrics_fingerprint(metrics)
+    days = _session_days(sessions_per_week)
+
+    loading_week = 0  # counts non-deload weeks, which drive progression
+    for week in range(1, weeks + 1):
+        phase = week_phase(week, weeks)
+        if phase == "Deload":
+            week_duration = max(10, round((base_duration + (loading_week - 1) * duration_step) * 0.6))
+            intensity = start_intensity
+            num_sprints = 4
+            week_sessions = max(1, sessions_per_week - 1)
+        else:
+            week_duration = min(max_duration, base_duration + loading_week * duration_step)
+            progress = loading_week / max(1, weeks - weeks // DELOAD_EVERY - 1)
+            intensity = round(start_intensity + (peak_intensity - start_intensity) * progress, 2)
+            num_sprints = 6 + (2 if phase == "Peak" else 0)
+            week_sessions = sessions_per_week
+            loading_week += 1
+
+        mix = PHASE_SESSIONS[phase]
+        session_types = [mix[i % len(mix)] for i in range(week_sessions)]
+        for day, training_type in zip(days, session_types):
+            # Explosive work is shorter; the rest of the session is recovery
+            duration = max(10, week_duration * 2 // 3) if training_type == "explosive" else week_duration
+            progression = (num_sprints, intensity) if training_type in PROGRESSED_TYPES else ()
+            key = (training_type, duration, *progression, fingerprint, float(max_speed), unit)
+            program = programs.get(key)
+            if program is None:
+                program = programs[key] = template_index.build_program(
+                    training_type, duration, max_speed, recovery,
+                    aerobic_thres=aerobic, anaerobic_thres=anaerobic, unit=unit,
+                    num_sprints=num_sprints, start_intensity=round(intensity - 0.2, 2),
+                    max_intensity=intensity,
+                )
+            yield PlannedSession(week, day, phase, training_type, duration, num_sprints, intensity, program)
+
+
+def plan_summary(sessions):
+    """
+    Collapse sessions into one row per week:
+    (week, phase, "End 20' / PE 20' / Exp 13'", total minutes).
+    Consumes the iterable once, so it works on generate_plan() directly.
+    """
+    rows, current = [], None
+    for session in sessions:
+        if current is None or current[0] != session.week:
+            current = [session.week, session.phase, [], 0]
+            rows.append(current)
+        current[2].append(f"{SHORT_NAMES.get(session.training_type, session.training_type)} {session.duration}'")
+        current[3] += session.duration
+    return [(week, phase, " / ".join(parts), total) for week, phase, parts, total in rows]
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Program representation shared by the builder, reports and GUI.
+
+A Program is an immutable sequence of Interval rows that still iterates,
+indexes and compares like the historical list of
+(label, duration, start_time, speed) tuples, but precomputes the totals
+every consumer used to re-derive.
+"""
+
+from array import array
+from typing import NamedTuple
+
+
+class Interval(NamedTuple):
+    label: str
+    duration: float
+    start_time: float
+    speed: float
+
+
+class Program:
+    __slots__ = ("intervals", "cumulative_times", "total_duration", "max_speed")
+
+    def __init__(self, intervals=()):
+        self.intervals = tuple(row if isinstance(row, Interval) else Interval(*row) for row in intervals)
+
+        # cumulative_times[i] is the elapsed time before interval i; the last
+        # entry is the total, so plots get their real-time ticks in O(n)
+        elapsed = 0
+        cumulative = array('d', [0.0])
+        for interval in self.intervals:
+            elapsed += float(interval.duration)
+            cumulative.append(elapsed)
+        self.cumulative_times = cumulative
+        self.total_duration = elapsed
+        self.max_speed = max((i.speed for i in self.intervals), default=None)
+
+    @classmethod
+    def _from_parts(cls, intervals, cumulative_times, total_duration):
+        """Build from a tuple of Interval rows whose timeline is already known"""
+        program = cls.__new__(cls)
+        program.intervals = intervals
+        program.cumulative_times = array('d', cumulative_times)
+        program.total_duration = total_duration
+        program.max_speed = max([i.speed for i in intervals]) if intervals else None
+        return program
+
+    @classmethod
+    def coerce(cls, obj):
+        """Return obj as a Program (accepts Program or any iterable of 4-tuples)"""
+        return obj if isinstance(obj, cls) else cls(obj)
+
+    def __iter__(self):
+        return iter(self.intervals)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Program(self.intervals[index])
+        return self.intervals[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Program):
+            return self.intervals == other.intervals
+        try:
+            return self.intervals == tuple(tuple(row) for row in other)
+        except TypeError:
+            return NotImplemented
+
+    def __hash__(self):
+        return hash(self.intervals)
+
+    def __repr__(self):
+        return f"Program({list(self.intervals)!r})"
+
+    @property
+    def labels(self):
+        return [i.label for i in self.intervals]
+
+    @property
+    def speeds(self):
+        return [i.speed for i in self.intervals]
@@ -3,6 +3,8 @@
 Program builder logic
 """
 
+from cardio_app.logic.program import Program
+
 class CardioProgramBuilder:
     def __init__(self, total_time, max_speed, recovery_speed,
                  aerobic_thres=None, anaerobic_thres=None, wingate_peak_speed=None, unit='mph'):
@@ -38,6 +40,12 @@ class CardioProgramBuilder:
     def build_program(self, training_type, num_sprints=6,
                       start_intensity=0.7, max_intensity=0.9,
                       wingate_peak_speed=None):
+        return Program(self._build_intervals(training_type, num_sprints, start_intensity,
+                                             max_intensity, wingate_peak_speed))
+
+    def _build_intervals(self, training_type, num_sprints, start_intensity, max_intensity,
+                         wingate_peak_speed):
+        """Append every interval for training_type to self.program and return it"""
         self.add_warmup()
         if training_type == "explosive":
             if wingate_peak_speed is None:
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Memoized metrics and programs for incremental report generation.
+
+Metrics are cached per ramp/Wingate dataset and programs per
+(training_type, duration, metrics fingerprint, max speed, unit), all keyed
+on content hashes. Changing any input changes the key, so stale entries
+are never served; they simply age out of the LRU.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from cardio_app.instrumentation import incr
+from cardio_app.logic.metrics import calculate_metrics_fast
+from cardio_app.logic.program_templates import template_index
+
+DEFAULT_MAX_SPEED = 12  # used when there is no ramp data
+
+
+def _digest(payload):
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=float)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def dataset_fingerprint(ramp, wingate, unit):
+    """Hash of the ramp (RampData) and Wingate (WingateData or None) inputs"""
+    return _digest({
+        "unit": unit,
+        "ramp": [list(ramp.speeds), list(ramp.rpe)] if ramp is not None else None,
+        "wingate": [list(wingate.times), list(wingate.speeds)] if wingate is not None else None,
+    })
+
+
+def metrics_fingerprint(metrics):
+    """Hash of a calculate_metrics result"""
+    return _digest(metrics)
+
+
+def ramp_max_speed(ramp):
+    return max(ramp.speeds) if ramp is not None and len(ramp) > 0 else DEFAULT_MAX_SPEED
+
+
+def build_program(training, metrics, max_speed, unit):
+    """Build one training program from the client's metrics"""
+    aerobic_thres = metrics.get(f"Aerobic Threshold ({unit})")
+    # Same arguments as CardioProgramBuilder (which never reads its
+    # wingate_peak_speed); the template index returns an identical Program
+    # from a precomputed interval skeleton
+    return template_index.build_program(
+        training["training_type"],
+        total_time=training["duration"],
+        max_speed=max_speed,
+        aerobic_thres=aerobic_thres,
+        anaerobic_thres=metrics.get(f"Anaerobic Threshold ({unit})"),
+        recovery_speed=aerobic_thres if aerobic_thres else 6.0,  # fallback if not available
+        unit=unit
+    )
+
+
+class ProgramCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._metrics = OrderedDict()   # (dataset fingerprint, threshold method) -> (metrics, metrics fingerprint)
+        self._programs = OrderedDict()  # program key -> Program
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def metrics(self, ramp, wingate, unit, threshold_method="band"):
+        """Return (metrics dict, metrics fingerprint) for a dataset, computing it once"""
+        key = (dataset_fingerprint(ramp, wingate, unit), threshold_method)
+        entry = self._lookup(self._metrics, key, "metrics")
+        if entry is None:
+            metrics = calculate_metrics_fast(ramp, wingate, unit, threshold_method)
+            entry = (metrics, metrics_fingerprint(metrics))
+            self._store(self._metrics, key, entry)
+        # Callers get their own dict; the cached one stays pristine
+        return dict(entry[0]), entry[1]
+
+    def program(self, training, metrics, fingerprint, max_speed, unit):
+        """Return the Program for one training, building it once per input set"""
+        key = (training["training_type"], int(training["duration"]), fingerprint, float(max_speed), unit)
+        program = self._lookup(self._programs, key, "program")
+        if program is None:
+            program = build_program(training, metrics, max_speed, unit)
+            self._store(self._programs, key, program)
+        return program
+
+    def stats(self):
+        with self._lock:
+            return {"metrics_entries": len(self._metrics), "program_entries": len(self._programs),
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._metrics.clear()
+            self._programs.clear()
+            self.hits = self.misses = 0
+
+    def _lookup(self, entries, key, kind):
+        with self._lock:
+            value = entries.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                entries.move_to_end(key)
+                self.hits += 1
+        if value is None:
+            incr("program_cache_misses", kind=kind)
+        else:
+            incr("program_cache_hits", kind=kind)
+        return value
+
+    def _store(self, entries, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entries[key] = value
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+
+program_cache = ProgramCache(max_entries=int(os.environ.get("CARDIO_PROGRAM_CACHE_SIZE", "512")))
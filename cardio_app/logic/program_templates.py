@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed program templates.
+
+A program's interval structure (labels, durations, start times) depends
+only on the training type, duration, sprint count and intensities; only
+the speeds depend on the client. A template is recorded once by running
+CardioProgramBuilder with symbolic speeds, which captures every speed as
+an expression over the client inputs (max speed, recovery speed,
+thresholds). Building a program is then an index lookup plus evaluating
+those expressions with the same float operations the builder performs,
+so the result is identical to CardioProgramBuilder.build_program.
+
+Templates are built on first use, or all at once with precompute(), and
+can be saved to / loaded from JSON (CARDIO_TEMPLATE_FILE).
+
+Usage:
+    python -m cardio_app.logic.program_templates --save templates.json
+"""
+
+import argparse
+import json
+import os
+import threading
+from itertools import repeat
+
+from cardio_app.logic.program import Interval, Program
+from cardio_app.logic.program_builder import CardioProgramBuilder
+
+TEMPLATE_VERSION = 1
+
+TRAINING_TYPES = ("explosive", "power_endurance", "endurance")
+
+# Client inputs a template's speeds can refer to, in register order
+SYMBOLS = ("max_speed", "recovery_speed", "aerobic_thres", "anaerobic_thres", "wingate_peak_speed")
+
+
+class _SpeedRef:
+    """Symbolic speed recorded while a template is built"""
+    __slots__ = ("op", "args")
+
+    def __init__(self, op, *args):
+        self.op = op
+        self.args = args
+
+    def __add__(self, other):
+        return _SpeedRef("add", self, other)
+
+    def __radd__(self, other):
+        return _SpeedRef("add", other, self)
+
+    def __sub__(self, other):
+        return _SpeedRef("sub", self, other)
+
+    def __rsub__(self, other):
+        return _SpeedRef("sub", other, self)
+
+    def __mul__(self, other):
+        return _SpeedRef("mul", self, other)
+
+    def __rmul__(self, other):
+        return _SpeedRef("mul", other, self)
+
+    def __truediv__(self, other):
+        return _SpeedRef("div", self, other)
+
+    def __rtruediv__(self, other):
+        return _SpeedRef("div", other, self)
+
+
+class _TemplateRecorder(CardioProgramBuilder):
+    def _round_speed(self, speed):
+        if isinstance(speed, _SpeedRef):
+            return _SpeedRef("round", speed)
+        return super()._round_speed(speed)
+
+
+def template_key(training_type, duration_min, num_sprints=6, start_intensity=0.7,
+                 max_intensity=0.9, unit="mph", explicit_peak=False):
+    return (training_type, duration_min, num_sprints, start_intensity, max_intensity,
+            unit.lower(), bool(explicit_peak))
+
+
+class ProgramTemplate:
+    """
+    Interval skeleton plus a flat list of speed operations.
+
+    Registers 0..len(SYMBOLS)-1 hold the client inputs, followed by the
+    constants; each op appends one register, and every row names the
+    register holding its speed.
+    """
+    __slots__ = ("key", "rows", "consts", "ops", "timeline", "_columns")
+
+    def __init__(self, key, rows, consts, ops):
+        self.key = key
+        self.rows = rows      # [(label, duration, start_time, register)]
+        self.consts = consts  # [float]
+        self.ops = ops        # [(op, register, register or digits)]
+        # The timeline does not depend on speeds; work it out once
+        timeline = Program([(label, duration, start_time, 0.0) for label, duration, start_time, _ in rows])
+        self.timeline = (timeline.cumulative_times, timeline.total_duration)
+        labels, durations, start_times, registers = zip(*rows) if rows else ((), (), (), ())
+        self._columns = (labels, durations, start_times, registers)
+
+    @classmethod
+    def record(cls, key):
+        training_type, duration_min, num_sprints, start_intensity, max_intensity, unit, explicit_peak = key
+        recorder = _TemplateRecorder(
+            total_time=duration_min,
+            max_speed=_SpeedRef("sym", "max_speed"),
+            recovery_speed=_SpeedRef("sym", "recovery_speed"),
+            aerobic_thres=_SpeedRef("sym", "aerobic_thres"),
+            anaerobic_thres=_SpeedRef("sym", "anaerobic_thres"),
+            unit=unit,
+        )
+        peak = _SpeedRef("sym", "wingate_peak_speed") if explicit_peak else None
+        intervals = recorder._build_intervals(training_type, num_sprints, start_intensity,
+                                              max_intensity, peak)
+        return cls._compile(key, intervals)
+
+    @classmethod
+    def _compile(cls, key, intervals):
+        consts, nodes, positions = [], [], {}
+
+        def const_index(value):
+            # Keep int and float constants apart: 2 and 2.0 print differently
+            for i, const in enumerate(consts):
+                if type(const) is type(value) and const == value:
+                    return i
+            consts.append(value)
+            return len(consts) - 1
+
+        def visit(value):
+            if not isinstance(value, _SpeedRef):
+                const_index(value)
+            elif value.op != "sym" and id(value) not in positions:
+                for arg in value.args:
+                    visit(arg)
+                positions[id(value)] = len(nodes)
+                nodes.append(value)
+
+        for interval in intervals:
+            visit(interval[3])
+
+        # Registers: symbols, then constants, then one per operation
+        base = len(SYMBOLS) + len(consts)
+
+        def register(value):
+            if not isinstance(value, _SpeedRef):
+                return len(SYMBOLS) + const_index(value)
+            if value.op == "sym":
+                return SYMBOLS.index(value.args[0])
+            return base + positions[id(value)]
+
+        ops = [("round", register(node.args[0]), 1) if node.op == "round"
+               else (node.op, register(node.args[0]), register(node.args[1]))
+               for node in nodes]
+        rows = [(label, duration, start_time, register(speed))
+                for label, duration, start_time, speed in intervals]
+        return cls(key, rows, consts, ops)
+
+    def instantiate(self, values):
+        """Return the Program for {symbol: value}"""
+        regs = [values.get(name) for name in SYMBOLS]
+        regs.extend(self.consts)
+        for op, a, b in self.ops:
+            if op == "round":
+                regs.append(round(regs[a], b))
+            elif op == "mul":
+                regs.append(regs[a] * regs[b])
+            elif op == "add":
+                regs.append(regs[a] + regs[b])
+            elif op == "div":
+                regs.append(regs[a] / regs[b])
+            else:
+                regs.append(regs[a] - regs[b])
+        # Rows are assembled column-wise so the per-interval work stays in C
+        labels, durations, start_times, registers = self._columns
+        speeds = [regs[reg] for reg in registers]
+        intervals = tuple(map(tuple.__new__, repeat(Interval), zip(labels, durations, start_times, speeds)))
+        return Program._from_parts(intervals, *self.timeline)
+
+    def to_json(self):
+        return {"key": list(self.key), "rows": [list(row) for row in self.rows],
+                "consts": self.consts, "ops": [list(op) for op in self.ops]}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(tuple(data["key"]), [tuple(row) for row in data["rows"]], list(data["consts"]),
+                   [tuple(op) for op in data["ops"]])
+
+
+class TemplateIndex:
+    """Templates keyed by template_key(); missing ones are recorded on first use"""
+
+    def __init__(self):
+        self._templates = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, key):
+        template = self._templates.get(key)
+        if template is None:
+            template = ProgramTemplate.record(key)
+            with self._lock:
+                self._templates[key] = template
+        return template
+
+    def precompute(self, durations=range(5, 121), training_types=TRAINING_TYPES, units=("mph", "kmh")):
+        """Record every (type, duration, unit) template with the default sprint settings"""
+        for training_type in training_types:
+            for duration in durations:
+                for unit in units:
+                    self.get(template_key(training_type, duration, unit=unit))
+        return self
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": TEMPLATE_VERSION,
+                       "templates": [t.to_json() for t in self._templates.values()]}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls()
+        if data.get("version") == TEMPLATE_VERSION:
+            for item in data["templates"]:
+                template = ProgramTemplate.from_json(item)
+                index._templates[template.key] = template
+        return index
+
+    def build_program(self, training_type, total_time, max_speed, recovery_speed,
+                      aerobic_thres=None, anaerobic_thres=None, unit="mph", num_sprints=6,
+                      start_intensity=0.7, max_intensity=0.9, wingate_peak_speed=None):
+        """Same arguments and result as CardioProgramBuilder(...).build_program(...)"""
+        # The builder validates these before it derives any speed
+        if training_type == "explosive" and wingate_peak_speed is None and max_speed is None:
+            raise ValueError("Cannot compute wingate peak speed: max_speed is not defined.")
+        if training_type == "endurance" and (aerobic_thres is None or anaerobic_thres is None):
+            raise ValueError("Aerobic and anaerobic thresholds are required for endurance mode.")
+
+        key = template_key(training_type, total_time, num_sprints, start_intensity, max_intensity,
+                           unit, wingate_peak_speed is not None)
+        return self.get(key).instantiate({
+            "max_speed": max_speed,
+            "recovery_speed": recovery_speed,
+            "aerobic_thres": aerobic_thres,
+            "anaerobic_thres": anaerobic_thres,
+            "wingate_peak_speed": wingate_peak_speed,
+        })
+
+
+def _default_index():
+    path = os.environ.get("CARDIO_TEMPLATE_FILE")
+    if path and os.path.exists(path):
+        return TemplateIndex.load(path)
+    return TemplateIndex()
+
+
+template_index = _default_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute program templates to a JSON file.")
+    parser.add_argument("--save", required=True, metavar="PATH")
+    parser.add_argument("--max-duration", type=int, default=120, help="Longest duration in minutes")
+    args = parser.parse_args(argv)
+
+    index = TemplateIndex().precompute(durations=range(5, args.max_duration + 1))
+    index.save(args.save)
+    print(f"Saved {len(index)} templates to {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Lightweight ramp and Wingate test data.
+
+A single client's tests are a few dozen numbers, so they are held as plain
+tuples of floats instead of DataFrames. DataFrames are still accepted and
+produced at the edges (coerce / to_dataframe); pandas is only imported when
+one is actually requested.
+"""
+
+
+def _speed_key(columns, unit):
+    return f"Speed ({unit})" if f"Speed ({unit})" in columns else "Speed"
+
+
+def _is_dataframe(obj):
+    return hasattr(obj, "columns") and hasattr(obj, "to_dict")
+
+
+class RampData:
+    """Ramp test as parallel tuples of speeds and RPE values, in test order"""
+    __slots__ = ("speeds", "rpe")
+
+    def __init__(self, speeds, rpe):
+        self.speeds = tuple(float(s) for s in speeds)
+        self.rpe = tuple(float(r) for r in rpe)
+        if len(self.speeds) != len(self.rpe):
+            raise ValueError("Ramp speeds and RPE values must have the same length.")
+
+    def __len__(self):
+        return len(self.speeds)
+
+    def __eq__(self, other):
+        return isinstance(other, RampData) and self.speeds == other.speeds and self.rpe == other.rpe
+
+    def __repr__(self):
+        return f"RampData(speeds={self.speeds!r}, rpe={self.rpe!r})"
+
+    @property
+    def empty(self):
+        return not self.speeds
+
+    @classmethod
+    def from_records(cls, data, unit="mph"):
+        """Build from [{"Speed": .., "RPE": ..}, ...] or {"Speed": [...], "RPE": [...]}"""
+        if not data:
+            return cls((), ())
+        if isinstance(data, dict):
+            key = _speed_key(data, unit)
+            return cls(data[key], data["RPE"])
+        key = _speed_key(data[0], unit)
+        return cls((row[key] for row in data), (row["RPE"] for row in data))
+
+    @classmethod
+    def from_dataframe(cls, df, unit="mph"):
+        if df is None or df.empty:
+            return cls((), ())
+        key = _speed_key(df.columns, unit)
+        return cls(df[key].tolist(), df["RPE"].tolist())
+
+    @classmethod
+    def coerce(cls, obj, unit="mph"):
+        """Return obj as RampData (accepts RampData, DataFrame, records or None)"""
+        if obj is None or isinstance(obj, cls):
+            return obj
+        if _is_dataframe(obj):
+            return cls.from_dataframe(obj, unit)
+        return cls.from_records(obj, unit)
+
+    def to_records(self):
+        return [{"Speed": s, "RPE": r} for s, r in zip(self.speeds, self.rpe)]
+
+    def to_columns(self):
+        return {"Speed": list(self.speeds), "RPE": list(self.rpe)}
+
+    def to_dataframe(self):
+        import pandas as pd
+        return pd.DataFrame(self.to_columns(), columns=["Speed", "RPE"])
+
+
+class WingateData:
+    """Wingate test as parallel tuples of sample times (s) and speeds"""
+    __slots__ = ("times", "speeds")
+
+    def __init__(self, times, speeds):
+        self.times = tuple(times)
+        self.speeds = tuple(float(s) for s in speeds)
+        if len(self.times) != len(self.speeds):
+            raise ValueError("Wingate times and speeds must have the same length.")
+
+    def __len__(self):
+        return len(self.speeds)
+
+    def __eq__(self, other):
+        return isinstance(other, WingateData) and self.times == other.times and self.speeds == other.speeds
+
+    def __repr__(self):
+        return f"WingateData(times={self.times!r}, speeds={self.speeds!r})"
+
+    @property
+    def empty(self):
+        return not self.speeds
+
+    @classmethod
+    def from_speeds(cls, speeds, interval=5):
+        speeds = list(speeds)
+        return cls([i * interval for i in range(len(speeds))], speeds)
+
+    @classmethod
+    def from_records(cls, data, unit="mph"):
+        """Build from collect_wingate_test records or a {"Speed": [...]} dict"""
+        if not data:
+            return cls((), ())
+        if isinstance(data, dict):
+            speeds = data[_speed_key(data, unit)]
+            times = data.get("Time (s)", data.get("Time"))
+            return cls(times if times is not None else [i * 5 for i in range(len(speeds))], speeds)
+        key = _speed_key(data[0], unit)
+        time_key = "Time (s)" if "Time (s)" in data[0] else "Time"
+        return cls((row.get(time_key, i * 5) for i, row in enumerate(data)), (row[key] for row in data))
+
+    @classmethod
+    def from_dataframe(cls, df, unit="mph"):
+        if df is None or df.empty:
+            return cls((), ())
+        return cls.from_records(df.to_dict(orient="list"), unit)
+
+    @classmethod
+    def coerce(cls, obj, unit="mph"):
+        """Return obj as WingateData (accepts WingateData, DataFrame, records or None)"""
+        if obj is None or isinstance(obj, cls):
+            return obj
+        if _is_dataframe(obj):
+            return cls.from_dataframe(obj, unit)
+        return cls.from_records(obj, unit)
+
+    def to_records(self, unit="mph"):
+        speed_col = f"Speed ({unit})"
+        return [{"Time (s)": t, speed_col: s} for t, s in zip(self.times, self.speeds)]
+
+    def to_columns(self, unit="mph"):
+        return {"Time (s)": list(self.times), f"Speed ({unit})": list(self.speeds)}
+
+    def to_dataframe(self, unit="mph"):
+        import pandas as pd
+        return pd.DataFrame({"Time (s)": list(self.times), f"Speed ({unit})": list(self.speeds)})
@@ -12,43 +12,63 @@ Schedule planning (if you want to extend scheduling features)
 
 
 
-import pandas as pd
-import matplotlib.pyplot as plt
-import os
+from io import BytesIO
+from cardio_app.logic.periodization import plan_summary
+from cardio_app.reports.pdf_tables import draw_table
+from cardio_app.reports.figure_pool import figure_pool
+from cardio_app.reports.pdf_resources import resource_cache
 
-def append_schedule_to_pdf(pdf_obj, schedule_table, filename):
+def append_schedule_to_pdf(pdf_obj, schedule_table, filename, font_family="Arial"):
     """
     Appends a schedule table as a last page to an existing FPDF pdf_obj
     and saves it to filename.
     
     schedule_table: list of tuples (e.g. [("Session", "Assigned Program"), ...])
     """
+    import pandas as pd
+
     # Convert to DataFrame for easy table plotting
     df = pd.DataFrame(schedule_table[1:], columns=schedule_table[0])
     
-    fig, ax = plt.subplots(figsize=(8, max(2, len(df)*0.3)))
-    ax.axis('off')
+    img = BytesIO()
+    with figure_pool.acquire((8, max(2, len(df)*0.3))) as (fig, ax):
+        ax.axis('off')
 
-    table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
-    table.auto_set_font_size(False)
-    table.set_fontsize(12)
-    table.scale(1, 1.2)
+        table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
+        table.auto_set_font_size(False)
+        table.set_fontsize(12)
+        table.scale(1, 1.2)
 
-    for (row, _), cell in table.get_celld().items():
-        if row == 0:
-            cell.set_fontsize(14)
-            cell.set_text_props(weight='bold')
-            cell.set_facecolor("#ADD8E6")
+        for (row, _), cell in table.get_celld().items():
+            if row == 0:
+                cell.set_fontsize(14)
+                cell.set_text_props(weight='bold')
+                cell.set_facecolor("#ADD8E6")
 
-    plt.tight_layout()
-    tmp_img = "temp_schedule_table.png"
-    fig.savefig(tmp_img, dpi=300, bbox_inches='tight')
-    plt.close(fig)
+        fig.tight_layout()
+        fig.savefig(img, format='png', dpi=300, bbox_inches='tight')
+    img.seek(0)
 
     pdf_obj.add_page()
-    pdf_obj.set_font("Arial", 'B', 16)
+    pdf_obj.set_font(font_family, 'B', 16)
     pdf_obj.cell(0, 12, "Monthly Schedule", ln=True, align="C")
-    pdf_obj.image(tmp_img, x=10, w=190)
-    os.remove(tmp_img)
+    resource_cache.image(pdf_obj, img, x=10, w=190)
 
     print(f"Schedule page appended and saved to: {filename}")
+
+
+def append_plan_summary_to_pdf(pdf_obj, sessions, title="Periodized Training Plan", font_family="Arial"):
+    """
+    Appends a one-row-per-week summary of a periodized plan (see
+    periodization.generate_plan) to pdf_obj, drawn natively with FPDF
+    cells. sessions may be the generator itself; it is consumed once.
+    """
+    rows = [[str(week), phase, sessions_text, f"{total} min"]
+            for week, phase, sessions_text, total in plan_summary(sessions)]
+
+    pdf_obj.add_page()
+    pdf_obj.set_font(font_family, 'B', 16)
+    pdf_obj.cell(0, 12, title, ln=True, align="C")
+    pdf_obj.ln(3)
+    draw_table(pdf_obj, ["Week", "Phase", "Sessions", "Total"], rows, [15, 25, 120, 30],
+               x=10, font_size=9, row_height=6, font_family=font_family)
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Curve-fitting threshold engine for ramp tests.
+
+The default "band" method (calculate_metrics) averages the speeds whose RPE
+falls strictly inside the aerobic (2-6) or anaerobic (6-9) band, and has no
+answer when a test skips a band. The methods here fit the Speed/RPE curve
+instead and read each threshold off it at the middle of its band
+(AEROBIC_RPE, ANAEROBIC_RPE):
+
+    linear     least-squares line RPE = a + b * speed
+    logistic   logistic curve RPE ~ 10 / (1 + exp(-k * (speed - s0))), fitted
+               by least squares on the logit of the RPE
+    piecewise  linear interpolation between the test steps along the
+               running maximum of the RPE (RPE never drops during a ramp)
+
+Every fit works on 2-D (tests x steps) arrays padded with NaN, so a whole
+cohort is fitted with one set of array operations. Fitted thresholds are
+clipped to the speeds the test actually covered; a test whose curve never
+reaches a threshold (too few steps, flat or falling RPE) gets NaN.
+"""
+
+import numpy as np
+
+BAND_METHOD = "band"
+FIT_METHODS = ("linear", "logistic", "piecewise")
+THRESHOLD_METHODS = (BAND_METHOD,) + FIT_METHODS
+
+AEROBIC_RPE = 4.0    # middle of the 2-6 aerobic band
+ANAEROBIC_RPE = 7.5  # middle of the 6-9 anaerobic band
+RPE_MAX = 10
+
+
+def check_method(method):
+    """Return the normalized threshold method, or raise ValueError"""
+    name = (method or BAND_METHOD).lower()
+    if name not in THRESHOLD_METHODS:
+        raise ValueError(f"Unknown threshold method {method!r}; expected one of {', '.join(THRESHOLD_METHODS)}")
+    return name
+
+
+def pad_groups(values, starts, counts):
+    """
+    Lay contiguous groups of a 1-D array out as rows of a NaN-padded
+    (n_groups x longest group) array.
+    """
+    values = np.asarray(values, dtype=float)
+    width = int(counts.max()) if len(counts) else 0
+    steps = np.arange(width)
+    mask = steps < counts[:, None]
+    if not len(values):
+        return np.full(mask.shape, np.nan)
+    idx = np.minimum(starts[:, None] + steps, len(values) - 1)
+    return np.where(mask, values[idx], np.nan)
+
+
+def pad_tests(tests):
+    """(speeds, rpe) pairs of any lengths -> NaN-padded 2-D speed and RPE arrays"""
+    counts = np.array([len(speeds) for speeds, _ in tests], dtype=int)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(int)
+    speeds = np.concatenate([np.asarray(s, dtype=float) for s, _ in tests]) if tests else np.empty(0)
+    rpe = np.concatenate([np.asarray(r, dtype=float) for _, r in tests]) if tests else np.empty(0)
+    return pad_groups(speeds, starts, counts), pad_groups(rpe, starts, counts)
+
+
+def _logit(rpe):
+    # Shift RPE 0..10 into (0, 1) so the end points stay finite
+    p = (np.asarray(rpe, dtype=float) + 0.5) / (RPE_MAX + 1)
+    return np.log(p / (1 - p))
+
+
+def _least_squares(x, y, valid):
+    """Per-row slope and intercept of y ~ x over the valid cells; NaN when undetermined"""
+    n = valid.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x0 = np.where(valid, x, 0.0)
+        y0 = np.where(valid, y, 0.0)
+        mean_x = x0.sum(axis=1) / n
+        mean_y = y0.sum(axis=1) / n
+        dx = np.where(valid, x - mean_x[:, None], 0.0)
+        dy = np.where(valid, y - mean_y[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = (dx * dy).sum(axis=1) / sxx
+        # Only a rising curve crosses each threshold exactly once
+        slope = np.where((n >= 2) & (sxx > 0) & (slope > 0), slope, np.nan)
+    return slope, mean_y - slope * mean_x
+
+
+def _invert_line(slope, intercept, levels):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (np.asarray(levels)[None, :] - intercept[:, None]) / slope[:, None]
+
+
+def _interpolate(speeds, rpe, valid, targets):
+    """Speed where the running-max RPE first reaches each target, interpolated between steps"""
+    n_tests = speeds.shape[0]
+    rows = np.arange(n_tests)
+    curve = np.maximum.accumulate(np.where(valid, rpe, -np.inf), axis=1)
+    out = np.full((n_tests, len(targets)), np.nan)
+    if not speeds.shape[1]:
+        return out
+    for i, target in enumerate(targets):
+        reached = curve >= target
+        hit = reached.any(axis=1)
+        j = reached.argmax(axis=1)
+        prev = np.maximum(j - 1, 0)
+        s1, s0 = speeds[rows, j], speeds[rows, prev]
+        r1, r0 = curve[rows, j], curve[rows, prev]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            # r0 < target <= r1 whenever j > 0; a test that starts above it gets its first speed
+            speed = np.where(j > 0, s0 + (target - r0) / (r1 - r0) * (s1 - s0), s1)
+        out[:, i] = np.where(hit, speed, np.nan)
+    return out
+
+
+def fit_thresholds(speeds, rpe, method="piecewise", targets=(AEROBIC_RPE, ANAEROBIC_RPE)):
+    """
+    Fit every ramp test and return the threshold speeds.
+
+    Parameters:
+    - speeds, rpe: (n_tests, n_steps) arrays, one test per row in test
+                   order, padded with NaN (see pad_tests / pad_groups).
+    - method: 'linear', 'logistic' or 'piecewise'.
+    - targets: RPE levels to read speeds at (aerobic, anaerobic by default).
+
+    Returns:
+    - (n_tests, len(targets)) array of speeds, NaN where a test has no fit.
+    """
+    method = check_method(method)
+    if method == BAND_METHOD:
+        raise ValueError("The band method averages speeds per band; it has no fitted curve")
+    speeds = np.atleast_2d(np.asarray(speeds, dtype=float))
+    rpe = np.atleast_2d(np.asarray(rpe, dtype=float))
+    valid = ~(np.isnan(speeds) | np.isnan(rpe))
+    targets = np.asarray(targets, dtype=float)
+
+    if method == "piecewise":
+        fitted = _interpolate(speeds, rpe, valid, targets)
+    elif method == "linear":
+        fitted = _invert_line(*_least_squares(speeds, rpe, valid), targets)
+    else:
+        fitted = _invert_line(*_least_squares(speeds, _logit(np.where(valid, rpe, 0.0)), valid), _logit(targets))
+
+    low = np.where(valid, speeds, np.inf).min(axis=1, initial=np.inf)
+    high = np.where(valid, speeds, -np.inf).max(axis=1, initial=-np.inf)
+    return np.clip(fitted, low[:, None], high[:, None])
+
+
+def threshold_speeds(speeds, rpe, method):
+    """(aerobic, anaerobic) threshold speeds of a single ramp test, None where there is no fit"""
+    fitted = fit_thresholds([list(speeds)], [list(rpe)], method)[0]
+    return tuple(None if np.isnan(value) else float(value) for value in fitted)
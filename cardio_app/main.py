@@ -1,4 +1,5 @@
 import tkinter as tk
+import uuid
 from tkinter import messagebox
 from cardio_app.gui.unit_selection_frame import UnitSelectionFrame
 from cardio_app.gui.name_input_frame import NameInputFrame
@@ -7,11 +8,16 @@ from cardio_app.gui.wingate_input_frame import WingateInputFrame
 from cardio_app.gui.result_frame import ResultFrame
 from cardio_app.gui.training_type_frame import TrainingTypeFrame
 from cardio_app.gui.unit_selection_frame import UnitSelectionFrame
-from cardio_app.reports.pdf_report import PDFReportBuilder
+from cardio_app.gui.report_worker import ReportJob, ReportProgressDialog, run_in_background
+from cardio_app.reports.pdf_report import PDFReportBuilder, ReportCancelled, prerender_cover
 from cardio_app.reports.pdf_utils_common import ask_save_filepath
+from cardio_app.logic.history_store import history_store
 from cardio_app.logic.metrics import calculate_metrics
 from cardio_app.logic.program_builder import CardioProgramBuilder
 
+SAVING_STAGE = "Saving PDF"
+
+
 class CardioApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -29,6 +35,9 @@ class CardioApp(tk.Tk):
             "metrics": None,
             "max_speed": None,
             "wing_peak": None,
+            "history_test_id": None,
+            # One app run is one test in the athlete's history
+            "history_session": uuid.uuid4().hex,
             "all_programs": {}
         }
 
@@ -86,6 +95,9 @@ class CardioApp(tk.Tk):
             wing_peak = max_spd * 1.4  # fallback if no wingate data
 
         self.shared_data["wing_peak"] = wing_peak
+        # The inputs changed: the next built program saves the test again
+        # (same history_session, so its record is updated)
+        self.shared_data["history_test_id"] = None
 
     def build_program(self, training_type, session_time):
         metrics = self.shared_data["metrics"]
@@ -120,8 +132,33 @@ class CardioApp(tk.Tk):
         #  Merge with existing
         self.shared_data["all_programs"][training_type] = program_df
 
-    def generate_pdf_report(self):
-        # Build PDF from all collected programs and data
+        self.record_history([(training_type, session_time, program_df)])
+
+    def record_history(self, programs):
+        # Keep the test and its programs for this athlete's history
+        # (CARDIO_HISTORY_DB). Called once programs are built, when the ramp
+        # and Wingate inputs are final, so one session is one test.
+        client_name = (self.shared_data.get("client_name") or "").strip()
+        if not history_store.enabled or not client_name:
+            return
+        try:
+            if self.shared_data.get("history_test_id") is None:
+                self.shared_data["history_test_id"] = history_store.record_test(
+                    client_name, self.shared_data["unit"], self.shared_data["ramp_df"],
+                    self.shared_data.get("wingate_df"), self.shared_data["metrics"],
+                    session_id=self.shared_data.get("history_session"))
+            history_store.record_programs(self.shared_data["history_test_id"], programs)
+        except Exception as e:
+            print(f"Could not save the test to the history store: {e}")
+
+    def prerender_cover(self):
+        # Render the cover (ramp plot) on the report thread while the user
+        # goes on to the Wingate and training screens, so saving is quick
+        run_in_background(prerender_cover, self.shared_data["metrics"], self.shared_data["ramp_df"],
+                          self.shared_data["unit"])
+
+    def save_report_in_background(self, parent, filename, on_saved=None):
+        # Build and save the PDF on the report thread behind a progress dialog
         pdf_builder = PDFReportBuilder(
             metrics=self.shared_data["metrics"],
             programs=self.shared_data["all_programs"],
@@ -129,15 +166,48 @@ class CardioApp(tk.Tk):
             unit=self.shared_data["unit"],
             ramp_df=self.shared_data["ramp_df"]
         )
-        pdf_builder.build_pdf()
+
+        def work(on_progress, cancelled):
+            pdf_builder.build_pdf(on_progress=on_progress, cancelled=cancelled)
+            # Last chance to stop: once writing starts the file is saved
+            if cancelled():
+                raise ReportCancelled()
+            on_progress(1, 1, SAVING_STAGE)
+            return pdf_builder.save_pdf(filename)
+
+        def progress(done, total, stage):
+            dialog.update_progress(done, total, stage)
+            if stage == SAVING_STAGE:
+                dialog.disable_cancel()
+
+        def done(path):
+            dialog.destroy()
+            messagebox.showinfo("Success", f"PDF saved successfully:\n{path}", parent=parent)
+            if on_saved is not None:
+                on_saved()
+
+        def failed(error):
+            dialog.destroy()
+            messagebox.showerror("Error", f"The PDF report could not be built:\n{error}", parent=parent)
+
+        def cancelled():
+            dialog.destroy()
+            messagebox.showinfo("Cancelled", "Report building cancelled. Report not saved.", parent=parent)
+
+        job = None
+        dialog = ReportProgressDialog(parent, on_cancel=lambda: job.cancel())
+        job = ReportJob(self, work, on_done=done, on_error=failed,
+                        on_progress=progress, on_cancelled=cancelled)
+        return job
+
+    def generate_pdf_report(self):
+        # Build PDF from all collected programs and data
         filename = ask_save_filepath(default_name=f"{self.shared_data['client_name'].replace(' ', '_')}_cardio_report.pdf")
         if filename:
-            pdf_builder.save_pdf(filename)
-            messagebox.showinfo("Success", f"PDF saved successfully:\n{filename}", parent=self)
+            self.save_report_in_background(self, filename)
         else:
             messagebox.showinfo("Cancelled", "Save cancelled. Report not saved.", parent=self)
 
-
 def main():
     app = CardioApp()
     app.mainloop()
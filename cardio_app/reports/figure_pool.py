@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Reusable Matplotlib figures for the PNG renderers.
+
+Figures are built with the object-oriented Agg API (Figure +
+FigureCanvasAgg), so rendering never touches pyplot's global figure
+manager and is safe from several threads at once. Each thread keeps a
+few idle (figure, axes) pairs; acquire() hands one out resized to the
+requested figsize and clears it again when the block exits, so the
+figure, canvas and axes objects are built once per thread instead of
+once per plot.
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from io import BytesIO
+
+from cardio_app.instrumentation import incr
+
+
+def _new_figure(figsize):
+    # Imported here so importing the web app does not load Matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def _default_subplot_params():
+    from matplotlib import rcParams
+
+    return {side: rcParams[f"figure.subplot.{side}"]
+            for side in ("left", "right", "bottom", "top", "wspace", "hspace")}
+
+
+def save_figure_png(fig):
+    """Save a Matplotlib figure to a BytesIO PNG for FPDF; every report image goes through here"""
+    buf = BytesIO()
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
+    buf.seek(0)
+    return buf
+
+
+class FigurePool:
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self._local = threading.local()
+
+    def _idle(self):
+        idle = getattr(self._local, "idle", None)
+        if idle is None:
+            idle = self._local.idle = []
+        return idle
+
+    @contextmanager
+    def acquire(self, figsize):
+        """Yield a blank (figure, axes) pair of the given size for this thread"""
+        idle = self._idle()
+        if idle:
+            fig, ax = idle.pop()
+            fig.set_size_inches(figsize, forward=False)
+            incr("figure_pool_hits")
+        else:
+            fig, ax = _new_figure(figsize)
+            incr("figure_pool_misses")
+        try:
+            yield fig, ax
+        finally:
+            self._release(fig, ax)
+
+    def _release(self, fig, ax):
+        idle = self._idle()
+        if len(idle) >= self.max_idle:
+            return
+        try:
+            ax.cla()
+            # tight_layout() moves the axes; put them back where a new figure has them
+            defaults = _default_subplot_params()
+            if any(getattr(fig.subplotpars, k) != v for k, v in defaults.items()):
+                fig.subplots_adjust(**defaults)
+        except Exception as e:
+            print(f"Figure pool dropped a figure that could not be cleared: {e}")
+            return
+        idle.append((fig, ax))
+
+    def clear(self):
+        """Drop this thread's idle figures"""
+        self._idle().clear()
+
+
+figure_pool = FigurePool(max_idle=int(os.environ.get("CARDIO_FIGURE_POOL_SIZE", "4")))
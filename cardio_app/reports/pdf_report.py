@@ -1,89 +1,379 @@
-import tempfile
+import atexit
 import os
-from fpdf import FPDF
-from cardio_app.reports.pdf_tables import create_metrics_table_image, create_program_table_image
-from cardio_app.reports.pdf_visuals import create_program_speed_plot, create_ramp_test_plot
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from cardio_app.instrumentation import enabled as metrics_enabled, incr, timed
+from cardio_app.logic.history_store import METRIC_COLUMNS
+from cardio_app.reports.pdf_resources import register_report_font, resource_cache
+from cardio_app.reports.pdf_tables import (
+    METRICS_HEADER_FILL, create_metrics_table_image, create_program_table_image,
+    draw_metrics_table, draw_program_table, draw_table,
+)
+from cardio_app.reports.pdf_vector_plots import draw_program_speed_plot, draw_ramp_test_plot, draw_trend_plot
+from cardio_app.reports.pdf_visuals import create_program_speed_plot, create_ramp_test_plot, create_trend_plot
+
+# "vector" draws tables natively with FPDF cells, "png" embeds Matplotlib renders
+TABLE_MODES = ("vector", "png")
+
+# "png" embeds Matplotlib renders of the plots, "vector" draws them with FPDF primitives
+PLOT_MODES = ("png", "vector")
+DEFAULT_PLOT_MODE = os.environ.get("CARDIO_PLOT_MODE", "png")
+
+# "standard" reports one test and its programs, "progress" charts an athlete's
+# test history (HistoryStore.progress) without recomputing any metrics
+REPORT_MODES = ("standard", "progress")
+
+# Progress report charts: (title, y label, [(metric column, legend label, color)])
+PROGRESS_CHARTS = (
+    ("Threshold Speeds", "Speed ({unit})", (("aerobic_threshold", "Aerobic Threshold", "green"),
+                                            ("anaerobic_threshold", "Anaerobic Threshold", "red"))),
+    ("VO2max Speed", "Speed ({unit})", (("vo2max_speed", "VO2max Speed", "blue"),)),
+    ("Wingate Fatigue Index", "Fatigue Index (%)", (("fatigue_index", "Fatigue Index", "purple"),)),
+)
+
+# Size of the pieces iter_pdf() hands to a streaming response
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Number of processes rendering images for one report; 1 renders serially
+DEFAULT_RENDER_WORKERS = int(os.environ.get("CARDIO_RENDER_WORKERS", "1"))
+
+# One render pool per process, grown to the largest worker count asked for
+_render_pool = None
+_render_pool_workers = 0
+_render_pool_lock = threading.Lock()
+
+
+class ReportCancelled(Exception):
+    """Raised by build_pdf when its cancelled() hook returns True"""
+
+
+class _BuildProgress:
+    """Reports build_pdf's steps to on_progress and stops it once cancelled() is true"""
+
+    def __init__(self, total, on_progress=None, cancelled=None):
+        self.total = total
+        self.done = 0
+        self.on_progress = on_progress
+        self.cancelled = cancelled
+
+    def check(self):
+        if self.cancelled is not None and self.cancelled():
+            raise ReportCancelled()
+
+    def step(self, stage):
+        self.done += 1
+        if self.on_progress is not None:
+            self.on_progress(self.done, self.total, stage)
+        self.check()
+
+
+def _get_render_pool(workers):
+    """Return the process pool shared by every report, with at least this many workers"""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        if _render_pool is None or workers > _render_pool_workers:
+            if _render_pool is not None:
+                # Renders already queued on the smaller pool still finish
+                _render_pool.shutdown(wait=False)
+            _render_pool = ProcessPoolExecutor(max_workers=workers)
+            _render_pool_workers = workers
+        return _render_pool
+
+
+@atexit.register
+def shutdown_render_pool():
+    """Stop the render pool's worker processes (also run at interpreter exit)"""
+    global _render_pool, _render_pool_workers
+    with _render_pool_lock:
+        pool, _render_pool, _render_pool_workers = _render_pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True)
+
+
+def _render_image(job):
+    """
+    Render one report image and return its PNG bytes (or None).
+    Runs in pool workers, so it only takes and returns picklable values.
+    """
+    kind, args = job
+    if kind == "metrics_table":
+        img = create_metrics_table_image(*args)
+    elif kind == "ramp_plot":
+        img = create_ramp_test_plot(*args)
+    elif kind == "program_table":
+        img = create_program_table_image(*args)
+    elif kind == "program_plot":
+        img = create_program_speed_plot(*args)
+    elif kind == "trend_plot":
+        img = create_trend_plot(*args)
+    else:
+        raise ValueError(f"Unknown render job: {kind}")
+    return img.getvalue() if img is not None else None
+
+
+def warm_up():
+    """
+    Load the rendering stack (fpdf, Matplotlib/Agg) and draw a throwaway
+    figure and page, so the first real report does not pay import and
+    font-cache costs. Call it from a worker before it takes traffic.
+    """
+    from fpdf import FPDF
+    from cardio_app.reports.pdf_visuals import _render_program_speed_plot
+
+    _render_program_speed_plot([("W-UP Walk", 30, 0, 2.0), ("Jog", 60, 30, 5.0)], "mph")
+    pdf = FPDF()
+    pdf.add_page()
+    draw_metrics_table(pdf, {"Warm-up": 1.0})
+    pdf.output()
+
+
+def prerender_cover(metrics, ramp_df, unit="mph", plot_mode=None):
+    """
+    Warm the rendering stack and render the cover page's ramp plot into the
+    plot cache, so a later build_pdf for the same test only assembles pages.
+    Meant for a background thread while the user is still picking trainings.
+    """
+    warm_up()
+    if (plot_mode or DEFAULT_PLOT_MODE) == "png" and ramp_df is not None:
+        create_ramp_test_plot(ramp_df, metrics, unit)
+
 
 class PDFReportBuilder:
-    def __init__(self, metrics, programs, username, unit='mph', ramp_df=None, filename=None):
+    def __init__(self, metrics, programs, username, unit='mph', ramp_df=None, filename=None,
+                 table_mode="vector", render_workers=None, plot_mode=None, font_path=None,
+                 report_mode="standard", progress=None):
+        if report_mode not in REPORT_MODES:
+            raise ValueError(f"report_mode must be one of {REPORT_MODES}, got {report_mode!r}")
+        if report_mode == "progress" and not progress:
+            raise ValueError("A progress report needs the athlete's progress (HistoryStore.progress)")
+        if table_mode not in TABLE_MODES:
+            raise ValueError(f"table_mode must be one of {TABLE_MODES}, got {table_mode!r}")
+        plot_mode = plot_mode or DEFAULT_PLOT_MODE
+        if plot_mode not in PLOT_MODES:
+            raise ValueError(f"plot_mode must be one of {PLOT_MODES}, got {plot_mode!r}")
+        self.report_mode = report_mode
+        self.progress = progress
+        self.table_mode = table_mode
+        self.plot_mode = plot_mode
+        self.render_workers = render_workers or DEFAULT_RENDER_WORKERS
         self.unit = unit
         self.metrics = metrics
         self.programs = programs
         self.username = username or "Client"
         self.ramp_df = ramp_df
         safe_name = (username or "client").replace(" ", "_")
-        self.filename = filename or f"{safe_name}_cardio_report.pdf"
+        suffix = "progress_report" if report_mode == "progress" else "cardio_report"
+        self.filename = filename or f"{safe_name}_{suffix}.pdf"
+        from fpdf import FPDF  # imported lazily, see warm_up()
         self.pdf = FPDF()
-        self.temp_files = []
+        # Core Arial unless a TTF is given here or via CARDIO_PDF_FONT
+        self.font_family = register_report_font(self.pdf, font_path)
+        self._images = {}
 
-    def build_pdf(self):
-        self.pdf.add_page()
-        self._add_cover_page()
+    def build_pdf(self, on_progress=None, cancelled=None):
+        """
+        Lay out the whole document. on_progress(done, total, stage) is called
+        after each rendered image and each page; cancelled() is checked
+        between those steps and raises ReportCancelled once it returns True.
+        Both hooks run on the thread building the report.
+        """
+        # Render every image up front (in parallel when configured), then
+        # assemble the pages in order from the results.
+        jobs = self._render_jobs()
+        pages = 1 if self.report_mode == "progress" else 1 + len(self.programs)
+        progress = _BuildProgress(len(jobs) + pages, on_progress, cancelled)
+        progress.check()
+        with timed("render_images"):
+            self._images = self._render_images(jobs, progress)
 
-        # Each program page
-        for program_name, program_data in self.programs.items():
+        if self.report_mode == "progress":
+            with timed("assemble_pages"):
+                self._add_progress_pages()
+                progress.step("Progress charts")
+            return self.pdf
+
+        with timed("assemble_pages"):
             self.pdf.add_page()
-            self._add_section_title(f"{program_name} Program")
+            self._add_cover_page()
+            progress.step("Cover page")
 
-            # Program table
-            table_img = create_program_table_image(program_data, unit=self.unit)
-            if table_img:
-                path = self._save_temp_image(table_img)
-                self.pdf.image(path, x=10, w=190)
+            # Each program page
+            for program_name, program_data in self.programs.items():
+                self.pdf.add_page()
+                self._add_section_title(f"{program_name} Program")
 
-            # Program speed plot
-            plot_img = create_program_speed_plot(program_data, unit=self.unit)
-            if plot_img:
-                path = self._save_temp_image(plot_img)
-                self.pdf.image(path, x=10, w=190)
+                # Program table
+                if self.table_mode == "vector":
+                    draw_program_table(self.pdf, program_data, unit=self.unit, x=10, width=190,
+                                       font_family=self.font_family)
+                    self.pdf.ln(5)
+                else:
+                    table_img = self._image(("program_table", program_name))
+                    if table_img:
+                        resource_cache.image(self.pdf, table_img, x=10, w=190)
+
+                # Program speed plot
+                if self.plot_mode == "vector":
+                    draw_program_speed_plot(self.pdf, program_data, unit=self.unit, x=10, width=190,
+                                            font_family=self.font_family)
+                else:
+                    plot_img = self._image(("program_plot", program_name))
+                    if plot_img:
+                        resource_cache.image(self.pdf, plot_img, x=10, w=190)
+                progress.step(f"{program_name} program")
 
         return self.pdf
 
-    def save_pdf(self, path=None):
-        output_path = path or self.filename
-        self.pdf.output(output_path)
-        # Clean up temp images
-        for f in self.temp_files:
-            try: os.remove(f)
-            except: pass
+    def save_pdf(self, path=None, in_memory=False):
+        """
+        Write the built document.
+        With in_memory=True nothing touches the filesystem and the PDF bytes
+        are returned; otherwise the document is written to path (or
+        self.filename) and that path is returned.
+        """
+        with timed("save_pdf"):
+            if in_memory:
+                data = bytes(self.pdf.output())
+                self._count_report(len(data))
+                return data
+            output_path = path or self.filename
+            self.pdf.output(output_path)
+        if metrics_enabled():
+            self._count_report(os.path.getsize(output_path))
         return output_path
 
-    def _save_temp_image(self, img_bytesio):
-        """Save BytesIO image to a temporary PNG file and return the path"""
-        if isinstance(img_bytesio, str):
-            # Already a path, just return it
-            return img_bytesio
-        elif img_bytesio is None:
-            return None
-        # Else, it's BytesIO
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-        temp_file.write(img_bytesio.getbuffer())
-        temp_file.close()
-        self.temp_files.append(temp_file.name)
-        return temp_file.name
+    def iter_pdf(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the built document in bytes chunks for a streaming response.
+        Chunks are cut from FPDF's single output buffer through a
+        memoryview, so at most one extra chunk is held alongside it and
+        nothing is written to disk.
+        """
+        with timed("save_pdf"):
+            buffer = self.pdf.output()
+        self._count_report(len(buffer))
+        with memoryview(buffer) as view:
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+
+    @staticmethod
+    def _count_report(size):
+        incr("reports")
+        incr("report_bytes", size)
 
+    def _render_jobs(self):
+        """Return {image key: render job} for every image the report embeds"""
+        jobs = {}
+        if self.report_mode == "progress":
+            if self.plot_mode == "png":
+                for title, ylabel, lines in self._progress_charts():
+                    jobs[("trend_plot", title)] = ("trend_plot", (self.progress["series"]["tested_at"],
+                                                                  lines, title, ylabel))
+            return jobs
+        if self.table_mode == "png":
+            jobs[("metrics_table",)] = ("metrics_table", (self.metrics,))
+        png_plots = self.plot_mode == "png"
+        if self.ramp_df is not None and png_plots:
+            jobs[("ramp_plot",)] = ("ramp_plot", (self.ramp_df, self.metrics, self.unit))
+        for program_name, program_data in self.programs.items():
+            if self.table_mode == "png":
+                jobs[("program_table", program_name)] = ("program_table", (program_data, self.unit))
+            if png_plots:
+                jobs[("program_plot", program_name)] = ("program_plot", (program_data, self.unit))
+        return jobs
+
+    def _render_images(self, jobs=None, progress=None):
+        jobs = self._render_jobs() if jobs is None else jobs
+        keys = list(jobs)
+        if self.render_workers > 1 and len(keys) > 1:
+            pool = _get_render_pool(self.render_workers)
+            results = pool.map(_render_image, [jobs[k] for k in keys])
+        else:
+            results = map(_render_image, [jobs[k] for k in keys])
+        images = {}
+        # Both maps yield in order as renders finish, so progress is live
+        for key, result in zip(keys, results):
+            images[key] = result
+            if progress is not None:
+                progress.step("Rendering charts")
+        return images
+
+    def _image(self, key):
+        # Each image is embedded once; FPDF keeps its own copy from here on
+        data = self._images.pop(key, None)
+        return BytesIO(data) if data is not None else None
 
     def _add_cover_page(self):
-        self.pdf.set_font("Arial", 'B', 16)
+        self.pdf.set_font(self.font_family, 'B', 16)
         title = f"{self.username}'s Cardiovascular Fitness Report"
         self.pdf.cell(0, 10, title, ln=True, align="C")
         self.pdf.ln(10)
 
         # Metrics table
-        metrics_img = create_metrics_table_image(self.metrics)
-        if metrics_img:
-            path = self._save_temp_image(metrics_img)
-            self.pdf.image(path, x=30, w=150)
+        if self.table_mode == "vector":
+            draw_metrics_table(self.pdf, self.metrics, x=30, width=150, font_family=self.font_family)
             self.pdf.ln(5)
+        else:
+            metrics_img = self._image(("metrics_table",))
+            if metrics_img:
+                resource_cache.image(self.pdf, metrics_img, x=30, w=150)
+                self.pdf.ln(5)
 
         # Ramp test plot
-        if self.ramp_df is not None:
-            ramp_plot_img = create_ramp_test_plot(self.ramp_df, self.metrics, unit=self.unit)
+        if self.plot_mode == "vector":
+            if self.ramp_df is not None:
+                draw_ramp_test_plot(self.pdf, self.ramp_df, self.metrics, unit=self.unit, x=10, width=190,
+                                    font_family=self.font_family)
+        else:
+            ramp_plot_img = self._image(("ramp_plot",))
             if ramp_plot_img:
-                path = self._save_temp_image(ramp_plot_img)
-                self.pdf.image(path, x=10, w=190)
+                resource_cache.image(self.pdf, ramp_plot_img, x=10, w=190)
+
+    def _progress_charts(self):
+        """(title, y label, lines) for every progress chart with data to show"""
+        series = self.progress["series"]
+        charts = []
+        for title, ylabel, columns in PROGRESS_CHARTS:
+            lines = [(label, series[col], color) for col, label, color in columns
+                     if any(v is not None for v in series[col])]
+            if lines:
+                charts.append((title, ylabel.format(unit=self.unit), lines))
+        return charts
+
+    def _add_progress_pages(self):
+        trends = self.progress["trends"]
+        tested_at = self.progress["series"]["tested_at"]
+        self.pdf.add_page()
+        self._add_section_title(f"{self.username}'s Progress Report")
+        self.pdf.set_font(self.font_family, '', 11)
+        first, last = (datetime.fromtimestamp(ts).strftime("%d %b %Y") for ts in (min(tested_at), max(tested_at)))
+        self.pdf.cell(0, 8, f"{len(tested_at)} tests from {first} to {last}", ln=True, align="C")
+        self.pdf.ln(3)
+
+        # Trend summary, straight from the running aggregates
+        def number(value, fmt="{:.2f}"):
+            return fmt.format(value) if value is not None else "N/A"
+
+        rows = [[METRIC_COLUMNS[col].format(unit=self.unit), str(t["tests"]), number(t["min"]), number(t["max"]),
+                 number(t["mean"]), number(t["latest"]), number(t["slope_per_week"], "{:+.3f}")]
+                for col, t in trends.items()]
+        draw_table(self.pdf, ["Metric", "Tests", "Min", "Max", "Mean", "Latest", "Per week"], rows,
+                   [58] + [22] * 6, x=10, header_fill=METRICS_HEADER_FILL, font_size=9, row_height=7,
+                   font_family=self.font_family)
+        self.pdf.ln(5)
+
+        for title, ylabel, lines in self._progress_charts():
+            if self.plot_mode == "vector":
+                draw_trend_plot(self.pdf, tested_at, lines, title, ylabel, x=10, width=190,
+                                font_family=self.font_family)
+            else:
+                plot_img = self._image(("trend_plot", title))
+                if plot_img:
+                    resource_cache.image(self.pdf, plot_img, x=10, w=190)
 
     def _add_section_title(self, text):
-        self.pdf.set_font("Arial", 'B', 16)
+        self.pdf.set_font(self.font_family, 'B', 16)
         self.pdf.cell(0, 10, text, ln=True, align="C")
         self.pdf.ln(5)
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Process-level cache for fonts and images shared by every generated PDF.
+
+FPDF parses a TrueType font from scratch on each add_font() call and
+decodes and recompresses each embedded PNG, once per document. Both only
+depend on the file or image bytes, so they are done once per process here
+and every new document gets a lightweight copy:
+
+- fonts: the parsed metrics (character widths, cmap, glyph ids) are
+  shared; each document gets its own subset map and its own lazily-read
+  TTFont, which FPDF subsets in place when the document is output.
+- images: FPDF's parsed image data is keyed by the same MD5 FPDF uses to
+  dedupe images within one document, so a logo or a plot repeated across
+  reports is compressed once.
+
+Both reuse fpdf2 internals (TTFFont slots, the document's image cache),
+so they are only used with the fpdf2 versions they were checked against
+(FPDF_VERSIONS, fpdf2 is pinned in requirements.txt); any other version
+gets the plain add_font() and image() calls.
+
+Set CARDIO_PDF_FONT (and optionally CARDIO_PDF_FONT_BOLD) to a TTF file to
+render reports with it instead of the core Arial font, e.g. for client
+names outside Latin-1.
+"""
+
+import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from types import SimpleNamespace
+
+CORE_FONT_FAMILY = "Arial"
+REPORT_FONT_FAMILY = "CardioSans"
+REPORT_FONT = os.environ.get("CARDIO_PDF_FONT") or None
+REPORT_FONT_BOLD = os.environ.get("CARDIO_PDF_FONT_BOLD") or None
+
+# fpdf2 releases whose font and image internals the cache was checked against
+FPDF_VERSIONS = ("2.8.1",)
+
+
+def internals_supported():
+    """True when the installed fpdf2 is one the cache may reach into"""
+    from fpdf import FPDF_VERSION
+
+    return FPDF_VERSION in FPDF_VERSIONS
+
+
+def _reserved_chars(pdf):
+    """Characters FPDF maps to themselves in every TTF subset (see TTFFont.__init__)"""
+    chars = "\x00 \r\n"
+    if pdf.str_alias_nb_pages:
+        chars += "0123456789" + pdf.str_alias_nb_pages
+    return chars
+
+
+def _image_name(data):
+    """The key FPDF files raster image bytes under in its image cache"""
+    return hashlib.md5(data.strip(), usedforsecurity=False).hexdigest()
+
+
+def _unused_copy(info, index):
+    """Copy of a parsed image entry, not yet placed in any document"""
+    info = copy.copy(info)
+    info["i"] = index
+    info["usages"] = 0
+    return info
+
+
+class ResourceCache:
+    def __init__(self, max_images=128):
+        self.max_images = max_images
+        self._fonts = {}
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.font_hits = 0
+        self.font_misses = 0
+        self.image_hits = 0
+        self.image_misses = 0
+
+    def add_font(self, pdf, family, path, style=""):
+        """FPDF.add_font() for a TTF file, parsing the file once per process"""
+        from fontTools import ttLib
+        from fpdf.fonts import SubsetMap, TextEmphasis, TTFFont
+
+        style = "".join(sorted(style.upper()))
+        fontkey = f"{family.lower()}{style}"
+        if fontkey in pdf.fonts:
+            return
+        if not internals_supported():
+            pdf.add_font(family, style, path)
+            return
+        template, data = self._parsed_font(path)
+
+        font = object.__new__(TTFFont)
+        for slot in TTFFont.__slots__:
+            if hasattr(template, slot):
+                setattr(font, slot, getattr(template, slot))
+        font.i = len(pdf.fonts) + 1
+        font.fontkey = fontkey
+        # The descriptor becomes a PDF object of this document when it is output
+        font.desc = copy.copy(template.desc)
+        font.emphasis = TextEmphasis.coerce(style)
+        font.ttfont = ttLib.TTFont(BytesIO(data), recalcTimestamp=False, fontNumber=0, lazy=True)
+        font.missing_glyphs = []
+        font.subset = SubsetMap(font, [ord(char) for char in _reserved_chars(pdf)])
+        pdf.fonts[fontkey] = font
+
+    def image(self, pdf, img, **kwargs):
+        """FPDF.image() for PNG bytes, reusing parsed image data across documents"""
+        if not isinstance(img, (bytes, BytesIO)) or not internals_supported():
+            return pdf.image(img, **kwargs)
+        name = _image_name(img.getvalue() if isinstance(img, BytesIO) else img)
+        images = pdf.image_cache.images
+        missed = False
+        if name not in images:
+            with self._lock:
+                info = self._images.get(name)
+                if info is None:
+                    self.image_misses += 1
+                    missed = True
+                else:
+                    self._images.move_to_end(name)
+                    self.image_hits += 1
+            if info is not None:
+                images[name] = _unused_copy(info, len(images) + 1)
+
+        result = pdf.image(img, **kwargs)
+
+        info = images.get(name)
+        # ICC profiles are numbered per document, so those images are not shared
+        if missed and info is not None and info.get("iccp_i") is None:
+            with self._lock:
+                self._remember(name, _unused_copy(info, 0))
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "fonts": len(self._fonts),
+                "font_hits": self.font_hits,
+                "font_misses": self.font_misses,
+                "images": len(self._images),
+                "max_images": self.max_images,
+                "image_hits": self.image_hits,
+                "image_misses": self.image_misses,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._fonts.clear()
+            self._images.clear()
+            self.font_hits = self.font_misses = 0
+            self.image_hits = self.image_misses = 0
+
+    def _parsed_font(self, path):
+        from fpdf.fonts import TTFFont
+
+        path = os.path.abspath(path)
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            parsed = self._fonts.get(key)
+            if parsed is not None:
+                self.font_hits += 1
+                return parsed
+            self.font_misses += 1
+            with open(path, "rb") as f:
+                data = f.read()
+            # TTFFont only reads the font count and page alias from its document
+            template = TTFFont(SimpleNamespace(fonts={}, str_alias_nb_pages=None), path, "", "")
+            template.ttfont.close()
+            template.ttfont = None
+            parsed = self._fonts[key] = (template, data)
+            return parsed
+
+    def _remember(self, name, info):
+        if self.max_images <= 0:
+            return
+        self._images[name] = info
+        self._images.move_to_end(name)
+        while len(self._images) > self.max_images:
+            self._images.popitem(last=False)
+
+
+def register_report_font(pdf, path=None, bold_path=None):
+    """
+    Add the report font to pdf and return the family to pass to set_font().
+    Uses CARDIO_PDF_FONT(_BOLD) when no path is given; without any font
+    file the core Arial font is used and nothing is added.
+    """
+    if path is None:
+        path, bold_path = REPORT_FONT, REPORT_FONT_BOLD
+    if not path:
+        return CORE_FONT_FAMILY
+    resource_cache.add_font(pdf, REPORT_FONT_FAMILY, path)
+    resource_cache.add_font(pdf, REPORT_FONT_FAMILY, bold_path or path, style="B")
+    return REPORT_FONT_FAMILY
+
+
+resource_cache = ResourceCache(max_images=int(os.environ.get("CARDIO_PDF_IMAGE_CACHE_SIZE", "128")))
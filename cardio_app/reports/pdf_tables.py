@@ -4,40 +4,41 @@ Created on Tue Jul 15 12:16:28 2025
 @author: leaon
 """
 
-import pandas as pd
-import matplotlib
-matplotlib.use("Agg")  # Use non-GUI backend
-import matplotlib.pyplot as plt
-import tempfile
-import os
+from cardio_app.instrumentation import incr, instrumented
+from cardio_app.logic.program import Program
+from cardio_app.reports.figure_pool import figure_pool, save_figure_png
 from cardio_app.reports.pdf_utils_common import format_seconds
 
-def _save_plot_to_file(fig):
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    fig.savefig(tmp_file.name, format='png', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    tmp_file.close()
-    return tmp_file.name
+METRICS_HEADER_FILL = "#D3D3D3"
+PROGRAM_HEADER_FILL = "#ADD8E6"
 
+@instrumented("metrics_table_image")
 def create_metrics_table_image(metrics: dict):
+    import pandas as pd
+
     df = pd.DataFrame(list(metrics.items()), columns=["Metric", "Value"])
     df["Value"] = df["Value"].round(1)
 
-    fig, ax = plt.subplots(figsize=(5.5, 2.3))
-    ax.axis('off')
-    table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
-    table.scale(1, 1.2)
+    with figure_pool.acquire((5.5, 2.3)) as (fig, ax):
+        ax.axis('off')
+        table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
+        table.auto_set_font_size(False)
+        table.set_fontsize(10)
+        table.scale(1, 1.2)
 
-    for (row, _), cell in table.get_celld().items():
-        if row == 0:
-            cell.set_text_props(weight='bold')
-            cell.set_facecolor("#D3D3D3")
+        for (row, _), cell in table.get_celld().items():
+            if row == 0:
+                cell.set_text_props(weight='bold')
+                cell.set_facecolor(METRICS_HEADER_FILL)
 
-    return _save_plot_to_file(fig)
+        incr("renders", kind="metrics_table_image")
+        return save_figure_png(fig)
 
+@instrumented("program_table_image")
 def create_program_table_image(program_data, unit="mph"):
+    import pandas as pd
+
+    program_data = list(program_data)
     if all(len(row) == 2 for row in program_data):
         df = pd.DataFrame(program_data[1:], columns=program_data[0])
     else:
@@ -45,16 +46,104 @@ def create_program_table_image(program_data, unit="mph"):
         df[f"Speed ({unit})"] = df[f"Speed ({unit})"].round(1)
         df["Start Time (sec)"] = df["Start Time (sec)"].apply(format_seconds)
 
-    fig, ax = plt.subplots(figsize=(7, max(2, len(df) * 0.28)))
-    ax.axis('off')
-    table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    table.scale(1, 1.1)
+    with figure_pool.acquire((7, max(2, len(df) * 0.28))) as (fig, ax):
+        ax.axis('off')
+        table = ax.table(cellText=df.values, colLabels=df.columns, cellLoc='center', loc='center')
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        table.scale(1, 1.1)
+
+        for (row, _), cell in table.get_celld().items():
+            if row == 0:
+                cell.set_text_props(weight='bold')
+                cell.set_facecolor(PROGRAM_HEADER_FILL)
+
+        incr("renders", kind="program_table_image")
+        return save_figure_png(fig)
+
+
+# ---------------------------------------------------------------------------
+# Native (vector) tables drawn straight into an FPDF document
+# ---------------------------------------------------------------------------
 
-    for (row, _), cell in table.get_celld().items():
-        if row == 0:
-            cell.set_text_props(weight='bold')
-            cell.set_facecolor("#ADD8E6")
+def _hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _format_cell(value, decimals=None):
+    if value is None or (isinstance(value, float) and value != value):
+        return "N/A"
+    if decimals is not None and isinstance(value, (int, float)):
+        return str(round(float(value), decimals))
+    return str(value)
+
+
+def _program_table_rows(program_data, unit="mph"):
+    """Return (header, rows) for a program, mirroring create_program_table_image"""
+    program_data = list(program_data)
+    if all(len(row) == 2 for row in program_data):
+        header = [str(col) for col in program_data[0]]
+        rows = [[_format_cell(v) for v in row] for row in program_data[1:]]
+        return header, rows
 
-    return _save_plot_to_file(fig)
+    header = ["Activity", "Duration (sec)", "Start Time (sec)", f"Speed ({unit})"]
+    rows = [
+        [str(i.label), _format_cell(i.duration), format_seconds(i.start_time), _format_cell(i.speed, 1)]
+        for i in Program.coerce(program_data)
+    ]
+    return header, rows
+
+
+def draw_table(pdf, header, rows, col_widths, x=10, header_fill=PROGRAM_HEADER_FILL,
+               font_size=9, row_height=6, font_family="Arial"):
+    """
+    Draw a bordered, centered table at the current y position of pdf.
+
+    The header row is bold with a colored fill and is repeated when the
+    table flows onto a new page.
+    """
+    fill_rgb = _hex_to_rgb(header_fill)
+
+    def draw_header():
+        pdf.set_x(x)
+        pdf.set_font(font_family, 'B', font_size)
+        pdf.set_fill_color(*fill_rgb)
+        for text, width in zip(header, col_widths):
+            pdf.cell(width, row_height, text, border=1, align="C", fill=True)
+        pdf.ln(row_height)
+        pdf.set_font(font_family, '', font_size)
+
+    draw_header()
+    for row in rows:
+        if pdf.will_page_break(row_height):
+            pdf.add_page()
+            draw_header()
+        pdf.set_x(x)
+        for text, width in zip(row, col_widths):
+            pdf.cell(width, row_height, text, border=1, align="C")
+        pdf.ln(row_height)
+
+
+@instrumented("metrics_table_vector")
+def draw_metrics_table(pdf, metrics: dict, x=30, width=150, font_family="Arial"):
+    """Draw the metrics table natively, same layout as create_metrics_table_image"""
+    if not metrics:
+        return
+    rows = [[str(name), _format_cell(value, 1)] for name, value in metrics.items()]
+    draw_table(pdf, ["Metric", "Value"], rows, [width * 2 / 3, width / 3], x=x,
+               header_fill=METRICS_HEADER_FILL, font_size=10, row_height=7, font_family=font_family)
+
+
+@instrumented("program_table_vector")
+def draw_program_table(pdf, program_data, unit="mph", x=10, width=190, font_family="Arial"):
+    """Draw a program table natively, same layout as create_program_table_image"""
+    if not program_data:
+        return
+    header, rows = _program_table_rows(program_data, unit=unit)
+    if len(header) == 4:
+        col_widths = [width * 0.34, width * 0.22, width * 0.22, width * 0.22]
+    else:
+        col_widths = [width / len(header)] * len(header)
+    draw_table(pdf, header, rows, col_widths, x=x, header_fill=PROGRAM_HEADER_FILL,
+               font_size=9, row_height=6, font_family=font_family)
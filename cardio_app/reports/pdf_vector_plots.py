@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+PDF-native (vector) versions of the ramp test, program speed and progress
+trend plots.
+
+The charts are drawn straight into the FPDF document with lines, filled
+rectangles and text, using the same layout, colors and scaling as the
+Matplotlib renders in pdf_visuals. Nothing is rasterized, so they cost a
+few hundred page operators instead of a PNG encode and stay sharp in
+print.
+"""
+
+from cardio_app.instrumentation import incr, instrumented
+from cardio_app.logic.program import Program
+from cardio_app.logic.ramp_data import RampData
+from cardio_app.reports.pdf_visuals import format_tick_seconds, nice_ticks, scale_program_timeline, trend_timeline
+
+PLOT_FONT = "Helvetica"
+
+# Matplotlib named colors used by the PNG plots
+COLORS = {
+    "green": (0, 128, 0),
+    "blue": (0, 0, 255),
+    "lightgreen": (144, 238, 144),
+    "khaki": (240, 230, 140),
+    "lightcoral": (240, 128, 128),
+    "lightblue": (173, 216, 230),
+    "lightpink": (255, 182, 193),
+    "red": (255, 0, 0),
+    "purple": (128, 0, 128),
+    "grid": (176, 176, 176),
+    "black": (0, 0, 0),
+}
+
+# Space around the axes box, in mm: left (y labels), right, top (title), bottom (x labels)
+MARGINS = (16, 4, 9, 13)
+
+
+class _Axes:
+    """Maps data coordinates into the axes box of a plot on the page"""
+
+    def __init__(self, left, top, width, height, xlim, ylim):
+        self.left, self.top, self.width, self.height = left, top, width, height
+        self.x0, self.x1 = xlim
+        self.y0, self.y1 = ylim
+
+    def px(self, value):
+        return self.left + (value - self.x0) / ((self.x1 - self.x0) or 1) * self.width
+
+    def py(self, value):
+        return self.top + self.height - (value - self.y0) / ((self.y1 - self.y0) or 1) * self.height
+
+
+def _with_margin(values, fraction=0.05):
+    lo, hi = min(values), max(values)
+    pad = (hi - lo) * fraction or 0.5
+    return lo - pad, hi + pad
+
+
+def _tick_labels(values):
+    """Labels sharing one number of decimals, like Matplotlib's default formatter"""
+    decimals = 0
+    for value in values:
+        while decimals < 2 and abs(value - round(value, decimals)) > 1e-9:
+            decimals += 1
+    return [f"{value:.{decimals}f}" for value in values]
+
+
+def _begin_plot(pdf, x, width, height, title, font_family):
+    """Reserve the plot area (breaking the page if needed) and draw the title"""
+    if pdf.will_page_break(height):
+        pdf.add_page()
+    top = pdf.get_y()
+    pdf.set_font(font_family, "", 11)
+    pdf.set_text_color(*COLORS["black"])
+    pdf.text(x + (width - pdf.get_string_width(title)) / 2, top + 6, title)
+    left, right, margin_top, bottom = MARGINS
+    return top, (x + left, top + margin_top, width - left - right, height - margin_top - bottom)
+
+
+def _draw_grid(pdf, axes, xticks, yticks):
+    with pdf.local_context(draw_color=COLORS["grid"], line_width=0.15):
+        pdf.set_dash_pattern(dash=0.8, gap=0.6)
+        for value in xticks:
+            pdf.line(axes.px(value), axes.top, axes.px(value), axes.top + axes.height)
+        for value in yticks:
+            pdf.line(axes.left, axes.py(value), axes.left + axes.width, axes.py(value))
+        pdf.set_dash_pattern()
+
+
+def _draw_frame(pdf, axes):
+    with pdf.local_context(draw_color=COLORS["black"], line_width=0.2):
+        pdf.rect(axes.left, axes.top, axes.width, axes.height)
+
+
+def _draw_y_axis(pdf, axes, yticks, label):
+    pdf.set_font_size(7)
+    for value, text in zip(yticks, _tick_labels(yticks)):
+        y = axes.py(value)
+        pdf.line(axes.left - 1, y, axes.left, y)
+        pdf.text(axes.left - 1.8 - pdf.get_string_width(text), y + 1.1, text)
+    pdf.set_font_size(8)
+    center_y = axes.top + axes.height / 2
+    label_x = axes.left - 11
+    with pdf.rotation(90, label_x, center_y):
+        pdf.text(label_x - pdf.get_string_width(label) / 2, center_y, label)
+
+
+def _draw_x_label(pdf, axes, label, offset):
+    pdf.set_font_size(8)
+    pdf.text(axes.left + (axes.width - pdf.get_string_width(label)) / 2,
+             axes.top + axes.height + offset, label)
+
+
+def _span(pdf, axes, x_from, x_to, color):
+    """Translucent full-height band between two data x positions (like axvspan)"""
+    left, right = sorted((axes.px(x_from), axes.px(x_to)))
+    left, right = max(left, axes.left), min(right, axes.left + axes.width)
+    if right <= left:
+        return
+    with pdf.local_context(fill_color=COLORS[color], fill_opacity=0.3):
+        pdf.rect(left, axes.top, right - left, axes.height, style="F")
+
+
+@instrumented("ramp_plot_vector")
+def draw_ramp_test_plot(pdf, ramp_df, metrics, unit="mph", x=10, width=190, font_family=PLOT_FONT):
+    """Draw the ramp test plot (speed vs RPE with threshold zones) at the current y"""
+    ramp = RampData.coerce(ramp_df, unit)
+    if ramp is None or ramp.empty:
+        return
+    speeds, rpe = list(ramp.speeds), list(ramp.rpe)
+    aerobic_thres = metrics.get(f"Aerobic Threshold ({unit})")
+    anaerobic_thres = metrics.get(f"Anaerobic Threshold ({unit})")
+
+    height = width * 3 / 8
+    top, box = _begin_plot(pdf, x, width, height, "Ramp Test Speed Over Time", font_family)
+    axes = _Axes(*box, xlim=_with_margin(speeds), ylim=_with_margin(rpe))
+    yticks = sorted(set(rpe))
+
+    legend = [("line", "green", "Ramp Test Speed")]
+    if aerobic_thres is not None and anaerobic_thres is not None:
+        _span(pdf, axes, speeds[0], aerobic_thres, "lightgreen")
+        _span(pdf, axes, aerobic_thres, anaerobic_thres, "khaki")
+        _span(pdf, axes, anaerobic_thres, speeds[-1], "lightcoral")
+        legend += [("box", "lightgreen", "Aerobic Zone"), ("box", "khaki", "Moderate Zone"),
+                   ("box", "lightcoral", "Anaerobic Zone")]
+
+    _draw_grid(pdf, axes, speeds, yticks)
+
+    points = [(axes.px(s), axes.py(r)) for s, r in zip(speeds, rpe)]
+    with pdf.local_context(draw_color=COLORS["green"], fill_color=COLORS["green"], line_width=0.4):
+        pdf.polyline(points)
+        for px, py in points:
+            pdf.circle(px, py, 0.9, style="F")
+
+    _draw_frame(pdf, axes)
+    _draw_y_axis(pdf, axes, yticks, "RPE - Borg(10)")
+    pdf.set_font_size(7)
+    for value, text in zip(speeds, _tick_labels(speeds)):
+        px = axes.px(value)
+        pdf.line(px, axes.top + axes.height, px, axes.top + axes.height + 1)
+        pdf.text(px - pdf.get_string_width(text) / 2, axes.top + axes.height + 4, text)
+    _draw_x_label(pdf, axes, f"Speed ({unit})", 9)
+    _draw_legend(pdf, axes.left + 2, axes.top + 2, legend)
+
+    incr("renders", kind="ramp_plot_vector")
+    pdf.set_y(top + height)
+
+
+def _draw_legend(pdf, left, top, entries):
+    pdf.set_font_size(7)
+    row_height = 3.6
+    width = 8 + max(pdf.get_string_width(text) for _, _, text in entries) + 2
+    with pdf.local_context(fill_color=(255, 255, 255), fill_opacity=0.8, draw_color=(204, 204, 204),
+                           line_width=0.15):
+        pdf.rect(left, top, width, row_height * len(entries) + 1.5, style="DF")
+    for i, (kind, color, text) in enumerate(entries):
+        y = top + 1 + row_height * i + row_height / 2
+        if kind == "line":
+            with pdf.local_context(draw_color=COLORS[color], fill_color=COLORS[color], line_width=0.4):
+                pdf.line(left + 1.2, y, left + 6.2, y)
+                pdf.circle(left + 3.7, y, 0.7, style="F")
+        else:
+            with pdf.local_context(fill_color=COLORS[color], fill_opacity=0.3):
+                pdf.rect(left + 1.2, y - 1.2, 5, 2.4, style="F")
+        pdf.text(left + 7.5, y + 1.1, text)
+
+
+@instrumented("program_plot_vector")
+def draw_program_speed_plot(pdf, program_data, unit="mph", x=10, width=190, font_family=PLOT_FONT):
+    """Draw the program speed-over-time plot at the current y"""
+    if not program_data or not all(len(row) == 4 for row in program_data):
+        return
+    program = Program.coerce(program_data)
+    scaled_times, speeds, scaled_blocks = scale_program_timeline(program)
+    top_speed = program.max_speed + 2
+
+    height = width / 3 + 6  # extra room for the rotated time labels
+    top, box = _begin_plot(pdf, x, width, height, "Program Speed Over Time", font_family)
+    left, box_top, box_width, box_height = box
+    axes = _Axes(left, box_top, box_width, box_height - 6,
+                 xlim=_with_margin(scaled_times), ylim=(0, top_speed))
+    yticks = nice_ticks(0, top_speed)
+
+    for label, vis_duration, vis_start, _ in scaled_blocks:
+        color = "lightblue" if "W-UP" in label else "lightpink" if "Cool" in label else None
+        if color:
+            _span(pdf, axes, vis_start, vis_start + vis_duration, color)
+
+    _draw_grid(pdf, axes, scaled_times, yticks)
+
+    # Step line: hold each speed until the next interval starts
+    points = []
+    for start, end, speed in zip(scaled_times, scaled_times[1:], speeds):
+        points += [(axes.px(start), axes.py(speed)), (axes.px(end), axes.py(speed))]
+    with pdf.local_context(draw_color=COLORS["blue"], line_width=0.55):
+        pdf.polyline(points)
+
+    pdf.set_font_size(5.5)
+    for _, vis_duration, vis_start, speed in scaled_blocks:
+        text = f"{speed:.1f} {unit}"
+        mid = axes.px(vis_start + vis_duration / 2)
+        pdf.text(mid - pdf.get_string_width(text) / 2, axes.py(speed + 0.3), text)
+
+    _draw_frame(pdf, axes)
+    _draw_y_axis(pdf, axes, yticks, f"Speed ({unit})")
+
+    # Rotated real-time labels; skip ones that would overprint their neighbour
+    pdf.set_font_size(6.5)
+    last_x = None
+    for scaled, real in zip(scaled_times, program.cumulative_times):
+        px = axes.px(scaled)
+        pdf.line(px, axes.top + axes.height, px, axes.top + axes.height + 1)
+        if last_x is not None and px - last_x < 3:
+            continue
+        text = format_tick_seconds(real)
+        anchor_y = axes.top + axes.height + 2
+        with pdf.rotation(45, px, anchor_y):
+            pdf.text(px - pdf.get_string_width(text), anchor_y + 2, text)
+        last_x = px
+    _draw_x_label(pdf, axes, "Time (visually scaled)", 14)
+
+    incr("renders", kind="program_plot_vector")
+    pdf.set_y(top + height)
+
+
+@instrumented("trend_plot_vector")
+def draw_trend_plot(pdf, tested_at, lines, title, ylabel, x=10, width=190, font_family=PLOT_FONT):
+    """
+    Draw a metric-over-time plot of a progress report at the current y.
+    lines: [(label, values, color)], values aligned with tested_at (None where missing)
+    """
+    values = [v for _, line_values, _ in lines for v in line_values if v is not None]
+    if not tested_at or not values:
+        return
+    days, xticks, xlabels = trend_timeline(tested_at)
+
+    height = width * 3 / 8
+    top, box = _begin_plot(pdf, x, width, height, title, font_family)
+    axes = _Axes(*box, xlim=_with_margin(days), ylim=_with_margin(values))
+    yticks = nice_ticks(axes.y0, axes.y1, target=5)
+
+    _draw_grid(pdf, axes, xticks, yticks)
+
+    legend = []
+    for label, line_values, color in lines:
+        points = [(axes.px(d), axes.py(v)) for d, v in zip(days, line_values) if v is not None]
+        if not points:
+            continue
+        with pdf.local_context(draw_color=COLORS[color], fill_color=COLORS[color], line_width=0.4):
+            if len(points) > 1:
+                pdf.polyline(points)
+            for px, py in points:
+                pdf.circle(px, py, 0.9, style="F")
+        legend.append(("line", color, label))
+
+    _draw_frame(pdf, axes)
+    _draw_y_axis(pdf, axes, yticks, ylabel)
+    pdf.set_font_size(7)
+    for value, text in zip(xticks, xlabels):
+        px = axes.px(value)
+        pdf.line(px, axes.top + axes.height, px, axes.top + axes.height + 1)
+        pdf.text(px - pdf.get_string_width(text) / 2, axes.top + axes.height + 4, text)
+    _draw_x_label(pdf, axes, "Test date", 9)
+    _draw_legend(pdf, axes.left + 2, axes.top + 2, legend)
+
+    incr("renders", kind="trend_plot_vector")
+    pdf.set_y(top + height)
@@ -1,117 +1,228 @@
 # -*- coding: utf-8 -*-
 """
-PDF visuals: plots for programs and ramp test
+PDF visuals: plots for programs, ramp test and progress trends
 """
 
-import matplotlib
-matplotlib.use("Agg")  # Ensure no GUI backend is used
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+import math
+from datetime import datetime
 from io import BytesIO
-
-
-def _save_plot_to_memory(fig):
-    """Save Matplotlib figure to a BytesIO object for FPDF usage"""
-    buf = BytesIO()
-    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+from cardio_app.instrumentation import incr, instrumented
+from cardio_app.logic.program import Program
+from cardio_app.logic.ramp_data import RampData
+from cardio_app.reports.figure_pool import figure_pool, save_figure_png
+from cardio_app.reports.plot_cache import make_plot_key, plot_cache
 
 
 def create_ramp_test_plot(ramp_df, metrics, unit='mph'):
-    """Create a ramp test plot (speed vs RPE) with thresholds zones"""
+    """
+    Create a ramp test plot (speed vs RPE) with thresholds zones.
+    ramp_df: RampData or a DataFrame with Speed/RPE columns
+    """
     if ramp_df is None or ramp_df.empty:
         return None
 
     try:
-        speeds = ramp_df['Speed'] if 'Speed' in ramp_df.columns else ramp_df.iloc[:, 0]
-        rpe = ramp_df['RPE'] if 'RPE' in ramp_df.columns else ramp_df.iloc[:, 1]
+        if isinstance(ramp_df, RampData):
+            speeds, rpe = list(ramp_df.speeds), list(ramp_df.rpe)
+        else:
+            speeds = (ramp_df['Speed'] if 'Speed' in ramp_df.columns else ramp_df.iloc[:, 0]).tolist()
+            rpe = (ramp_df['RPE'] if 'RPE' in ramp_df.columns else ramp_df.iloc[:, 1]).tolist()
+        aerobic_thres = metrics.get(f"Aerobic Threshold ({unit})")
+        anaerobic_thres = metrics.get(f"Anaerobic Threshold ({unit})")
+        key = make_plot_key("ramp", speeds=speeds, rpe=rpe, unit=unit,
+                            aerobic=aerobic_thres, anaerobic=anaerobic_thres)
+    except Exception as e:
+        print(f"Error creating ramp test plot: {e}")
+        return None
 
-        fig, ax = plt.subplots(figsize=(8, 3))
-        ax.plot(speeds, rpe, marker='o', linestyle='-', color='green', label='Ramp Test Speed')
-        ax.set_xlabel(f"Speed ({unit})")
-        ax.set_ylabel("RPE - Borg(10)")
-        ax.set_title("Ramp Test Speed Over Time")
+    data = plot_cache.get_or_render(
+        key, lambda: _render_ramp_test_plot(speeds, rpe, aerobic_thres, anaerobic_thres, unit))
+    return BytesIO(data) if data is not None else None
 
-        # Show all ticks
-        ax.set_xticks(speeds)
-        ax.set_yticks(sorted(set(rpe)))
 
-        # Zones from metrics
-        aerobic_thres = metrics.get(f"Aerobic Threshold ({unit})")
-        anaerobic_thres = metrics.get(f"Anaerobic Threshold ({unit})")
-        if aerobic_thres is not None and anaerobic_thres is not None:
-            ax.axvspan(speeds.iloc[0], aerobic_thres, facecolor='lightgreen', alpha=0.3, label='Aerobic Zone')
-            ax.axvspan(aerobic_thres, anaerobic_thres, facecolor='khaki', alpha=0.3, label='Moderate Zone')
-            ax.axvspan(anaerobic_thres, speeds.iloc[-1], facecolor='lightcoral', alpha=0.3, label='Anaerobic Zone')
+@instrumented("ramp_plot")
+def _render_ramp_test_plot(speeds, rpe, aerobic_thres, anaerobic_thres, unit):
+    try:
+        with figure_pool.acquire((8, 3)) as (fig, ax):
+            ax.plot(speeds, rpe, marker='o', linestyle='-', color='green', label='Ramp Test Speed')
+            ax.set_xlabel(f"Speed ({unit})")
+            ax.set_ylabel("RPE - Borg(10)")
+            ax.set_title("Ramp Test Speed Over Time")
+
+            # Show all ticks
+            ax.set_xticks(speeds)
+            ax.set_yticks(sorted(set(rpe)))
+
+            # Zones from metrics
+            if aerobic_thres is not None and anaerobic_thres is not None:
+                ax.axvspan(speeds[0], aerobic_thres, facecolor='lightgreen', alpha=0.3, label='Aerobic Zone')
+                ax.axvspan(aerobic_thres, anaerobic_thres, facecolor='khaki', alpha=0.3, label='Moderate Zone')
+                ax.axvspan(anaerobic_thres, speeds[-1], facecolor='lightcoral', alpha=0.3, label='Anaerobic Zone')
 
-        ax.grid(True, linestyle='--', alpha=0.5)
-        ax.legend(loc='upper left')
+            ax.grid(True, linestyle='--', alpha=0.5)
+            ax.legend(loc='upper left')
 
-        return _save_plot_to_memory(fig)
+            incr("renders", kind="ramp_plot")
+            return save_figure_png(fig).getvalue()
 
     except Exception as e:
         print(f"Error creating ramp test plot: {e}")
+        incr("errors", stage="ramp_plot")
         return None
 
 
 def create_program_speed_plot(program_data, unit="mph"):
     """
     Create a speed-over-time plot for a training program.
-    program_data: list of tuples (label, duration_sec, start_time, speed)
+    program_data: Program, or list of tuples (label, duration_sec, start_time, speed)
     """
     if not all(len(row) == 4 for row in program_data):
         return None
 
-    def format_seconds(sec):
-        m, s = divmod(int(sec), 60)
-        return f"{m}:{s:02d}"
+    program = Program.coerce(program_data)
+    key = make_plot_key("program_speed", program=program.intervals, unit=unit)
+    data = plot_cache.get_or_render(key, lambda: _render_program_speed_plot(program, unit))
+    return BytesIO(data) if data is not None else None
+
+
+def scale_program_timeline(program):
+    """
+    Stretch warm-up and cool-down blocks so short work intervals stay
+    readable next to them. Returns (scaled_times, speeds, scaled_blocks)
+    with scaled_blocks as (label, visual duration, visual start, speed).
+    """
+    total_duration = program.total_duration
+    warmup_scale = cooldown_scale = 1.0 if total_duration < 10*60 else (2.0 if total_duration < 20*60 else 5.0)
+    work_scale = 1.0
+
+    scaled_times, speeds, scaled_blocks = [0], [], []
+    visual_time = 0
+
+    for label, duration, _, speed in program:
+        duration = float(duration)
+        scale = warmup_scale if "W-UP" in label else cooldown_scale if "Cool" in label else work_scale
+        vis_duration = duration * scale
+        scaled_blocks.append((label, vis_duration, visual_time, speed))
+        visual_time += vis_duration
+        scaled_times.append(visual_time)
+        speeds.append(speed)
+    return scaled_times, speeds, scaled_blocks
+
+
+def nice_ticks(lo, hi, target=6):
+    """Round-numbered ticks covering [lo, hi], about target of them"""
+    span = hi - lo
+    if span <= 0:
+        return [lo]
+    raw = span / target
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    first = math.ceil(lo / step - 1e-9) * step
+    ticks = []
+    value = first
+    while value <= hi + 1e-9:
+        ticks.append(round(value, 10))
+        value += step
+    return ticks
+
+
+def trend_timeline(tested_at):
+    """
+    Days since the first test for each test date, plus x ticks on round
+    day counts and their date labels: (days, ticks, labels).
+    """
+    first = min(tested_at)
+    days = [(ts - first) / 86400 for ts in tested_at]
+    ticks = nice_ticks(0, max(days), target=5)
+    labels = [datetime.fromtimestamp(first + day * 86400).strftime("%d %b %y") for day in ticks]
+    return days, ticks, labels
+
+
+def format_tick_seconds(sec):
+    """Axis tick label for a time in seconds (truncated to whole seconds)"""
+    m, s = divmod(int(sec), 60)
+    return f"{m}:{s:02d}"
+
 
+@instrumented("program_plot")
+def _render_program_speed_plot(program, unit):
     try:
+        import matplotlib.patches as patches
+
+        program = Program.coerce(program)
+
         # Compute scaled times for visualization
-        total_duration = sum(float(duration) for _, duration, _, _ in program_data)
-        warmup_scale = cooldown_scale = 1.0 if total_duration < 10*60 else (2.0 if total_duration < 20*60 else 5.0)
-        work_scale = 1.0
-
-        scaled_times, speeds, scaled_blocks = [0], [], []
-        visual_time = 0
-
-        for label, duration, _, speed in program_data:
-            duration = float(duration)
-            scale = warmup_scale if "W-UP" in label else cooldown_scale if "Cool" in label else work_scale
-            vis_duration = duration * scale
-            scaled_blocks.append((label, vis_duration, visual_time, speed))
-            visual_time += vis_duration
-            scaled_times.append(visual_time)
-            speeds.append(speed)
-
-        fig, ax = plt.subplots(figsize=(9, 3))
-        speeds_extended = speeds + [speeds[-1]]
-        ax.step(scaled_times, speeds_extended, where='post', color='blue', linewidth=2)
-
-        # Add colored blocks and speed labels
-        for label, vis_duration, vis_start, speed in scaled_blocks:
-            mid = vis_start + vis_duration / 2
-            ax.text(mid, speed + 0.3, f"{speed:.1f} {unit}", ha='center', fontsize=7)
-            color = 'lightblue' if "W-UP" in label else 'lightpink' if "Cool" in label else None
-            if color:
-                rect = patches.Rectangle((vis_start, 0), vis_duration, max(speeds) + 2, facecolor=color, alpha=0.3)
-                ax.add_patch(rect)
-
-        ax.set_xlabel("Time (visually scaled)")
-        ax.set_ylabel(f"Speed ({unit})")
-        ax.set_title("Program Speed Over Time")
-        ax.set_ylim(0, max(speeds) + 2)
-        ax.grid(True, linestyle='--', alpha=0.5)
-
-        # X-axis real times
-        real_times = [sum(float(row[1]) for row in program_data[:i]) for i in range(len(program_data) + 1)]
-        ax.set_xticks(scaled_times)
-        ax.set_xticklabels([format_seconds(t) for t in real_times], rotation=45)
-
-        return _save_plot_to_memory(fig)
+        scaled_times, speeds, scaled_blocks = scale_program_timeline(program)
+
+        with figure_pool.acquire((9, 3)) as (fig, ax):
+            speeds_extended = speeds + [speeds[-1]]
+            ax.step(scaled_times, speeds_extended, where='post', color='blue', linewidth=2)
+
+            # Add colored blocks and speed labels
+            top = program.max_speed + 2
+            for label, vis_duration, vis_start, speed in scaled_blocks:
+                mid = vis_start + vis_duration / 2
+                ax.text(mid, speed + 0.3, f"{speed:.1f} {unit}", ha='center', fontsize=7)
+                color = 'lightblue' if "W-UP" in label else 'lightpink' if "Cool" in label else None
+                if color:
+                    rect = patches.Rectangle((vis_start, 0), vis_duration, top, facecolor=color, alpha=0.3)
+                    ax.add_patch(rect)
+
+            ax.set_xlabel("Time (visually scaled)")
+            ax.set_ylabel(f"Speed ({unit})")
+            ax.set_title("Program Speed Over Time")
+            ax.set_ylim(0, top)
+            ax.grid(True, linestyle='--', alpha=0.5)
+
+            # X-axis real times
+            real_times = program.cumulative_times
+            ax.set_xticks(scaled_times)
+            ax.set_xticklabels([format_tick_seconds(t) for t in real_times], rotation=45)
+
+            incr("renders", kind="program_plot")
+            return save_figure_png(fig).getvalue()
 
     except Exception as e:
         print(f"Error creating program speed plot: {e}")
+        incr("errors", stage="program_plot")
+        return None
+
+
+def create_trend_plot(tested_at, lines, title, ylabel):
+    """
+    Create a metric-over-time plot for a progress report.
+    lines: [(label, values, color)], values aligned with tested_at (None where missing)
+    """
+    if not tested_at or not any(v is not None for _, values, _ in lines for v in values):
+        return None
+    key = make_plot_key("trend", tested_at=list(tested_at), lines=[list(line) for line in lines],
+                        title=title, ylabel=ylabel)
+    data = plot_cache.get_or_render(key, lambda: _render_trend_plot(tested_at, lines, title, ylabel))
+    return BytesIO(data) if data is not None else None
+
+
+@instrumented("trend_plot")
+def _render_trend_plot(tested_at, lines, title, ylabel):
+    try:
+        days, ticks, labels = trend_timeline(tested_at)
+        with figure_pool.acquire((8, 3)) as (fig, ax):
+            for label, values, color in lines:
+                points = [(d, v) for d, v in zip(days, values) if v is not None]
+                if points:
+                    xs, ys = zip(*points)
+                    ax.plot(xs, ys, marker='o', linestyle='-', color=color, label=label)
+            ax.set_xlabel("Test date")
+            ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            ax.set_xticks(ticks)
+            ax.set_xticklabels(labels)
+            ax.grid(True, linestyle='--', alpha=0.5)
+            ax.legend(loc='upper left')
+
+            incr("renders", kind="trend_plot")
+            return save_figure_png(fig).getvalue()
+
+    except Exception as e:
+        print(f"Error creating trend plot: {e}")
+        incr("errors", stage="trend_plot")
         return None
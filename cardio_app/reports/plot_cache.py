@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache for rendered plot images.
+
+Plots are keyed on a canonical hash of their inputs and stored as encoded
+PNG bytes in a bounded in-memory LRU. An optional on-disk tier (shared by
+every worker process pointing at the same directory) keeps identical plots
+from being rendered twice across requests and processes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from cardio_app.instrumentation import incr
+
+# Bump when plot styling changes so stale renders are not served
+PLOT_CACHE_VERSION = 1
+
+
+def _canonical(value):
+    """Convert plot inputs to JSON-stable builtins (numpy scalars, tuples...)"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, str) or value is None or isinstance(value, bool):
+        return value
+    if hasattr(value, "item"):  # numpy scalar
+        value = value.item()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return str(value)
+
+
+def make_plot_key(kind, **inputs):
+    """Return a hex digest identifying a plot of the given kind and inputs"""
+    payload = {"kind": kind, "version": PLOT_CACHE_VERSION, "inputs": _canonical(inputs)}
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class PlotCache:
+    def __init__(self, max_entries=256, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return cached PNG bytes for key, or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                incr("plot_cache_hits", tier="memory")
+                return data
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is not None:
+                self.disk_hits += 1
+                self._remember(key, data)
+            else:
+                self.misses += 1
+        if data is not None:
+            incr("plot_cache_hits", tier="disk")
+        else:
+            incr("plot_cache_misses")
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def get_or_render(self, key, render):
+        """
+        Return cached bytes for key, calling render() on a miss.
+        render must return PNG bytes, or None when nothing could be drawn
+        (None results are not cached).
+        """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if data is not None:
+                self.put(key, data)
+        return data
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _remember(self, key, data):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = data
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.png")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        # Write then rename so concurrent workers never read a partial file
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"Plot cache could not write {key}: {e}")
+
+
+plot_cache = PlotCache(
+    max_entries=int(os.environ.get("CARDIO_PLOT_CACHE_SIZE", "256")),
+    disk_dir=os.environ.get("CARDIO_PLOT_CACHE_DIR") or None,
+)
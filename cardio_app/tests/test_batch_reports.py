@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for batch cohort report generation
+"""
+
+import json
+import os
+
+from cardio_app.batch_reports import _output_paths, load_clients, main, normalize_client, run_batch
+
+RAMP = "2.0:1;2.5:2;3.0:3;3.5:4;4.0:5;4.5:6;5.0:7;5.5:8;6.0:9;6.5:10"
+
+
+def test_normalize_csv_row():
+    client = normalize_client({"client_name": " Ann ", "unit": "KMH", "ramp": RAMP,
+                               "wingate_speeds": "9;9.5;9.2;8.8;8.5;8", "trainings": "endurance:30;explosive:10"})
+    assert client["client_name"] == "Ann"
+    assert client["unit"] == "kmh"
+    assert client["ramp_data"][0] == {"Speed": 2.0, "RPE": 1.0}
+    assert len(client["wingate_data"]) == 6
+    assert client["trainings"] == [{"training_type": "endurance", "duration": 30},
+                                   {"training_type": "explosive", "duration": 10}]
+
+
+def test_run_batch_isolates_client_errors(tmp_path):
+    clients = [
+        {"client_name": "Ann", "ramp": RAMP, "trainings": "endurance:20"},
+        {"client_name": "Bob", "ramp": "", "trainings": "endurance:20"},
+        {"client_name": "Ann", "ramp": RAMP.split(";"), "trainings": [{"training_type": "explosive", "duration": 10}]},
+    ]
+    seen = []
+    summary = run_batch(clients, str(tmp_path), workers=1, progress=lambda d, t, r: seen.append(d))
+
+    assert summary["succeeded"] == 2
+    assert summary["failed"] == 1
+    assert summary["failures"][0]["client_name"] == "Bob"
+    assert seen == [1, 2, 3]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Ann_2_cardio_report.pdf", "Ann_cardio_report.pdf"]
+    assert summary["reports_per_sec"] > 0
+
+
+def test_output_paths_never_repeat():
+    names = ["Ann", "Ann", "Ann 2", "Ann_2", None, ""]
+    paths = _output_paths([{"client_name": name} for name in names], "out")
+    assert [os.path.basename(p) for p in paths] == [
+        "Ann_cardio_report.pdf", "Ann_2_cardio_report.pdf", "Ann_2_2_cardio_report.pdf",
+        "Ann_2_3_cardio_report.pdf", "client_cardio_report.pdf", "client_2_cardio_report.pdf",
+    ]
+
+
+def test_cli_reads_json(tmp_path, capsys):
+    source = tmp_path / "clients.json"
+    source.write_text(json.dumps({"clients": [
+        {"client_name": "Cy", "unit": "mph", "ramp": RAMP.split(";"), "trainings": ["power_endurance:15"]},
+    ]}))
+    assert len(load_clients(str(source))) == 1
+
+    out_dir = tmp_path / "out"
+    assert main([str(source), "-o", str(out_dir), "-w", "2", "-q"]) == 0
+    assert (out_dir / "Cy_cardio_report.pdf").read_bytes().startswith(b"%PDF")
+    assert "1/1 reports written" in capsys.readouterr().out
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the vectorized cohort metrics engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardio_app.logic.cohort_metrics import calculate_cohort_metrics, cohort_metrics_to_dicts
+from cardio_app.logic.metrics import calculate_metrics
+
+
+def _random_cohort(n_clients, seed=0):
+    rng = np.random.default_rng(seed)
+    ramp_rows, wingate_rows = [], []
+    for client in range(n_clients):
+        n = int(rng.integers(1, 300 if client % 25 == 0 else 35))
+        speeds = 2.0 + 0.5 * np.arange(n) + rng.normal(0, 0.07, n)
+        rpe = np.sort(rng.choice(np.arange(0, 10.5, 0.5), n))
+        for s, r in zip(speeds, rpe):
+            ramp_rows.append((f"c{client}", s, r))
+        if client % 3:
+            for s in rng.uniform(6, 12, 6):
+                wingate_rows.append((f"c{client}", s))
+    ramp = pd.DataFrame(ramp_rows, columns=["client_id", "Speed", "RPE"])
+    wingate = pd.DataFrame(wingate_rows, columns=["client_id", "Speed"])
+    return ramp, wingate
+
+
+@pytest.mark.parametrize("unit", ["mph", "kmh"])
+def test_cohort_matches_calculate_metrics_exactly(unit):
+    ramp, wingate = _random_cohort(300)
+    cohort = cohort_metrics_to_dicts(calculate_cohort_metrics(ramp, wingate, unit=unit), unit=unit)
+
+    for client_id, client_ramp in ramp.groupby("client_id", sort=False):
+        client_wingate = wingate[wingate["client_id"] == client_id]
+        expected = calculate_metrics(
+            client_ramp[["Speed", "RPE"]].reset_index(drop=True),
+            client_wingate[["Speed"]].reset_index(drop=True) if not client_wingate.empty else None,
+            unit,
+        )
+        assert cohort[client_id] == expected, client_id
+
+
+def test_cohort_accepts_arrays_and_missing_bands():
+    ids = np.array([1, 1, 1, 2, 2])
+    speeds = np.array([2.0, 2.5, 3.0, 4.0, 5.0])
+    rpe = np.array([1, 4, 10, 7, 8])
+    result = calculate_cohort_metrics((ids, speeds, rpe))
+
+    assert result.loc[1, "VO2max Speed (mph)"] == 3.0
+    assert np.isnan(result.loc[1, "Anaerobic Threshold (mph)"])
+    assert result.loc[2, "VO2max Speed (mph)"] == 5.0
+    assert result.loc[2, "Anaerobic Threshold (mph)"] == 4.5
+    assert cohort_metrics_to_dicts(result)[2]["Aerobic Threshold (mph)"] is None
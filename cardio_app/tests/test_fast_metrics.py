@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the pandas-free metrics path
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardio_app.logic.data_collection import collect_ramp_data, collect_ramp_test, collect_wingate_test
+from cardio_app.logic.metrics import _pairwise_sum, calculate_metrics, calculate_metrics_fast
+from cardio_app.logic.ramp_data import RampData, WingateData
+
+
+def _pandas_metrics(ramp_df, wingate_df, unit):
+    """The original DataFrame implementation, kept as the reference"""
+    metrics = {}
+    if ramp_df is not None and not ramp_df.empty:
+        col = "Speed"
+        aerobic = ramp_df[(ramp_df["RPE"] > 2) & (ramp_df["RPE"] < 6)][col].mean()
+        anaerobic = ramp_df[(ramp_df["RPE"] > 6) & (ramp_df["RPE"] < 9)][col].mean()
+        vo2max = (ramp_df[ramp_df["RPE"] == 10][col].values[0]
+                  if not ramp_df[ramp_df["RPE"] == 10].empty else ramp_df[col].max())
+        metrics[f"Aerobic Threshold ({unit})"] = round(aerobic, 2) if not pd.isna(aerobic) else None
+        metrics[f"Anaerobic Threshold ({unit})"] = round(anaerobic, 2) if not pd.isna(anaerobic) else None
+        metrics[f"VO2max Speed ({unit})"] = round(vo2max, 2)
+        metrics[f"Ramp Avg Speed ({unit})"] = ramp_df[col].mean()
+    if wingate_df is not None and not wingate_df.empty:
+        col = f"Speed ({unit})"
+        peak = wingate_df[col].max()
+        metrics.update({
+            f"Wingate Peak Speed ({unit})": round(peak, 2),
+            f"Wingate Average Speed ({unit})": round(wingate_df[col].mean(), 2),
+            "Fatigue Index (%)": round((wingate_df[col].iloc[-1] / peak) * 100, 2),
+        })
+    return metrics
+
+
+def test_pairwise_sum_matches_numpy():
+    rng = np.random.default_rng(1)
+    for n in list(range(0, 40)) + [127, 128, 129, 300, 1001]:
+        values = (rng.normal(0, 1, n) * 10.0 ** rng.integers(-6, 6, n)).tolist()
+        assert _pairwise_sum(values, 0, n) == float(np.sum(values))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_metrics_match_pandas_reference(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(200):
+        n = int(rng.integers(1, 40))
+        ramp_df = pd.DataFrame({"Speed": 2.0 + 0.5 * np.arange(n) + rng.normal(0, 0.05, n),
+                                "RPE": np.sort(rng.choice(np.arange(0, 10.5, 0.5), n))})
+        wingate_df = collect_wingate_test("mph", rng.uniform(5, 12, 6).round(3).tolist())
+        expected = _pandas_metrics(ramp_df, wingate_df, "mph")
+        assert calculate_metrics(ramp_df, wingate_df, "mph") == expected
+        fast = calculate_metrics_fast(RampData.from_dataframe(ramp_df),
+                                      WingateData.from_records(wingate_df.to_dict(orient="records")), "mph")
+        assert fast == expected
+
+
+def test_missing_bands_give_none():
+    metrics = calculate_metrics_fast(RampData([2.0, 2.5, 3.0], [1, 2, 10]), None, "kmh")
+    assert metrics["Aerobic Threshold (kmh)"] is None
+    assert metrics["Anaerobic Threshold (kmh)"] is None
+    assert metrics["VO2max Speed (kmh)"] == 3.0
+
+
+def test_collect_ramp_data_matches_dataframe_api():
+    ramp, unit = collect_ramp_data("km/h", [1, 3, 5, 10, 4])
+    df, _ = collect_ramp_test("km/h", [1, 3, 5, 10, 4])
+    assert unit == "kmh"
+    assert ramp.speeds == (4.0, 5.0, 6.0, 7.0)
+    assert RampData.from_dataframe(df) == ramp
+
+
+def test_records_round_trip():
+    ramp = RampData([2.0, 2.5], [1, 4])
+    assert RampData.from_records(ramp.to_records()) == ramp
+    assert RampData.from_records(ramp.to_columns()) == ramp
+    wingate = WingateData.from_speeds([9, 8, 7, 6, 5, 4])
+    assert WingateData.from_records(wingate.to_records("kmh"), "kmh") == wingate
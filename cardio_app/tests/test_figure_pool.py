@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the per-thread Matplotlib figure pool
+"""
+
+import threading
+
+import pytest
+from matplotlib import rcParams
+
+from cardio_app.reports.figure_pool import FigurePool, figure_pool
+from cardio_app.reports.pdf_tables import create_metrics_table_image
+from cardio_app.reports.pdf_visuals import _render_ramp_test_plot
+
+RAMP_ARGS = ([2.0, 2.5, 3.0, 3.5, 4.0], [1, 3, 5, 7, 9], 2.6, 3.4, "mph")
+
+
+@pytest.fixture
+def fresh_pool():
+    figure_pool.clear()
+    yield figure_pool
+    figure_pool.clear()
+
+
+def test_figures_are_reused_and_cleared():
+    pool = FigurePool(max_idle=1)
+    with pool.acquire((4, 2)) as (fig, ax):
+        ax.plot([0, 1], [0, 1])
+        ax.axis("off")
+        fig.tight_layout()
+    with pool.acquire((6, 3)) as (again, ax2):
+        assert again is fig and ax2 is ax
+        assert list(fig.get_size_inches()) == [6, 3]
+        assert not ax.lines and ax.axison
+        assert fig.subplotpars.left == rcParams["figure.subplot.left"]
+        with pool.acquire((6, 3)) as (other, _):
+            assert other is not fig
+
+
+def test_threads_get_their_own_figures():
+    pool = FigurePool()
+    figures = []
+
+    def grab():
+        with pool.acquire((4, 2)) as (fig, _):
+            figures.append(fig)
+
+    threads = [threading.Thread(target=grab) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert figures[0] is not figures[1]
+
+
+def test_pooled_renders_match_fresh_figures(fresh_pool):
+    fresh_pool.max_idle = 0
+    try:
+        expected = _render_ramp_test_plot(*RAMP_ARGS)
+    finally:
+        fresh_pool.max_idle = 4
+    create_metrics_table_image({"VO2max": 41.3})  # leaves a used figure in the pool
+    assert _render_ramp_test_plot(*RAMP_ARGS) == expected
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_render_ramp_test_plot(*RAMP_ARGS)))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [expected] * 3
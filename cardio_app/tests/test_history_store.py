@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the SQLite athlete history store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardio_app import main
+from cardio_app.logic import history_store
+from cardio_app.logic.history_store import HistoryStore
+from cardio_app.logic.program import Program
+from cardio_app.logic.ramp_data import RampData, WingateData
+
+WINGATE = WingateData.from_speeds([9.0, 9.5, 9.2, 8.8, 8.5, 8.0])
+
+
+def _ramp(top):
+    speeds = [3.0 + 0.5 * i for i in range(int((top - 3.0) / 0.5) + 1)]
+    rpe = np.floor(np.linspace(1, 10, len(speeds))).tolist()
+    return RampData(speeds, rpe)
+
+
+def test_same_session_is_updated_not_duplicated(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"))
+    first = store.record_test("Jane Doe", "mph", _ramp(8.0), WINGATE, tested_at=100, session_id="s1")
+    again = store.record_test(" jane  doe ", "mph", _ramp(8.0), WINGATE, threshold_method="piecewise",
+                              tested_at=200, session_id="s1")
+    assert again == first
+    assert store.stats()["tests"] == 1 and store.stats()["athletes"] == 1
+
+    (test,) = store.last_tests("JANE DOE")
+    assert test["tested_at"] == 100 and test["threshold_method"] == "piecewise"
+    assert test["vo2max_speed"] == 8.0 and test["wingate_peak_speed"] == 9.5
+
+    unit, ramp, wingate = store.test_data(first)
+    assert unit == "mph" and ramp == _ramp(8.0) and wingate == WINGATE
+
+    store.record_programs(first, [("Endurance", 20, [("Jog", 60, 0, 5.0)])])
+    store.record_programs(first, [("endurance", 20, [("Jog", 60, 0, 5.5)])])
+    assert store.programs(first) == {"endurance": Program([("Jog", 60, 0, 5.5)])}
+    store.close()
+
+
+def test_retest_with_identical_values_is_a_new_test():
+    store = HistoryStore(":memory:")
+    first = store.record_test("Ann", "mph", _ramp(8.0), tested_at=0, session_id="week-1")
+    second = store.record_test("Ann", "mph", _ramp(8.0), tested_at=28 * 86400, session_id="week-5")
+    assert second != first
+    assert [t["tested_at"] for t in store.last_tests("Ann")] == [28 * 86400, 0]
+    assert store.trends("Ann")["vo2max_speed"]["tests"] == 2
+
+    # The session's data changed (e.g. Wingate results added): same record, new metrics
+    store.record_test("Ann", "mph", _ramp(8.0), WINGATE, tested_at=99, session_id="week-5")
+    assert store.stats()["tests"] == 2
+    assert store.last_tests("Ann")[0]["wingate_peak_speed"] == 9.5
+    assert store.trends("Ann")["wingate_peak_speed"]["tests"] == 1
+
+
+def test_stores_keyed_on_fingerprint_are_migrated(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / "history.db")
+    old_schema = history_store.SCHEMA.replace("    session_id TEXT NOT NULL UNIQUE,\n", "").replace(
+        "    fatigue_index REAL\n);", "    fatigue_index REAL,\n    UNIQUE (athlete_id, fingerprint)\n);", 1)
+    with sqlite3.connect(path) as conn:
+        conn.executescript(old_schema)
+        conn.execute("INSERT INTO athletes (key, name) VALUES ('ann', 'Ann')")
+        conn.execute("INSERT INTO tests (athlete_id, tested_at, unit, fingerprint, threshold_method, ramp, "
+                     "vo2max_speed) VALUES (1, 0, 'mph', 'f', 'band', '{\"Speed\": [8.0], \"RPE\": [10]}', 8.0)")
+        conn.execute("INSERT INTO programs (test_id, training_type, duration, intervals) "
+                     "VALUES (1, 'endurance', 20, '[]')")
+    conn.close()
+
+    store = HistoryStore(path)
+    store.record_test("Ann", "mph", _ramp(8.0), tested_at=1)
+    assert [t["tested_at"] for t in store.last_tests("Ann")] == [1, 0]
+    assert list(store.programs(store.last_tests("Ann")[1]["id"])) == ["endurance"]
+    store.close()
+
+
+def test_last_tests_and_vo2max_drops():
+    store = HistoryStore(":memory:")
+    for day, top in enumerate([8.0, 8.5, 9.0]):
+        store.record_test("Ann", "mph", _ramp(top), tested_at=day)
+    for day, top in enumerate([9.0, 8.0]):
+        store.record_test("Bob", "mph", _ramp(top), tested_at=day)
+    # 15 km/h is 9.3 mph: a drop from 9.5 mph of only ~2%
+    store.record_test("Cy", "mph", _ramp(9.5), tested_at=0)
+    store.record_test("Cy", "kmh", _ramp(15.0), tested_at=1)
+
+    assert [t["vo2max_speed"] for t in store.last_tests("Ann", n=2)] == [9.0, 8.5]
+    assert store.last_tests("Nobody") == []
+
+    drops = store.vo2max_drops(min_drop=0.05)
+    assert [d["athlete"] for d in drops] == ["Bob"]
+    assert round(drops[0]["change"], 3) == -0.111
+    assert [d["athlete"] for d in store.vo2max_drops(min_drop=0.01)] == ["Bob", "Cy"]
+
+
+def test_columnar_export(tmp_path):
+    store = HistoryStore(":memory:")
+    store.record_test("Ann", "mph", _ramp(8.0), WINGATE, tested_at=1)
+    store.record_test("Bob", "mph", _ramp(9.0), tested_at=2)
+
+    columns = store.columns()
+    assert columns["athlete"] == ["Ann", "Bob"]
+    assert columns["wingate_peak_speed"] == [9.5, None]
+
+    arrays = np.load(store.export(str(tmp_path / "history.npz")))
+    assert arrays["vo2max_speed"].tolist() == [8.0, 9.0] and np.isnan(arrays["fatigue_index"][1])
+    frame = pd.read_csv(store.export(str(tmp_path / "history.csv")))
+    assert list(frame["athlete"]) == ["Ann", "Bob"]
+
+
+def test_disabled_store_keeps_nothing():
+    store = HistoryStore()
+    assert store.record_test("Ann", "mph", _ramp(8.0)) is None
+    store.record_programs(None, [("endurance", 20, [])])
+    assert store.last_tests("Ann") == [] and store.vo2max_drops() == []
+    assert store.stats()["enabled"] is False
+
+
+def _trends_after_rebuild(store, athlete):
+    with store._lock:
+        conn = store._connect()
+        with conn:
+            store._rebuild_trends(conn)
+    return store.trends(athlete)
+
+
+def test_running_aggregates_match_a_full_rebuild():
+    store = HistoryStore(":memory:")
+    week = 7 * 86400
+    for i, top in enumerate([8.0, 8.5, 9.0, 9.5]):
+        store.record_test("Ann", "mph", _ramp(top), WINGATE if i % 2 else None, tested_at=1.7e9 + i * week,
+                          session_id=f"s{i}")
+    store.record_test("Ann", "kmh", _ramp(14.5), tested_at=1.7e9 + 4 * week)
+    # Saved again with another threshold method: the aggregates are rebuilt for Ann
+    store.record_test("Ann", "mph", _ramp(8.0), threshold_method="piecewise", tested_at=0, session_id="s0")
+
+    trends = store.trends("Ann")
+    vo2max = trends["vo2max_speed"]
+    assert vo2max["tests"] == 5 and vo2max["min"] == 8.0 and vo2max["max"] == 9.5
+    assert round(vo2max["latest"], 6) == round(14.5 / 1.609344, 6)
+    assert trends["fatigue_index"]["tests"] == 2 and trends["fatigue_index"]["slope_per_week"] is not None
+    assert round(store.trends("Ann", unit="kmh")["vo2max_speed"]["latest"], 6) == 14.5
+
+    rebuilt = _trends_after_rebuild(store, "Ann")
+    for metric, summary in trends.items():
+        for name, value in summary.items():
+            assert value == (None if rebuilt[metric][name] is None else pytest.approx(rebuilt[metric][name]))
+
+
+def test_slope_and_progress_use_stored_metrics_only(monkeypatch):
+    store = HistoryStore(":memory:")
+    for i in range(120):
+        store.record_test("Ann", "mph", RampData([3.0, 5.0 + 0.01 * i], [1, 10]), tested_at=i * 7 * 86400.0)
+    assert store.trends("Ann")["vo2max_speed"]["slope_per_week"] == pytest.approx(0.01)
+
+    monkeypatch.setattr(history_store, "calculate_metrics_fast", None)
+    progress = store.progress("Ann")
+    assert len(progress["series"]["tested_at"]) == 120
+    assert progress["series"]["vo2max_speed"][-1] == 6.19
+    assert store.progress("Nobody") is None
+
+
+def _tk_session(monkeypatch, client_name):
+    # CardioApp without a display: only its shared_data and methods are used
+    store = HistoryStore(":memory:")
+    monkeypatch.setattr(main, "history_store", store)
+    app = main.CardioApp.__new__(main.CardioApp)
+    app.shared_data = {"unit": "mph", "client_name": client_name, "ramp_df": _ramp(8.0).to_dataframe(),
+                       "wingate_df": None, "metrics": None, "history_test_id": None,
+                       "history_session": "tk-session", "all_programs": {}}
+    # Ramp test finished, then the Wingate results are entered
+    app.calculate_and_prepare()
+    app.shared_data["wingate_df"] = pd.DataFrame({"Time": WINGATE.times, "Speed": WINGATE.speeds})
+    app.calculate_and_prepare()
+    app.build_program("endurance", 20)
+    app.build_program("explosive", 15)
+    return store
+
+
+def test_tk_session_is_recorded_once(monkeypatch):
+    store = _tk_session(monkeypatch, "Ann")
+    assert store.stats()["tests"] == 1
+    (test,) = store.last_tests("Ann")
+    assert test["wingate_peak_speed"] == 9.5
+    assert sorted(store.programs(test["id"])) == ["endurance", "explosive"]
+    assert store.trends("Ann")["vo2max_speed"]["tests"] == 1
+
+    assert _tk_session(monkeypatch, "  ").stats()["tests"] == 0
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for stage timers, counters and the /metrics endpoint
+"""
+
+import pytest
+
+from cardio_app import instrumentation
+from cardio_app.reports import plot_cache
+from cardio_app.webapp import create_app
+
+RAMP_INPUTS = [f"{2.0 + 0.5 * i}:{rpe}" for i, rpe in enumerate([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])]
+
+
+@pytest.fixture
+def metrics_on():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.enable(False)
+    instrumentation.reset()
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    instrumentation.enable(False)
+    with instrumentation.timed("stage"):
+        instrumentation.incr("renders", kind="x")
+    assert instrumentation.snapshot() == {"timers": {}, "counters": {}}
+
+
+def test_timers_counters_and_errors(metrics_on):
+    with instrumentation.timed("fast"):
+        pass
+    with pytest.raises(ValueError):
+        with instrumentation.timed("broken"):
+            raise ValueError("boom")
+    instrumentation.incr("report_bytes", 100)
+    instrumentation.incr("report_bytes", 50)
+
+    data = instrumentation.snapshot()
+    assert data["timers"]["fast"]["count"] == 1
+    assert data["counters"][("report_bytes", ())] == 150
+    assert data["counters"][("errors", (("stage", "broken"),))] == 1
+
+    text = instrumentation.render_prometheus()
+    assert 'cardio_stage_seconds_count{stage="fast"} 1' in text
+    assert "cardio_report_bytes_total 150" in text
+    assert 'cardio_errors_total{stage="broken"} 1' in text
+
+
+def test_metrics_endpoint_reports_generate_stages(metrics_on, monkeypatch):
+    monkeypatch.setattr(plot_cache, "plot_cache", plot_cache.PlotCache(max_entries=0))
+    monkeypatch.setattr("cardio_app.reports.pdf_visuals.plot_cache", plot_cache.plot_cache)
+    client = create_app().test_client()
+    client.post("/next", data={"client_name": "Jane Doe", "unit": "mph", "ramp_rpe_inputs": RAMP_INPUTS})
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    pdf = client.post("/generate").data
+
+    text = client.get("/metrics").get_data(as_text=True)
+    for stage in ("generate", "calculate_metrics", "build_programs", "render_images",
+                  "assemble_pages", "save_pdf", "ramp_plot", "program_plot", "metrics_table_vector"):
+        assert f'cardio_stage_seconds_count{{stage="{stage}"}} 1' in text
+    assert 'cardio_renders_total{kind="program_plot"} 1' in text
+    assert "cardio_plot_cache_misses_total 2" in text
+    assert f"cardio_report_bytes_total {len(pdf)}" in text
+
+
+def test_metrics_endpoint_is_404_when_disabled():
+    instrumentation.enable(False)
+    assert create_app().test_client().get("/metrics").status_code == 404
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the background report job queue
+"""
+
+import threading
+import time
+
+import pytest
+
+from cardio_app.webapp import jobs
+from cardio_app.webapp.jobs import QueueFull, ReportJobQueue
+from cardio_app.webapp.report_store import ReportStore
+
+
+def _wait_for(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = queue.status(job_id)
+        if status["status"] in ("done", "failed"):
+            return status
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def test_job_result_is_kept_until_retention_expires():
+    queue = ReportJobQueue(max_workers=1, retention=60, executor="thread")
+    job_id = queue.submit(lambda: b"%PDF-1.4", filename="a.pdf")
+    status = _wait_for(queue, job_id)
+    assert status["status"] == "done"
+    assert status["size"] == 8
+    assert queue.result(job_id) == (b"%PDF-1.4", "a.pdf")
+
+    queue.retention = 0
+    time.sleep(0.01)
+    assert queue.status(job_id) is None
+    queue.shutdown()
+
+
+def test_failed_job_reports_error():
+    queue = ReportJobQueue(max_workers=1, executor="thread")
+    job_id = queue.submit(_fail)
+    status = _wait_for(queue, job_id)
+    assert status["status"] == "failed"
+    assert "boom" in status["error"]
+    assert queue.result(job_id) == (None, None)
+    queue.shutdown()
+
+
+def test_queue_applies_backpressure():
+    release = threading.Event()
+    queue = ReportJobQueue(max_workers=1, max_pending=2, executor="thread")
+    queue.submit(lambda: release.wait() and b"x")
+    queue.submit(lambda: release.wait() and b"y")
+    with pytest.raises(QueueFull):
+        queue.submit(lambda: b"z")
+    release.set()
+    queue.shutdown()
+
+
+def test_process_executor_runs_report_function():
+    queue = ReportJobQueue(max_workers=1, executor="process")
+    job_id = queue.submit(bytes, 3)
+    assert _wait_for(queue, job_id)["status"] == "done"
+    assert queue.result(job_id)[0] == b"\x00\x00\x00"
+    queue.shutdown()
+
+
+def test_jobs_are_visible_to_every_worker(tmp_path, monkeypatch):
+    store = ReportStore()
+    monkeypatch.setattr(jobs, "report_store", store)
+    path = str(tmp_path / "jobs.sqlite3")
+    # Two queues on one file stand in for two gunicorn workers
+    worker, other = ReportJobQueue(max_workers=1, path=path), ReportJobQueue(max_workers=1, path=path)
+    job_id = worker.submit(bytes, 3, filename="a.pdf", store_key="k" * 64)
+    _wait_for(worker, job_id)
+
+    assert other.status(job_id)["status"] == "done"
+    assert other.result(job_id) == (b"\x00\x00\x00", "a.pdf")
+    # Stored by the submitting process, not the pool process that built it
+    assert store.get("k" * 64) == b"\x00\x00\x00" and store.filename("k" * 64) == "a.pdf"
+    worker.shutdown()
+
+
+def test_process_wide_queue_is_created_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(jobs, "_job_queue", None)
+    monkeypatch.setenv("CARDIO_JOB_DB", str(tmp_path / "jobs.sqlite3"))
+    queues = []
+    threads = [threading.Thread(target=lambda: queues.append(jobs.get_job_queue())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(queue) for queue in queues}) == 1
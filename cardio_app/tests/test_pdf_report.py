@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the PDF report builder
+"""
+
+import tempfile
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import matplotlib
+import pandas as pd
+import pytest
+from fpdf import FPDF
+
+from cardio_app.logic.history_store import HistoryStore
+from cardio_app.logic.metrics import calculate_metrics
+from cardio_app.logic.program_builder import CardioProgramBuilder
+from cardio_app.logic.ramp_data import WingateData
+from cardio_app.reports import pdf_report, pdf_visuals
+from cardio_app.reports.pdf_report import PDFReportBuilder, ReportCancelled, prerender_cover
+from cardio_app.reports.pdf_tables import draw_program_table, _program_table_rows
+from cardio_app.reports.pdf_vector_plots import nice_ticks
+
+UNICODE_FONT = str(Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf")
+UNICODE_NAME = "Łukasz Żółć-Müller"
+
+
+@pytest.fixture
+def report_inputs():
+    ramp_df = pd.DataFrame({
+        "Speed": [2.0 + 0.5 * i for i in range(12)],
+        "RPE": [1, 2, 3, 3, 4, 5, 6, 7, 7, 8, 9, 10],
+    })
+    metrics = calculate_metrics(ramp_df, None, "mph")
+    aerobic = metrics["Aerobic Threshold (mph)"]
+    anaerobic = metrics["Anaerobic Threshold (mph)"]
+    programs = {}
+    for training_type in ("explosive", "endurance"):
+        builder = CardioProgramBuilder(20, 7.5, aerobic, aerobic, anaerobic, unit="mph")
+        programs[training_type.capitalize()] = builder.build_program(training_type)
+    return metrics, programs, ramp_df
+
+
+def test_program_table_rows_format_start_time_and_speed():
+    header, rows = _program_table_rows([("Sprint", 20, 65, 7.4567)], unit="kmh")
+    assert header[-1] == "Speed (kmh)"
+    assert rows == [["Sprint", "20", "1:05", "7.5"]]
+
+
+def test_draw_program_table_repeats_header_on_page_break():
+    pdf = FPDF()
+    pdf.add_page()
+    program = [("Jog", 60, i * 60, 5.0) for i in range(80)]
+    draw_program_table(pdf, program, unit="mph")
+    assert pdf.page_no() > 1
+
+
+@pytest.mark.parametrize("table_mode", ["vector", "png"])
+def test_build_pdf_table_modes(tmp_path, report_inputs, table_mode):
+    metrics, programs, ramp_df = report_inputs
+    builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df,
+                               table_mode=table_mode)
+    builder.build_pdf()
+    output = builder.save_pdf(str(tmp_path / "report.pdf"))
+    assert (tmp_path / "report.pdf").read_bytes().startswith(b"%PDF")
+    assert builder.pdf.page_no() == 1 + len(programs)
+    assert output.endswith("report.pdf")
+
+
+def test_build_pdf_reports_progress_and_can_be_cancelled(report_inputs):
+    metrics, programs, ramp_df = report_inputs
+    steps = []
+    builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df, table_mode="png")
+    builder.build_pdf(on_progress=lambda *step: steps.append(step))
+    # Metrics table, ramp plot, two program tables and plots, then the cover and program pages
+    assert [done for done, _, _ in steps] == list(range(1, 10))
+    assert {total for _, total, _ in steps} == {9}
+    assert steps[-3:] == [(7, 9, "Cover page"), (8, 9, "Explosive program"), (9, 9, "Endurance program")]
+
+    steps.clear()
+    builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df, table_mode="png")
+    with pytest.raises(ReportCancelled):
+        builder.build_pdf(on_progress=lambda *step: steps.append(step), cancelled=lambda: len(steps) >= 2)
+    assert len(steps) == 2 and builder.pdf.page_no() == 0
+
+
+def test_prerendered_cover_is_reused_by_build(report_inputs, monkeypatch):
+    metrics, programs, ramp_df = report_inputs
+    metrics = dict(metrics, **{"Aerobic Threshold (mph)": 3.37})
+    renders = []
+    render = pdf_visuals._render_ramp_test_plot
+    monkeypatch.setattr(pdf_visuals, "_render_ramp_test_plot", lambda *args: renders.append(args) or render(*args))
+
+    prerender_cover(metrics, ramp_df, "mph", plot_mode="png")
+    assert len(renders) == 1
+    PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df, plot_mode="png").build_pdf()
+    assert len(renders) == 1
+
+
+def test_vector_tables_embed_fewer_images(report_inputs):
+    metrics, programs, ramp_df = report_inputs
+    vector = PDFReportBuilder(metrics, programs, "A", ramp_df=ramp_df, table_mode="vector")
+    png = PDFReportBuilder(metrics, programs, "A", ramp_df=ramp_df, table_mode="png")
+    vector.build_pdf()
+    png.build_pdf()
+    assert len(vector.pdf.output()) < len(png.pdf.output())
+
+
+def test_invalid_table_mode():
+    with pytest.raises(ValueError):
+        PDFReportBuilder({}, {}, "A", table_mode="svg")
+
+
+def test_vector_plots_embed_no_images(report_inputs):
+    metrics, programs, ramp_df = report_inputs
+    vector = PDFReportBuilder(metrics, programs, "A", ramp_df=ramp_df, plot_mode="vector")
+    png = PDFReportBuilder(metrics, programs, "A", ramp_df=ramp_df, plot_mode="png")
+    vector_pdf = bytes(vector.build_pdf().output())
+    png_pdf = bytes(png.build_pdf().output())
+    assert b"/Subtype /Image" not in vector_pdf
+    assert b"/Subtype /Image" in png_pdf
+    assert len(vector_pdf) < len(png_pdf)
+    assert vector.pdf.page_no() == png.pdf.page_no() == 1 + len(programs)
+
+
+def test_report_with_unicode_font(report_inputs):
+    metrics, programs, ramp_df = report_inputs
+    with pytest.raises(Exception):
+        PDFReportBuilder(metrics, programs, UNICODE_NAME, ramp_df=ramp_df).build_pdf().output()
+
+    builder = PDFReportBuilder(metrics, programs, UNICODE_NAME, ramp_df=ramp_df, plot_mode="vector",
+                               font_path=UNICODE_FONT)
+    assert builder.font_family == "CardioSans"
+    assert builder.save_pdf(in_memory=True).startswith(b"%PDF")
+
+
+def test_invalid_plot_mode():
+    with pytest.raises(ValueError):
+        PDFReportBuilder({}, {}, "A", plot_mode="svg")
+
+
+def _progress(n_tests=12):
+    store = HistoryStore(":memory:")
+    for i in range(n_tests):
+        top = 8.0 + 0.1 * i
+        store.record_test("Ann", "mph", pd.DataFrame({"Speed": [3.0, 5.0, 6.5, top], "RPE": [1, 4, 8, 10]}),
+                          WingateData.from_speeds([9.0, 9.5, 8.0 - 0.1 * i]) if i % 3 else None,
+                          tested_at=1.7e9 + i * 35 * 86400)
+    return store.progress("Ann")
+
+
+@pytest.mark.parametrize("plot_mode", ["vector", "png"])
+def test_progress_report_charts_history(plot_mode):
+    builder = PDFReportBuilder({}, {}, "Ann", report_mode="progress", progress=_progress(), plot_mode=plot_mode)
+    builder.build_pdf()
+    pdf = builder.save_pdf(in_memory=True)
+    assert pdf.startswith(b"%PDF") and builder.filename == "Ann_progress_report.pdf"
+    assert (b"/Subtype /Image" in pdf) == (plot_mode == "png")
+    # Summary table and three trend charts (thresholds, VO2max, fatigue index)
+    assert builder.pdf.page_no() == 2
+
+
+def test_progress_report_needs_history():
+    with pytest.raises(ValueError):
+        PDFReportBuilder({}, {}, "A", report_mode="progress")
+    with pytest.raises(ValueError):
+        PDFReportBuilder({}, {}, "A", report_mode="summary")
+
+
+def test_nice_ticks_use_round_steps():
+    assert nice_ticks(0, 11.5) == [0, 2, 4, 6, 8, 10]
+    assert nice_ticks(0, 3.2) == [0, 1, 2, 3]
+    assert nice_ticks(0, 2.2) == [0, 0.5, 1.0, 1.5, 2.0]
+    assert nice_ticks(5, 5) == [5]
+
+
+def test_save_pdf_in_memory_writes_no_files(tmp_path, monkeypatch, report_inputs):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    metrics, programs, ramp_df = report_inputs
+    builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df, table_mode="png")
+    builder.build_pdf()
+    pdf_bytes = builder.save_pdf(in_memory=True)
+    assert pdf_bytes.startswith(b"%PDF")
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("table_mode", ["vector", "png"])
+def test_parallel_rendering_is_byte_identical(report_inputs, table_mode):
+    metrics, programs, ramp_df = report_inputs
+    created = datetime(2025, 7, 15, tzinfo=timezone.utc)
+    outputs = []
+    for workers in (1, 2):
+        builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df,
+                                   table_mode=table_mode, render_workers=workers)
+        builder.pdf.set_creation_date(created)
+        builder.build_pdf()
+        outputs.append(builder.save_pdf(in_memory=True))
+    assert outputs[0] == outputs[1]
+
+
+def test_one_render_pool_is_shared_and_shut_down():
+    first = pdf_report._get_render_pool(2)
+    assert pdf_report._get_render_pool(2) is first
+    # Smaller requests reuse it, larger ones replace it
+    assert pdf_report._get_render_pool(1) is first
+    larger = pdf_report._get_render_pool(3)
+    assert larger is not first and pdf_report._get_render_pool(2) is larger
+    assert larger.submit(abs, -3).result(timeout=30) == 3
+
+    pdf_report.shutdown_render_pool()
+    assert pdf_report._render_pool is None
+    with pytest.raises(RuntimeError):
+        larger.submit(abs, -3)
+
+
+def test_iter_pdf_streams_the_same_document(report_inputs):
+    metrics, programs, ramp_df = report_inputs
+    created = datetime(2025, 7, 15, tzinfo=timezone.utc)
+    builders = []
+    for _ in range(2):
+        builder = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df)
+        builder.pdf.set_creation_date(created)
+        builder.build_pdf()
+        builders.append(builder)
+
+    chunks = list(builders[0].iter_pdf(chunk_size=4096))
+    assert all(isinstance(chunk, bytes) and len(chunk) <= 4096 for chunk in chunks)
+    assert b"".join(chunks) == builders[1].save_pdf(in_memory=True)
+
+
+def test_streaming_50_program_report_memory_ceiling(report_inputs):
+    metrics, _, ramp_df = report_inputs
+    aerobic = metrics["Aerobic Threshold (mph)"]
+    anaerobic = metrics["Anaerobic Threshold (mph)"]
+    programs = {}
+    for i in range(50):
+        training_type = ("explosive", "power_endurance", "endurance")[i % 3]
+        builder = CardioProgramBuilder(10 + i % 5, 7.5, aerobic, aerobic, anaerobic, unit="mph")
+        programs[f"{training_type} {i}"] = builder.build_program(training_type)
+    report = PDFReportBuilder(metrics, programs, "Test Client", ramp_df=ramp_df)
+    report.build_pdf()
+
+    tracemalloc.start()
+    try:
+        size = 0
+        for chunk in report.iter_pdf(chunk_size=64 * 1024):
+            size += len(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    # FPDF's output buffer plus one chunk in flight, never a second copy
+    assert size > 500_000
+    assert peak < size + 2 * 64 * 1024 + 512 * 1024
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the process-level PDF font and image cache
+"""
+
+import re
+from io import BytesIO
+from pathlib import Path
+
+import fpdf
+import matplotlib
+import pytest
+from fpdf import FPDF
+
+from cardio_app.reports.pdf_resources import ResourceCache
+from cardio_app.reports.pdf_visuals import _render_program_speed_plot
+
+FONT = str(Path(matplotlib.get_data_path()) / "fonts" / "ttf" / "DejaVuSans.ttf")
+NAME = "Łukasz Żółć-Müller"
+
+
+def _strip_dates(data):
+    # Both change with the clock; /ID hashes the creation date
+    return re.sub(rb"/CreationDate \(.*?\)|/ID \[.*?\]", b"", bytes(data))
+
+
+def _unicode_doc(add_font):
+    pdf = FPDF()
+    for style in ("", "B"):
+        add_font(pdf, style)
+    pdf.add_page()
+    pdf.set_font("Report", "B", 14)
+    pdf.cell(0, 10, NAME)
+    pdf.set_font("Report", "", 12)
+    pdf.cell(0, 10, "12.5 mph")
+    return pdf.output()
+
+
+def test_cached_font_matches_fpdf_add_font():
+    cache = ResourceCache()
+    expected = _unicode_doc(lambda pdf, style: pdf.add_font("Report", style, FONT))
+    for _ in range(2):
+        actual = _unicode_doc(lambda pdf, style: cache.add_font(pdf, "Report", FONT, style))
+        assert _strip_dates(actual) == _strip_dates(expected)
+    assert cache.stats()["font_misses"] == 1 and cache.stats()["font_hits"] == 3
+
+
+def test_images_are_parsed_once_across_documents():
+    png = _render_program_speed_plot([("W-UP Walk", 30, 0, 2.0), ("Jog", 60, 30, 5.0)], "mph")
+    cache = ResourceCache()
+    outputs = []
+    for _ in range(2):
+        pdf = FPDF()
+        pdf.add_page()
+        cache.image(pdf, BytesIO(png), x=10, w=190)
+        cache.image(pdf, BytesIO(png), x=10, w=190)  # same image twice in one document
+        assert len(pdf.image_cache.images) == 1
+        outputs.append(_strip_dates(pdf.output()))
+    assert outputs[0] == outputs[1]
+    assert outputs[0].count(b"/Subtype /Image") == 1
+    assert cache.stats()["image_misses"] == 1 and cache.stats()["image_hits"] == 1
+
+
+@pytest.mark.parametrize("fpdf_version", [None, "9.9.9"])
+def test_each_font_and_image_is_embedded_once(monkeypatch, fpdf_version):
+    if fpdf_version:  # an fpdf2 the cache was not checked against: public calls only
+        monkeypatch.setattr(fpdf, "FPDF_VERSION", fpdf_version)
+    png = _render_program_speed_plot([("W-UP Walk", 30, 0, 2.0), ("Jog", 60, 30, 5.0)], "mph")
+    other = _render_program_speed_plot([("Jog", 60, 0, 6.0)], "mph")
+    cache = ResourceCache()
+    for _ in range(2):
+        pdf = FPDF()
+        for style in ("", "B"):
+            cache.add_font(pdf, "Report", FONT, style)
+        pdf.add_page()
+        pdf.set_font("Report", "B", 14)
+        pdf.cell(0, 10, NAME)
+        pdf.set_font("Report", "", 12)
+        pdf.cell(0, 10, "12.5 mph")
+        for img in (png, other, png):
+            cache.image(pdf, BytesIO(img), x=10, w=190)
+        data = bytes(pdf.output())
+        assert data.startswith(b"%PDF") and data.rstrip().endswith(b"%%EOF")
+        assert data.count(b"/FontFile2") == 2 and data.count(b"/Subtype /Type0") == 2
+        assert data.count(b"/Subtype /Image") == 2
+        # Every object number is defined once
+        numbers = re.findall(rb"^(\d+) 0 obj", data, re.M)
+        assert len(numbers) == len(set(numbers))
+    expected_misses = 1 if fpdf_version is None else 0
+    assert cache.stats()["font_misses"] == expected_misses
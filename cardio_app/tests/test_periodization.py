@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for periodized plan generation
+"""
+
+import types
+
+import pytest
+from fpdf import FPDF
+
+from cardio_app.logic.periodization import generate_plan, plan_summary
+from cardio_app.logic.program_builder import CardioProgramBuilder
+from cardio_app.logic.schedule_planner import append_plan_summary_to_pdf
+
+METRICS = {"Aerobic Threshold (mph)": 5.5, "Anaerobic Threshold (mph)": 7.5}
+
+
+def test_plan_is_lazy_and_bounded():
+    plan = generate_plan(METRICS, 9.0, weeks=12)
+    assert isinstance(plan, types.GeneratorType)
+    first = next(plan)
+    assert (first.week, first.day, first.phase) == (1, 1, "Base")
+
+    for weeks in (7, 17):
+        with pytest.raises(ValueError):
+            next(generate_plan(METRICS, 9.0, weeks=weeks))
+
+
+def test_plan_progresses_with_deload_weeks():
+    sessions = list(generate_plan(METRICS, 9.0, weeks=16, sessions_per_week=4))
+    phases = {s.week: s.phase for s in sessions}
+    assert [w for w, p in phases.items() if p == "Deload"] == [4, 8, 12, 16]
+    assert phases[1] == "Base" and phases[15] == "Peak"
+    assert {s.training_type for s in sessions} == {"endurance", "power_endurance", "explosive"}
+
+    minutes = {row[0]: row[3] for row in plan_summary(sessions)}
+    assert minutes[3] > minutes[1]
+    assert minutes[4] < minutes[3]
+
+    explosive = [s for s in sessions if s.training_type == "explosive"]
+    assert explosive[-1].max_intensity > explosive[0].max_intensity
+
+
+def test_programs_are_deduplicated_and_match_builder():
+    shared = {}
+    sessions = list(generate_plan(METRICS, 9.0, weeks=16, sessions_per_week=7, programs=shared))
+    assert len(sessions) > 90
+    assert len(shared) < len(sessions) / 2
+    by_key = {}
+    for s in sessions:
+        by_key.setdefault((s.training_type, s.duration, s.num_sprints, s.max_intensity), s.program)
+        assert by_key[(s.training_type, s.duration, s.num_sprints, s.max_intensity)] is s.program
+
+    session = next(s for s in sessions if s.training_type == "explosive")
+    expected = CardioProgramBuilder(session.duration, 9.0, 5.5, 5.5, 7.5, unit="mph").build_program(
+        "explosive", num_sprints=session.num_sprints,
+        start_intensity=round(session.max_intensity - 0.2, 2), max_intensity=session.max_intensity)
+    assert session.program == expected
+
+
+def test_endurance_weeks_share_programs_across_intensities():
+    sessions = list(generate_plan(METRICS, 9.0, weeks=12, duration_step=0))
+    endurance = [s for s in sessions if s.training_type == "endurance" and s.phase != "Deload"]
+    first, last = endurance[0], endurance[-1]
+    assert first.week != last.week and first.duration == last.duration
+    assert first.max_intensity != last.max_intensity and first.num_sprints != last.num_sprints
+    assert first.program is last.program
+
+    explosive = [s for s in sessions if s.training_type == "explosive"]
+    assert explosive[0].program is not explosive[-1].program
+
+
+def test_shared_programs_keep_athletes_apart():
+    shared = {}
+    faster = {"Aerobic Threshold (mph)": 6.5, "Anaerobic Threshold (mph)": 8.0}
+    first = list(generate_plan(METRICS, 9.0, programs=shared))
+    second = list(generate_plan(faster, 9.0, programs=shared))
+    third = list(generate_plan(METRICS, 10.0, programs=shared))
+    for a, b, c in zip(first, second, third):
+        assert a.program is not b.program and a.program is not c.program
+    endurance = next(i for i, s in enumerate(first) if s.training_type == "endurance")
+    assert first[endurance].program != second[endurance].program
+    # The same athlete planned again reuses the shared programs
+    assert all(a.program is b.program for a, b in zip(first, generate_plan(METRICS, 9.0, programs=shared)))
+
+
+def test_summary_page_is_drawn_natively():
+    pdf = FPDF()
+    append_plan_summary_to_pdf(pdf, generate_plan(METRICS, 9.0, weeks=16, sessions_per_week=5))
+    assert pdf.page == 1
+    data = bytes(pdf.output())
+    assert data.startswith(b"%PDF")
+    assert b"/Subtype /Image" not in data
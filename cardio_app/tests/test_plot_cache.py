@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the content-addressed plot cache
+"""
+
+import numpy as np
+
+from cardio_app.reports import pdf_visuals
+from cardio_app.reports.plot_cache import PlotCache, make_plot_key
+
+
+def test_key_is_canonical_across_numeric_types():
+    a = make_plot_key("program_speed", program=[("Jog", 60, 0, 5.0)], unit="mph")
+    b = make_plot_key("program_speed", program=[["Jog", np.int64(60), 0.0, np.float64(5.0)]], unit="mph")
+    c = make_plot_key("program_speed", program=[("Jog", 60, 0, 5.5)], unit="mph")
+    assert a == b
+    assert a != c
+
+
+def test_lru_evicts_oldest_entry():
+    cache = PlotCache(max_entries=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    assert cache.get("a") == b"1"  # refresh "a"
+    cache.put("c", b"3")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    first = PlotCache(max_entries=4, disk_dir=str(tmp_path))
+    first.put("k", b"png-bytes")
+
+    second = PlotCache(max_entries=4, disk_dir=str(tmp_path))
+    calls = []
+    data = second.get_or_render("k", lambda: calls.append(1) or b"other")
+    assert data == b"png-bytes"
+    assert not calls
+    assert second.stats()["disk_hits"] == 1
+
+
+def test_none_renders_are_not_cached():
+    cache = PlotCache(max_entries=4)
+    assert cache.get_or_render("k", lambda: None) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_program_plot_rendered_once(monkeypatch):
+    cache = PlotCache(max_entries=8)
+    monkeypatch.setattr(pdf_visuals, "plot_cache", cache)
+    program = [("W-UP Walk", 30, 0, 2.0), ("Jog", 60, 30, 5.0), ("Cool Walk", 30, 90, 2.0)]
+
+    first = pdf_visuals.create_program_speed_plot(program, unit="mph")
+    second = pdf_visuals.create_program_speed_plot(list(program), unit="mph")
+
+    assert first.getvalue() == second.getvalue()
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
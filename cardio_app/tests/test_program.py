@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the Program / Interval representation
+"""
+
+import pickle
+
+from cardio_app.logic.program import Interval, Program
+from cardio_app.logic.program_builder import CardioProgramBuilder
+
+
+def test_program_behaves_like_list_of_tuples():
+    rows = [("W-UP Walk", 30, 0, 2.0), ("Sprint", 20, 30, 9.5), ("Cool Walk", 30, 50, 2.0)]
+    program = Program(rows)
+
+    assert program == rows
+    assert len(program) == 3
+    assert program[1] == ("Sprint", 20, 30, 9.5)
+    assert program[1].speed == 9.5
+    assert all(len(row) == 4 for row in program)
+    label, duration, start, speed = program[-1]
+    assert (label, duration, start, speed) == rows[-1]
+    assert program[:2] == rows[:2]
+    assert isinstance(program[:2], Program)
+
+
+def test_precomputed_totals_match_naive_sums():
+    rows = [(f"Block {i}", 5 * (i % 7) + 30, 0, 4.0 + (i % 5) * 0.5) for i in range(500)]
+    program = Program(rows)
+    naive = [sum(float(r[1]) for r in rows[:i]) for i in range(len(rows) + 1)]
+
+    assert list(program.cumulative_times) == naive
+    assert program.total_duration == naive[-1]
+    assert program.max_speed == max(r[3] for r in rows)
+
+
+def test_builder_returns_program_and_program_pickles():
+    builder = CardioProgramBuilder(total_time=20, max_speed=8, recovery_speed=4.5,
+                                   aerobic_thres=4.5, anaerobic_thres=7.0)
+    program = builder.build_program("endurance")
+
+    assert isinstance(program, Program)
+    assert program == builder.program
+    assert isinstance(program[0], Interval)
+    assert program.total_duration == 20 * 60
+    assert pickle.loads(pickle.dumps(program)) == program
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for incremental metrics/program caching
+"""
+
+import pytest
+
+from cardio_app.logic import program_cache as pc
+from cardio_app.logic.program_builder import CardioProgramBuilder
+from cardio_app.logic.ramp_data import RampData, WingateData
+from cardio_app.webapp import create_app, report_service
+
+RAMP = RampData([2.0 + 0.5 * i for i in range(10)], [1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
+WINGATE = WingateData.from_speeds([9.0, 9.5, 9.2, 8.8, 8.5, 8.0])
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Fresh cache whose metric and program computations are counted"""
+    calls = {"metrics": 0, "program": 0}
+    real_metrics, real_program = pc.calculate_metrics_fast, pc.build_program
+
+    def metrics(*args):
+        calls["metrics"] += 1
+        return real_metrics(*args)
+
+    def program(*args):
+        calls["program"] += 1
+        return real_program(*args)
+
+    cache = pc.ProgramCache()
+    monkeypatch.setattr(pc, "calculate_metrics_fast", metrics)
+    monkeypatch.setattr(pc, "build_program", program)
+    monkeypatch.setattr(report_service, "program_cache", cache)
+    return cache, calls
+
+
+def test_metrics_cached_per_dataset(counted):
+    cache, calls = counted
+    first, fp1 = cache.metrics(RAMP, WINGATE, "mph")
+    first["mutated"] = True
+    second, fp2 = cache.metrics(RampData(list(RAMP.speeds), list(RAMP.rpe)), WINGATE, "mph")
+    assert calls["metrics"] == 1
+    assert fp1 == fp2 and "mutated" not in second
+
+    cache.metrics(RAMP, None, "mph")
+    cache.metrics(RampData(RAMP.speeds, [1, 2, 3, 4, 5, 6, 7, 8, 10, 10]), WINGATE, "mph")
+    assert calls["metrics"] == 3
+
+
+def test_programs_cached_per_training_and_metrics(counted):
+    cache, calls = counted
+    metrics, fp = cache.metrics(RAMP, WINGATE, "mph")
+    training = {"training_type": "power_endurance", "duration": 20}
+
+    program = cache.program(training, metrics, fp, 6.5, "mph")
+    assert cache.program(dict(training), metrics, fp, 6.5, "mph") is program
+    assert calls["program"] == 1
+
+    cache.program({"training_type": "power_endurance", "duration": 25}, metrics, fp, 6.5, "mph")
+    other_metrics, other_fp = cache.metrics(RAMP, None, "mph")
+    cache.program(training, other_metrics, other_fp, 6.5, "mph")
+    assert calls["program"] == 3
+
+    expected = CardioProgramBuilder(
+        total_time=20, max_speed=6.5,
+        aerobic_thres=metrics["Aerobic Threshold (mph)"],
+        anaerobic_thres=metrics["Anaerobic Threshold (mph)"],
+        recovery_speed=metrics["Aerobic Threshold (mph)"],
+        wingate_peak_speed=metrics["Wingate Peak Speed (mph)"], unit="mph",
+    ).build_program("power_endurance")
+    assert program == expected
+
+
+def test_add_training_precomputes_so_generate_builds_nothing(counted):
+    cache, calls = counted
+    client = create_app().test_client()
+    client.post("/next", data={"client_name": "Jane", "unit": "mph",
+                               "ramp_rpe_inputs": [f"{s}:{r}" for s, r in zip(RAMP.speeds, RAMP.rpe)]})
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    client.post("/add_training", data={"training_type": "explosive", "duration": 10})
+    assert calls == {"metrics": 1, "program": 2}
+
+    response = client.post("/generate")
+    assert response.status_code == 200
+    assert calls == {"metrics": 1, "program": 2}
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the precomputed program template index
+"""
+
+import random
+
+import pytest
+
+from cardio_app.logic.program_builder import CardioProgramBuilder
+from cardio_app.logic.program_templates import TemplateIndex, template_key
+
+
+def _build(builder_args, training_type, **kwargs):
+    try:
+        return CardioProgramBuilder(**builder_args).build_program(training_type, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+def _from_index(index, builder_args, training_type, **kwargs):
+    try:
+        return index.build_program(training_type, **builder_args, **kwargs)
+    except Exception as e:
+        return type(e)
+
+
+def test_templates_match_builder_exactly():
+    index = TemplateIndex()
+    rng = random.Random(3)
+    for training_type in ("explosive", "power_endurance", "endurance", "unknown"):
+        for duration in (1, 3, 10, 17, 30, 45, 61):
+            for unit in ("mph", "kmh"):
+                aerobic = round(rng.uniform(3, 8), 3)
+                args = {"total_time": duration, "max_speed": round(rng.uniform(4, 15), 2),
+                        "recovery_speed": aerobic, "aerobic_thres": aerobic,
+                        "anaerobic_thres": aerobic + rng.uniform(0, 3), "unit": unit}
+                for kwargs in ({}, {"num_sprints": 5, "start_intensity": 0.6},
+                               {"wingate_peak_speed": 13.7}):
+                    expected = _build(args, training_type, **kwargs)
+                    actual = _from_index(index, args, training_type, **kwargs)
+                    assert actual == expected
+                    # Same float values and types, down to their printed form
+                    if not isinstance(expected, type):
+                        assert repr(actual) == repr(expected)
+
+
+def test_missing_inputs_raise_like_builder():
+    index = TemplateIndex()
+    args = {"total_time": 20, "max_speed": 9.0, "recovery_speed": 5.0, "unit": "mph"}
+    assert _from_index(index, args, "endurance") is _build(args, "endurance") is ValueError
+    args = dict(args, max_speed=None)
+    assert _from_index(index, args, "explosive") is _build(args, "explosive") is ValueError
+    assert _from_index(index, args, "power_endurance") is _build(args, "power_endurance") is TypeError
+
+
+def test_templates_are_reused_and_survive_json(tmp_path):
+    index = TemplateIndex().precompute(durations=range(10, 13), units=("mph",))
+    assert len(index) == 9
+    key = template_key("power_endurance", 12)
+    assert index.get(key) is index.get(key)
+
+    path = tmp_path / "templates.json"
+    index.save(str(path))
+    loaded = TemplateIndex.load(str(path))
+    assert len(loaded) == 9
+
+    args = {"total_time": 12, "max_speed": 9.3, "recovery_speed": 5.1,
+            "aerobic_thres": 5.1, "anaerobic_thres": 7.7, "unit": "mph"}
+    for training_type in ("explosive", "power_endurance", "endurance"):
+        assert repr(loaded.build_program(training_type, **args)) == repr(_build(args, training_type))
+
+
+@pytest.mark.parametrize("training_type", ["explosive", "endurance"])
+def test_program_timeline_is_precomputed(training_type):
+    args = {"total_time": 25, "max_speed": 10.0, "recovery_speed": 5.5,
+            "aerobic_thres": 5.5, "anaerobic_thres": 7.5, "unit": "mph"}
+    program = TemplateIndex().build_program(training_type, **args)
+    expected = _build(args, training_type)
+    assert list(program.cumulative_times) == list(expected.cumulative_times)
+    assert program.total_duration == expected.total_duration
+    assert program.max_speed == expected.max_speed
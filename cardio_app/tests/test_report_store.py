@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the content-addressed report store
+"""
+
+import os
+import time
+
+import pytest
+
+from cardio_app.webapp.report_service import report_key
+from cardio_app.webapp.report_store import ReportStore
+
+RAMP = {"Speed": [2.0, 2.5, 3.0, 3.5], "RPE": [2, 4, 6, 8]}
+TRAININGS = [{"training_type": "endurance", "duration": 20}]
+
+
+@pytest.fixture(params=["memory", "directory"])
+def store_factory(request, tmp_path):
+    directory = str(tmp_path / "reports") if request.param == "directory" else None
+    return lambda **kwargs: ReportStore(directory=directory, **kwargs)
+
+
+def test_get_returns_stored_bytes(store_factory):
+    store = store_factory()
+    assert store.get("a" * 64) is None
+    store.put("a" * 64, b"%PDF-1")
+    assert store.get("a" * 64) == b"%PDF-1"
+    assert store.stats()["hits"] == 1 and store.stats()["misses"] == 1
+
+
+def test_download_filename_is_kept_with_the_report(store_factory):
+    store = store_factory(max_bytes=25)
+    store.put("a", bytes(10), filename="Jane_Doe_cardio_report.pdf")
+    store.put("b", bytes(10))
+    assert store.filename("a") == "Jane_Doe_cardio_report.pdf"
+    assert store.filename("b") is None and store.filename("missing") is None
+
+    store.put("c", bytes(10))  # evicts "a" and its filename
+    assert store.get("a") is None and store.filename("a") is None
+    if store.directory:
+        assert sorted(os.listdir(store.directory)) == ["b.pdf", "c.pdf"]
+
+
+def test_size_limit_evicts_least_recently_used(store_factory):
+    store = store_factory(max_bytes=25)
+    for i, key in enumerate("abc"):
+        store.put(key, bytes(10))
+        if store.directory:  # mtime resolution: make the order explicit
+            os.utime(store._path(key), (time.time() - 30 + i, time.time() - 30 + i))
+    assert store.get("a") is None
+    assert store.get("b") is not None and store.get("c") is not None
+    assert store.stats()["bytes"] <= 25
+    store.put("big", bytes(30))  # larger than the whole store: not kept
+    assert store.get("big") is None
+
+
+def _backdate(store, key, seconds):
+    stamp = time.time() - seconds
+    if store.directory:
+        os.utime(store._path(key), (stamp, stamp))
+    else:
+        store._entries[key] = (store._entries[key][0], stamp)
+
+
+def test_expired_reports_are_dropped(store_factory):
+    store = store_factory(ttl=60)
+    store.put("old", b"%PDF-old")
+    store.put("stale", b"%PDF-stale")
+    _backdate(store, "old", 120)
+    _backdate(store, "stale", 120)
+    assert store.get("old") is None
+    store.put("new", b"%PDF-new")  # sweeps "stale" too
+    assert store.stats()["entries"] == 1
+    assert store.get("new") == b"%PDF-new"
+
+
+def test_report_key_normalizes_inputs():
+    key = report_key("Jane", "mph", RAMP, None, TRAININGS)
+    rows = [{"Speed": s, "RPE": r} for s, r in zip(RAMP["Speed"], RAMP["RPE"])]
+    assert report_key("Jane", "mph", rows, None, [{"training_type": "endurance", "duration": "20"}]) == key
+    assert report_key("Jane Doe", "mph", RAMP, None, TRAININGS) != key
+    assert report_key("Jane", "kmh", {"Speed": RAMP["Speed"], "RPE": RAMP["RPE"]}, None, TRAININGS) != key
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the Tk app's background report worker
+"""
+
+import threading
+
+from cardio_app.gui.report_worker import ReportJob
+from cardio_app.reports.pdf_report import ReportCancelled
+
+
+class FakeWidget:
+    """Stands in for a Tk widget: after() callbacks run when pump() is called"""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, callback):
+        self.callbacks.append(callback)
+
+    def pump(self, job, timeout=10):
+        job.future.result(timeout)
+        while self.callbacks:
+            self.callbacks.pop(0)()
+
+
+def _job(widget, work):
+    events = []
+    job = ReportJob(widget, work,
+                    on_done=lambda result: events.append(("done", result)),
+                    on_error=lambda error: events.append(("error", str(error))),
+                    on_progress=lambda *step: events.append(("progress", step)),
+                    on_cancelled=lambda: events.append(("cancelled",)))
+    return job, events
+
+
+def test_progress_and_result_reach_the_tk_thread():
+    widget = FakeWidget()
+    worker_threads = []
+
+    def work(on_progress, cancelled):
+        worker_threads.append(threading.current_thread())
+        on_progress(1, 2, "Rendering charts")
+        on_progress(2, 2, "Cover page")
+        return "report.pdf"
+
+    job, events = _job(widget, work)
+    widget.pump(job)
+    assert worker_threads[0] is not threading.current_thread()
+    assert events == [("progress", (1, 2, "Rendering charts")), ("progress", (2, 2, "Cover page")),
+                      ("done", "report.pdf")]
+
+
+def test_cancel_and_errors_end_the_job():
+    widget = FakeWidget()
+    started, release = threading.Event(), threading.Event()
+
+    def work(on_progress, cancelled):
+        started.set()
+        release.wait(10)
+        if cancelled():
+            raise ReportCancelled()
+        return "report.pdf"
+
+    job, events = _job(widget, work)
+    started.wait(10)
+    job.cancel()
+    release.set()
+    widget.pump(job)
+    assert events == [("cancelled",)]
+
+    # Cancelled once the work is past its last check: it completes as done
+    started.clear()
+    release.clear()
+
+    def saving(on_progress, cancelled):
+        if cancelled():
+            raise ReportCancelled()
+        started.set()
+        release.wait(10)
+        return "report.pdf"
+
+    job, events = _job(widget, saving)
+    started.wait(10)
+    job.cancel()
+    release.set()
+    widget.pump(job)
+    assert events == [("done", "report.pdf")]
+
+    def broken(on_progress, cancelled):
+        raise OSError("disk full")
+
+    job, events = _job(widget, broken)
+    widget.pump(job)
+    assert events == [("error", "disk full")]
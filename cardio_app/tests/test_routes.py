@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the Flask report flow
+"""
+
+import subprocess
+import sys
+import tempfile
+import time
+
+import pytest
+
+from cardio_app.logic.history_store import HistoryStore
+from cardio_app.webapp import create_app, report_service, routes
+from cardio_app.webapp.jobs import ReportJobQueue
+from cardio_app.webapp.report_store import ReportStore
+
+RAMP_INPUTS = [f"{2.0 + 0.5 * i}:{rpe}" for i, rpe in enumerate([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])]
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    app.config["TESTING"] = True
+    return app.test_client()
+
+
+def _start_session(client, **extra):
+    data = {"client_name": "Jane Doe", "unit": "mph", "ramp_rpe_inputs": RAMP_INPUTS,
+            "wingate_speeds": "9, 9.5, 9.2, 8.8, 8.5, 8.0"}
+    data.update(extra)
+    return client.post("/next", data=data)
+
+
+def test_generate_returns_pdf_without_touching_disk(client, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    assert _start_session(client).status_code == 200
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    client.post("/add_training", data={"training_type": "explosive", "duration": 10})
+
+    response = client.post("/generate")
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/pdf"
+    assert response.data.startswith(b"%PDF")
+    assert "Jane_Doe_cardio_report.pdf" in response.headers["Content-Disposition"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_generate_sends_stored_pdf_in_chunks(client):
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+
+    response = client.post("/generate")
+
+    assert response.is_streamed
+    assert response.headers["ETag"] and response.headers["Content-Location"]
+    assert response.get_data().startswith(b"%PDF")
+
+
+def test_failed_build_returns_error_page(client, monkeypatch):
+    errors = []
+    monkeypatch.setattr(routes, "incr", lambda name, **labels: errors.append((name, labels)))
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("renderer crashed")
+
+    monkeypatch.setattr(report_service, "_build_report", broken)
+    _start_session(client, client_name="Broken Build")
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+
+    response = client.post("/generate")
+    assert response.status_code == 500
+    assert response.mimetype == "text/html" and b"renderer crashed" in response.data
+    assert ("errors", {"stage": "generate_route"}) in errors
+
+
+def test_repeat_generate_is_served_from_report_store(client, monkeypatch):
+    store = ReportStore()
+    monkeypatch.setattr(routes, "report_store", store)
+    monkeypatch.setattr(report_service, "report_store", store)
+    builds = []
+    render = report_service.render_report
+    monkeypatch.setattr(report_service, "render_report", lambda *args: builds.append(args) or render(*args))
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+
+    first = client.post("/generate")
+    second = client.post("/generate")
+    assert len(builds) == 1
+    assert second.data == first.data
+    etag = first.headers["ETag"]
+    assert second.headers["ETag"] == etag
+
+    location = first.headers["Content-Location"]
+    assert client.get(location, headers={"If-None-Match": etag}).status_code == 304
+    again = client.get(location)
+    assert again.status_code == 200 and again.data == first.data
+    # Named after the stored report, not whoever the current session is
+    fresh = create_app().test_client().get(location)
+    assert "Jane_Doe_cardio_report.pdf" in fresh.headers["Content-Disposition"]
+    assert client.get("/reports/not-a-key").status_code == 404
+
+    _start_session(client, client_name="John Doe")
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    assert client.post("/generate").headers["ETag"] != etag
+    assert len(builds) == 2
+
+
+def test_threshold_method_is_chosen_per_request(client):
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    band = client.post("/generate")
+    _start_session(client, threshold_method="piecewise")
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    fitted = client.post("/generate")
+    assert fitted.status_code == 200 and fitted.headers["ETag"] != band.headers["ETag"]
+
+    assert _start_session(client, threshold_method="spline").status_code == 400
+
+
+def test_tests_and_programs_are_kept_in_history(client, monkeypatch):
+    store = HistoryStore(":memory:")
+    monkeypatch.setattr(report_service, "history_store", store)
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    assert client.post("/generate").status_code == 200
+
+    (test,) = store.last_tests("Jane Doe")
+    assert test["vo2max_speed"] == 6.5 and test["wingate_peak_speed"] == 9.5
+    assert list(store.programs(test["id"])) == ["endurance"]
+
+    progress = client.get("/progress")
+    assert progress.status_code == 200 and progress.data.startswith(b"%PDF")
+    assert "Jane_Doe_progress_report.pdf" in progress.headers["Content-Disposition"]
+    assert client.get("/progress?client_name=Nobody").status_code == 404
+
+    # A retest with the same values is a new session and a new test
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "endurance", "duration": 20})
+    client.post("/generate")
+    assert len(store.last_tests("Jane Doe")) == 2
+
+
+def test_generate_requires_training(client):
+    _start_session(client)
+    response = client.post("/generate")
+    assert response.status_code == 400
+
+
+def test_async_generate_returns_job_then_pdf(client, monkeypatch):
+    queue = ReportJobQueue(max_workers=1, executor="thread")
+    monkeypatch.setattr(routes, "get_job_queue", lambda: queue)
+    _start_session(client)
+    client.post("/add_training", data={"training_type": "power_endurance", "duration": 15})
+
+    response = client.post("/generate?async=1")
+    assert response.status_code == 202
+    job = response.get_json()
+
+    deadline = time.time() + 30
+    while client.get(job["status_url"]).get_json()["status"] not in ("done", "failed"):
+        assert time.time() < deadline
+        time.sleep(0.05)
+
+    download = client.get(job["download_url"])
+    assert download.status_code == 200
+    assert download.data.startswith(b"%PDF")
+    assert "Jane_Doe_cardio_report.pdf" in download.headers["Content-Disposition"]
+    queue.shutdown()
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/missing").status_code == 404
+    assert client.get("/jobs/missing/download").status_code == 404
+
+
+def test_importing_routes_does_not_load_rendering_stack():
+    code = ("import sys, cardio_app.webapp.routes; "
+            "print(sorted(m for m in ('pandas', 'matplotlib', 'fpdf') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
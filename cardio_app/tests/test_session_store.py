@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the server-side session backends
+"""
+
+import pytest
+
+from cardio_app.webapp import create_app
+from cardio_app.webapp.session_store import (
+    MemorySessionBackend, SQLiteSessionBackend, ServerSideSessionInterface, create_session_interface,
+)
+
+LONG_RAMP = [f"{2.0 + 0.1 * i:.1f}:{min(10, i // 20)}" for i in range(200)]
+
+
+def _app(monkeypatch, backend, **env):
+    monkeypatch.setenv("CARDIO_SESSION_BACKEND", backend)
+    for key, value in env.items():
+        monkeypatch.setenv(key, value)
+    app = create_app()
+    app.config["TESTING"] = True
+    return app
+
+
+def _run_flow(client):
+    client.post("/next", data={"client_name": "Jane Doe", "unit": "mph", "ramp_rpe_inputs": LONG_RAMP,
+                               "wingate_speeds": "9, 9.5, 9.2, 8.8, 8.5, 8.0"})
+    for i in range(10):
+        client.post("/add_training", data={"training_type": "endurance", "duration": 10 + i})
+    return client.post("/generate")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_cookie_only_carries_session_id(backend, monkeypatch, tmp_path):
+    app = _app(monkeypatch, backend, CARDIO_SESSION_DB=str(tmp_path / "sessions.sqlite3"))
+    client = app.test_client()
+
+    response = _run_flow(client)
+
+    assert response.status_code == 200
+    assert response.data.startswith(b"%PDF")
+    cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"])
+    assert len(cookie.value) < 64
+
+
+def test_session_data_is_stored_columnar(monkeypatch):
+    app = _app(monkeypatch, "memory")
+    client = app.test_client()
+    client.post("/next", data={"client_name": "Jane", "unit": "kmh", "ramp_rpe_inputs": ["5:1", "6:3"],
+                               "wingate_speeds": "20, 21, 22, 21, 20, 19"})
+    with client.session_transaction() as session:
+        assert session["ramp_data"] == {"Speed": [5.0, 6.0], "RPE": [1.0, 3.0]}
+        assert session["wingate_data"]["Speed (kmh)"] == [20.0, 21.0, 22.0, 21.0, 20.0, 19.0]
+        assert session["wingate_data"]["Time (s)"] == [0, 5, 10, 15, 20, 25]
+
+
+def test_default_backend_is_shared_between_workers(monkeypatch, tmp_path):
+    monkeypatch.delenv("CARDIO_SESSION_BACKEND", raising=False)
+    monkeypatch.setenv("CARDIO_SESSION_DB", str(tmp_path / "sessions.sqlite3"))
+    # Two apps stand in for two gunicorn workers
+    first, second = create_app(), create_app()
+    assert isinstance(first.session_interface.backend, SQLiteSessionBackend)
+    client = first.test_client()
+    client.post("/next", data={"client_name": "Jane", "unit": "mph", "ramp_rpe_inputs": ["5:1", "6:3"]})
+    other = second.test_client()
+    other.set_cookie(second.config["SESSION_COOKIE_NAME"],
+                     client.get_cookie(first.config["SESSION_COOKIE_NAME"]).value)
+    with other.session_transaction() as session:
+        assert session["client_name"] == "Jane"
+
+
+def test_cookie_backend_keeps_flask_default(monkeypatch):
+    assert create_session_interface("cookie") is None
+    with pytest.raises(ValueError):
+        create_session_interface("redis")
+
+
+def test_memory_backend_expires_and_evicts():
+    backend = MemorySessionBackend(max_entries=2)
+    backend.store("old", "{}", ttl=-1)
+    assert backend.load("old") is None
+
+    backend.store("a", "1", ttl=60)
+    backend.store("b", "2", ttl=60)
+    assert backend.load("a") == "1"  # refresh "a"
+    backend.store("c", "3", ttl=60)
+    assert backend.load("b") is None
+    assert backend.load("a") == "1" and backend.load("c") == "3"
+
+
+def test_sqlite_backend_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SQLiteSessionBackend(path), SQLiteSessionBackend(path)
+    first.store("sid", '{"a": 1}', ttl=60)
+    first.store("gone", "{}", ttl=-1)
+
+    assert second.load("sid") == '{"a": 1}'
+    assert second.load("gone") is None
+    second.purge_expired()
+    assert first._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 1
+
+
+def test_unknown_session_id_starts_fresh_session(monkeypatch):
+    app = _app(monkeypatch, "memory")
+    assert isinstance(app.session_interface, ServerSideSessionInterface)
+    client = app.test_client()
+    client.set_cookie(app.config["SESSION_COOKIE_NAME"], "forged-id")
+    response = client.post("/generate")
+    assert response.status_code == 400
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for the curve-fitting threshold engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cardio_app.logic.cohort_metrics import calculate_cohort_metrics, cohort_metrics_to_dicts
+from cardio_app.logic.metrics import calculate_metrics
+from cardio_app.logic.thresholds import FIT_METHODS, check_method, fit_thresholds, pad_tests, threshold_speeds
+
+SPEEDS = [3.0, 3.5, 4.0, 4.5, 5.0, 5.5, 6.0, 6.5, 7.0]
+RPE = [1, 2, 3, 5, 6, 7, 8, 9, 10]
+
+
+def test_piecewise_interpolates_between_steps():
+    assert threshold_speeds(SPEEDS, RPE, "piecewise") == (4.25, 5.75)
+    # RPE never drops during a ramp: the dip to 6 is read as a plateau at 8
+    assert threshold_speeds([3, 4, 5, 6], [3, 8, 6, 10], "piecewise") == (3.2, 3.9)
+
+
+def test_linear_fit_inverts_the_line():
+    speeds = np.arange(3.0, 8.0, 0.5)
+    aerobic, anaerobic = threshold_speeds(speeds, 2 * speeds - 5, "linear")
+    assert aerobic == pytest.approx(4.5) and anaerobic == pytest.approx(6.25)
+
+
+def test_logistic_fit_recovers_the_curve():
+    speeds = np.arange(3.0, 9.0, 0.5)
+    rpe = 11 / (1 + np.exp(-1.2 * (speeds - 6))) - 0.5
+    aerobic, anaerobic = threshold_speeds(speeds, rpe, "logistic")
+    assert aerobic < 6 < anaerobic
+    assert 11 / (1 + np.exp(-1.2 * (aerobic - 6))) - 0.5 == pytest.approx(4)
+    assert 11 / (1 + np.exp(-1.2 * (anaerobic - 6))) - 0.5 == pytest.approx(7.5)
+
+
+@pytest.mark.parametrize("method", FIT_METHODS)
+def test_fits_cover_missing_bands(method):
+    # Nothing inside the 2-6 or 6-9 bands: the band method has no thresholds
+    ramp = pd.DataFrame({"Speed": [3.0, 4.0, 5.0, 6.0], "RPE": [1, 2, 9, 10]})
+    assert calculate_metrics(ramp, None, "mph")["Aerobic Threshold (mph)"] is None
+    metrics = calculate_metrics(ramp, None, "mph", method)
+    assert 3.0 <= metrics["Aerobic Threshold (mph)"] <= metrics["Anaerobic Threshold (mph)"] <= 6.0
+
+
+@pytest.mark.parametrize("method", FIT_METHODS)
+def test_unfittable_tests_get_no_thresholds(method):
+    assert threshold_speeds([], [], method) == (None, None)
+    assert threshold_speeds([4.0, 5.0], [5, 3], method)[1] is None
+    # One step cannot be fitted; interpolation starts there, clipped to the test
+    expected = (4.0, None) if method == "piecewise" else (None, None)
+    assert threshold_speeds([4.0], [5], method) == expected
+
+
+def test_batch_matches_single_tests():
+    tests = [(SPEEDS, RPE), ([3, 4, 5], [1, 7, 10]), ([4.0], [5]), ([2, 3, 4, 5, 6], [0, 1, 2, 3, 4])]
+    speeds, rpe = pad_tests(tests)
+    assert speeds.shape == (4, 9) and np.isnan(speeds[1, 3:]).all()
+    for method in FIT_METHODS:
+        batch = fit_thresholds(speeds, rpe, method)
+        for row, (s, r) in zip(batch, tests):
+            expected = [np.nan if v is None else v for v in threshold_speeds(s, r, method)]
+            np.testing.assert_allclose(row, expected)
+
+
+@pytest.mark.parametrize("method", FIT_METHODS)
+def test_cohort_fits_match_calculate_metrics(method):
+    rng = np.random.default_rng(3)
+    rows = []
+    for client in range(200):
+        n = int(rng.integers(1, 30))
+        rpe = np.sort(rng.choice(np.arange(0, 10.5, 0.5), n))
+        rows += [(client, 2.0 + 0.5 * i, r) for i, r in enumerate(rpe)]
+    ramp = pd.DataFrame(rows, columns=["client_id", "Speed", "RPE"])
+    cohort = cohort_metrics_to_dicts(calculate_cohort_metrics(ramp, threshold_method=method))
+
+    for client_id, client_ramp in ramp.groupby("client_id"):
+        expected = calculate_metrics(client_ramp[["Speed", "RPE"]].reset_index(drop=True), None, "mph", method)
+        for name in ("Aerobic Threshold (mph)", "Anaerobic Threshold (mph)"):
+            assert cohort[client_id][name] == pytest.approx(expected[name], abs=0.011), (client_id, name)
+
+
+def test_unknown_method_is_rejected():
+    assert check_method(None) == "band" and check_method("Linear") == "linear"
+    with pytest.raises(ValueError):
+        check_method("spline")
+    with pytest.raises(ValueError):
+        calculate_cohort_metrics((np.array([1]), np.array([3.0]), np.array([5])), threshold_method="spline")
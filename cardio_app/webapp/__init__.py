@@ -7,8 +7,19 @@ def create_app():
     # MUST set secret key before using session
     app.secret_key = os.environ.get("SECRET_KEY", "super_secret_fallback_key")
 
+    # Keep session data server-side; the cookie only carries a session id
+    from .session_store import create_session_interface
+    session_interface = create_session_interface()
+    if session_interface is not None:
+        app.session_interface = session_interface
+
     # Import and register routes blueprint
     from .routes import bp as routes_bp
     app.register_blueprint(routes_bp)
 
+    # Optionally load and exercise the PDF stack before serving traffic
+    if os.environ.get("CARDIO_WARMUP", "0") == "1":
+        from cardio_app.reports.pdf_report import warm_up
+        warm_up()
+
     return app
@@ -0,0 +1,157 @@
+# cardio_app/webapp/jobs.py
+"""
+Local background job queue for report generation.
+
+Jobs run on a bounded worker pool (processes by default, since Matplotlib
+is neither thread-safe nor GIL-friendly) with no external broker. Job
+state and finished PDFs live in a SQLite file (CARDIO_JOB_DB, in the
+system temp directory by default) shared by every gunicorn worker, so
+/jobs/<id> can be polled from any of them. The queue rejects new jobs once
+max_pending are queued or running, and keeps finished PDFs for a retention
+window before forgetting them.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from cardio_app.webapp.report_store import report_store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT,
+    created REAL NOT NULL,
+    finished REAL,
+    error TEXT,
+    result BLOB
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status);
+"""
+
+
+class QueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class ReportJobQueue:
+    def __init__(self, max_workers=2, max_pending=16, retention=600, executor="process", path=":memory:"):
+        if executor not in ("process", "thread"):
+            raise ValueError("executor must be 'process' or 'thread'")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self.executor_kind = executor
+        self.path = path
+        self._executor = None
+        self._futures = {}  # job id -> future, for jobs submitted by this process
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def submit(self, fn, *args, filename=None, store_key=None):
+        """
+        Queue fn(*args) and return the new job id; fn must return bytes.
+        With store_key the result also goes into the report store, from
+        this process (a pool process's store would keep it to itself).
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._purge_expired(conn)
+                active = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+                if active >= self.max_pending:
+                    raise QueueFull(f"{active} report jobs already pending")
+                job_id = uuid.uuid4().hex
+                conn.execute("INSERT INTO jobs (id, status, filename, created) VALUES (?, 'queued', ?, ?)",
+                             (job_id, filename, time.time()))
+            future = self._get_executor().submit(fn, *args)
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._finish(job_id, f, filename, store_key))
+        return job_id
+
+    def status(self, job_id):
+        """Return a JSON-safe status dict for job_id, or None if unknown/expired"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                self._purge_expired(conn)
+                future = self._futures.get(job_id)
+                if future is not None and future.running():
+                    conn.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job_id,))
+                row = conn.execute("SELECT id, status, created, finished, error, LENGTH(result) FROM jobs "
+                                   "WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("id", "status", "created", "finished", "error", "size"), row))
+
+    def result(self, job_id):
+        """Return (pdf bytes, filename) for a finished job, or (None, None)"""
+        with self._lock:
+            row = self._connect().execute("SELECT result, filename FROM jobs WHERE id = ? AND status = 'done'",
+                                          (job_id,)).fetchone()
+        return (bytes(row[0]), row[1]) if row is not None else (None, None)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            pool_cls = ProcessPoolExecutor if self.executor_kind == "process" else ThreadPoolExecutor
+            self._executor = pool_cls(max_workers=self.max_workers)
+        return self._executor
+
+    def _finish(self, job_id, future, filename, store_key):
+        error = future.exception()
+        result = future.result() if error is None else None
+        if store_key and result:
+            report_store.put(store_key, result, filename=filename)
+        with self._lock:
+            self._futures.pop(job_id, None)
+            conn = self._connect()
+            with conn:
+                if error is not None:
+                    conn.execute("UPDATE jobs SET status = 'failed', finished = ?, error = ? WHERE id = ?",
+                                 (time.time(), str(error), job_id))
+                else:
+                    conn.execute("UPDATE jobs SET status = 'done', finished = ?, result = ? WHERE id = ?",
+                                 (time.time(), result, job_id))
+
+    def _purge_expired(self, conn):
+        # Jobs a dead worker never finished go once they are as old as the retention
+        conn.execute("DELETE FROM jobs WHERE COALESCE(finished, created) < ?", (time.time() - self.retention,))
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Return the process-wide job queue, configured from the environment"""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = ReportJobQueue(
+                max_workers=int(os.environ.get("CARDIO_JOB_WORKERS", "2")),
+                max_pending=int(os.environ.get("CARDIO_JOB_MAX_PENDING", "16")),
+                retention=int(os.environ.get("CARDIO_JOB_RETENTION", "600")),
+                executor=os.environ.get("CARDIO_JOB_EXECUTOR", "process"),
+                path=os.environ.get("CARDIO_JOB_DB") or os.path.join(tempfile.gettempdir(), "cardio_jobs.sqlite3"),
+            )
+        return _job_queue
@@ -0,0 +1,163 @@
+# cardio_app/webapp/report_service.py
+"""
+Report generation shared by the synchronous route and background jobs.
+
+Everything here takes plain, picklable session data so it can run in a
+worker thread or process outside the Flask request context.
+"""
+
+import hashlib
+import json
+
+from cardio_app.instrumentation import incr, timed
+from cardio_app.logic.history_store import history_store
+from cardio_app.logic.program_cache import dataset_fingerprint, metrics_fingerprint, program_cache, ramp_max_speed
+from cardio_app.logic.ramp_data import RampData, WingateData
+from cardio_app.reports import pdf_report, pdf_resources
+from cardio_app.reports.pdf_report import PDFReportBuilder
+from cardio_app.reports.pdf_utils_common import safe_filename
+from cardio_app.reports.plot_cache import PLOT_CACHE_VERSION
+from cardio_app.webapp.report_store import report_store
+
+# Bump when the report layout changes so stored reports are not served
+REPORT_VERSION = 1
+
+
+def report_filename(client_name):
+    return f"{safe_filename(client_name)}_cardio_report.pdf"
+
+
+def progress_report_filename(client_name):
+    return f"{safe_filename(client_name)}_progress_report.pdf"
+
+
+def build_programs(trainings, metrics, ramp, unit, fingerprint=None):
+    """
+    Build every requested training program from the client's metrics.
+    Programs come from the program cache when fingerprint (the metrics
+    fingerprint returned by program_cache.metrics) is given.
+    """
+    max_speed = ramp_max_speed(ramp)
+    if fingerprint is None:
+        fingerprint = metrics_fingerprint(metrics)
+
+    programs = {}
+    for tr in trainings:
+        program = program_cache.program(tr, metrics, fingerprint, max_speed, unit)
+        programs[tr["training_type"].capitalize()] = program
+    return programs
+
+
+def _load_inputs(unit, ramp_data, wingate_data):
+    ramp = RampData.from_records(ramp_data, unit)
+    wingate = WingateData.from_records(wingate_data, unit) if wingate_data else None
+    return ramp, wingate
+
+
+def precompute_program(unit, ramp_data, wingate_data, training, threshold_method="band"):
+    """Build (and cache) one training's program ahead of /generate"""
+    ramp, wingate = _load_inputs(unit, ramp_data, wingate_data)
+    metrics, fingerprint = program_cache.metrics(ramp, wingate, unit, threshold_method)
+    return program_cache.program(training, metrics, fingerprint, ramp_max_speed(ramp), unit)
+
+
+def _build_report(client_name, unit, ramp_data, wingate_data, trainings, threshold_method="band"):
+    ramp, wingate = _load_inputs(unit, ramp_data, wingate_data)
+
+    with timed("calculate_metrics"):
+        metrics, fingerprint = program_cache.metrics(ramp, wingate, unit, threshold_method)
+    with timed("build_programs"):
+        programs = build_programs(trainings, metrics, ramp, unit, fingerprint)
+
+    pdf_builder = PDFReportBuilder(
+        metrics=metrics,
+        programs=programs,
+        username=client_name,
+        unit=unit,
+        ramp_df=ramp
+    )
+    pdf_builder.build_pdf()
+    return pdf_builder
+
+
+def render_report(client_name, unit, ramp_data, wingate_data, trainings, threshold_method="band"):
+    """Compute metrics, build programs and return the PDF report as bytes"""
+    pdf_builder = _build_report(client_name, unit, ramp_data, wingate_data, trainings, threshold_method)
+    return pdf_builder.save_pdf(in_memory=True)
+
+
+def record_history(client_name, unit, ramp_data, wingate_data, trainings=(), threshold_method="band",
+                   session_id=None):
+    """
+    Save the test, its metrics and any built programs to the history store.
+    Calls with the same session_id update one test.
+    Returns the test id, or None when the store is disabled or saving failed
+    (a report never fails because of its history).
+    """
+    if not history_store.enabled or not (client_name or "").strip():
+        return None
+    try:
+        ramp, wingate = _load_inputs(unit, ramp_data, wingate_data)
+        metrics, fingerprint = program_cache.metrics(ramp, wingate, unit, threshold_method)
+        test_id = history_store.record_test(client_name, unit, ramp, wingate, metrics, threshold_method,
+                                            session_id=session_id)
+        max_speed = ramp_max_speed(ramp)
+        history_store.record_programs(test_id, [
+            (tr["training_type"], tr["duration"], program_cache.program(tr, metrics, fingerprint, max_speed, unit))
+            for tr in trainings
+        ])
+        return test_id
+    except Exception as e:
+        incr("errors", stage="record_history")
+        print(f"Could not save {client_name} to the history store: {e}")
+        return None
+
+
+def render_progress_report(client_name, unit="mph"):
+    """
+    Chart the athlete's test history as a PDF, or return None without any
+    tests on record. Metrics come from the history store's running
+    aggregates and stored columns; no test is recomputed.
+    """
+    with timed("progress_metrics"):
+        progress = history_store.progress(client_name, unit)
+    if progress is None:
+        return None
+    pdf_builder = PDFReportBuilder(metrics={}, programs={}, username=client_name, unit=unit,
+                                   report_mode="progress", progress=progress)
+    pdf_builder.build_pdf()
+    return pdf_builder.save_pdf(in_memory=True)
+
+
+def renderer_version():
+    """Everything besides the inputs that changes what a report looks like"""
+    from fpdf import FPDF_VERSION
+
+    return [REPORT_VERSION, PLOT_CACHE_VERSION, pdf_report.DEFAULT_PLOT_MODE,
+            pdf_resources.REPORT_FONT, pdf_resources.REPORT_FONT_BOLD, FPDF_VERSION]
+
+
+def report_key(client_name, unit, ramp_data, wingate_data, trainings, threshold_method="band"):
+    """Hash of the normalized report inputs and renderer version, used as store key and ETag"""
+    ramp, wingate = _load_inputs(unit, ramp_data, wingate_data)
+    payload = {
+        "client": client_name,
+        "data": dataset_fingerprint(ramp, wingate, unit),
+        "thresholds": threshold_method,
+        "trainings": [[tr["training_type"], int(tr["duration"])] for tr in trainings],
+        "renderer": renderer_version(),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def stored_report(client_name, unit, ramp_data, wingate_data, trainings, key=None, threshold_method="band"):
+    """render_report through the report store: identical inputs are built once"""
+    key = key or report_key(client_name, unit, ramp_data, wingate_data, trainings, threshold_method)
+    pdf_bytes = report_store.get(key)
+    if pdf_bytes is None:
+        pdf_bytes = render_report(client_name, unit, ramp_data, wingate_data, trainings, threshold_method)
+        if pdf_bytes:
+            report_store.put(key, pdf_bytes, filename=report_filename(client_name))
+    return pdf_bytes
+
@@ -0,0 +1,202 @@
+# cardio_app/webapp/report_store.py
+"""
+Content-addressed store for generated PDF reports.
+
+Reports are keyed on a hash of everything that shapes them (client name,
+ramp and Wingate data, trainings, unit and renderer version, see
+report_service.report_key), so an identical request is served from the
+store instead of being rebuilt and the key doubles as the HTTP ETag.
+
+Reports live in memory, or as <key>.pdf files in a directory shared by
+every worker process (CARDIO_REPORT_STORE_DIR), each with the download
+filename it was generated under (<key>.name next to the PDF). Either way the store is
+bounded: entries older than the TTL are dropped, and the least recently
+used ones go once the total size exceeds max_bytes.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from cardio_app.instrumentation import incr
+
+
+class ReportStore:
+    def __init__(self, directory=None, max_bytes=256 * 1024 * 1024, ttl=3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (pdf bytes, stored at), memory mode only
+        self._filenames = {}           # key -> download filename, memory mode only
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """Return the stored PDF bytes for key, or None"""
+        data = self._read_disk(key) if self.directory else self._read_memory(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        incr("report_store_hits" if data is not None else "report_store_misses")
+        return data
+
+    def put(self, key, data, filename=None):
+        if self.max_bytes <= 0 or len(data) > self.max_bytes:
+            return
+        if self.directory:
+            self._write_disk(key, data, filename)
+        else:
+            with self._lock:
+                self._drop(key)
+                self._entries[key] = (data, time.time())
+                if filename:
+                    self._filenames[key] = filename
+                self._size += len(data)
+                self._evict_memory()
+
+    def filename(self, key):
+        """Download filename the report for key was stored under, or None"""
+        if not self.directory:
+            with self._lock:
+                return self._filenames.get(key) if key in self._entries else None
+        try:
+            with open(self._name_path(self._path(key)), encoding="utf-8") as f:
+                return f.read() or None
+        except OSError:
+            return None
+
+    def stats(self):
+        with self._lock:
+            if self.directory:
+                entries = self._disk_entries()
+                count, size = len(entries), sum(e[2] for e in entries)
+            else:
+                count, size = len(self._entries), self._size
+            return {"entries": count, "bytes": size, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._filenames.clear()
+            self._size = 0
+            self.hits = self.misses = 0
+            if self.directory:
+                for _, path, _ in self._disk_entries():
+                    self._remove(path)
+
+    # --- memory ---------------------------------------------------------
+
+    def _read_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] > self.ttl:
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _drop(self, key):
+        self._filenames.pop(key, None)
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def _evict_memory(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, (_, stored) in self._entries.items() if stored < cutoff]:
+            self._drop(key)
+        while self._size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    # --- directory ------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    @staticmethod
+    def _name_path(pdf_path):
+        return pdf_path[:-len(".pdf")] + ".name"
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                self._remove(path)
+                return None
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mtime doubles as last use for LRU eviction
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data, filename=None):
+        # Write then rename so concurrent workers never read a partial file;
+        # the filename goes first so it is there once the PDF is
+        try:
+            if filename:
+                self._write_file(self._name_path(self._path(key)), filename.encode("utf-8"))
+            self._write_file(self._path(key), data)
+        except OSError as e:
+            print(f"Report store could not write {key}: {e}")
+            return
+        with self._lock:
+            self._evict_disk()
+
+    def _write_file(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _disk_entries(self):
+        """[(mtime, path, size)] of stored reports, oldest first"""
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".pdf"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        except OSError:
+            return []
+        return sorted(entries)
+
+    def _evict_disk(self):
+        cutoff = time.time() - self.ttl
+        entries = self._disk_entries()
+        size = sum(e[2] for e in entries)
+        for mtime, path, file_size in entries:
+            if mtime >= cutoff and size <= self.max_bytes:
+                break
+            self._remove(path)
+            size -= file_size
+
+    @classmethod
+    def _remove(cls, path):
+        for name in (path, cls._name_path(path)):
+            try:
+                os.remove(name)
+            except OSError:
+                pass
+
+
+report_store = ReportStore(
+    directory=os.environ.get("CARDIO_REPORT_STORE_DIR") or None,
+    max_bytes=int(float(os.environ.get("CARDIO_REPORT_STORE_MB", "256")) * 1024 * 1024),
+    ttl=int(os.environ.get("CARDIO_REPORT_STORE_TTL", "3600")),
+)
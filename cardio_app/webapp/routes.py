@@ -1,32 +1,39 @@
 # cardio_app/webapp/routes.py
-from flask import Blueprint, render_template, request, send_file, session, redirect, url_for
+from flask import Blueprint, Response, render_template, request, send_file, session, redirect, url_for, jsonify
+from io import BytesIO
 import os
-import pandas as pd
-
-from cardio_app.logic.data_collection import collect_wingate_test
-from cardio_app.logic.metrics import calculate_metrics
-from cardio_app.logic.program_builder import CardioProgramBuilder
-from cardio_app.reports.pdf_utils_common import safe_filename
-from cardio_app.reports.pdf_report import PDFReportBuilder
+import re
+import uuid
+
+from cardio_app.instrumentation import enabled as metrics_enabled, incr, render_prometheus, timed
+from cardio_app.logic.data_collection import collect_wingate_data
+from cardio_app.logic.ramp_data import RampData
+from cardio_app.webapp.jobs import QueueFull, get_job_queue
+from cardio_app.webapp.report_service import (
+    precompute_program, progress_report_filename, record_history, render_progress_report, report_filename,
+    report_key, stored_report,
+)
+from cardio_app.webapp.report_store import report_store
 
 bp = Blueprint("routes", __name__)
 bp.secret_key = "supersecret"  # needed for sessions
 
 
 def _parse_ramp_rpe_inputs(rpe_inputs):
-    """Convert list of "speed:RPE" strings into DataFrame"""
-    data = []
+    """Convert list of "speed:RPE" strings into RampData"""
+    speeds, rpes = [], []
     for item in rpe_inputs:
         try:
             speed_str, rpe_str = item.split(":")
             speed = float(speed_str)
             rpe = float(rpe_str)
-            data.append({"Speed": speed, "RPE": rpe})
         except Exception:
             continue
-    if not data:
+        speeds.append(speed)
+        rpes.append(rpe)
+    if not speeds:
         return None
-    return pd.DataFrame(data)
+    return RampData(speeds, rpes)
 
 
 @bp.route("/")
@@ -40,29 +47,41 @@ def next_page():
     """Store first page data in session and go to second page"""
     client_name = request.form.get("client_name", "").strip()
     unit = request.form.get("unit", "mph").lower()
+    from cardio_app.logic.thresholds import check_method  # pulls in NumPy, so not at import time
+
+    try:
+        threshold_method = check_method(request.form.get("threshold_method"))
+    except ValueError as e:
+        return render_template("error.html", message=str(e)), 400
 
     # Ramp test
     ramp_rpe_inputs = request.form.getlist("ramp_rpe_inputs")
-    ramp_df = _parse_ramp_rpe_inputs(ramp_rpe_inputs)
-    if ramp_df is None or ramp_df.empty:
+    ramp = _parse_ramp_rpe_inputs(ramp_rpe_inputs)
+    if ramp is None or ramp.empty:
         return render_template("error.html", message="No ramp test RPE data provided."), 400
 
     # Wingate
     wingate_speeds_text = request.form.get("wingate_speeds", "")
-    wingate_df = None
+    wingate = None
     if wingate_speeds_text:
         try:
             speeds = [float(v.strip()) for v in wingate_speeds_text.replace(";", ",").split(",") if v.strip()]
-            wingate_df = collect_wingate_test(unit=unit, speed_inputs=speeds)
+            wingate = collect_wingate_data(unit=unit, speed_inputs=speeds)
         except Exception:
-            wingate_df = None
+            wingate = None
 
-    # Save to session (store as JSON-safe lists/dicts)
+    # Save to session (store as compact JSON-safe columns)
     session["client_name"] = client_name
     session["unit"] = unit
-    session["ramp_data"] = ramp_df.to_dict(orient="records")
-    session["wingate_data"] = wingate_df.to_dict(orient="records") if wingate_df is not None else None
+    session["threshold_method"] = threshold_method
+    session["ramp_data"] = ramp.to_columns()
+    session["wingate_data"] = wingate.to_columns(unit) if wingate is not None else None
     session["trainings"] = []  # initialize training programs
+    # Each submitted test is a new history record, even with the same values
+    session["history_session"] = uuid.uuid4().hex
+
+    record_history(client_name, unit, session["ramp_data"], session["wingate_data"],
+                   threshold_method=threshold_method, session_id=session["history_session"])
 
     return render_template("programs.html")  # second page template
 
@@ -75,9 +94,21 @@ def add_training():
 
         # append to session
         trainings = session.get("trainings", [])
-        trainings.append({"training_type": training_type, "duration": duration})
+        training = {"training_type": training_type, "duration": duration}
+        trainings.append(training)
         session["trainings"] = trainings
 
+        # Build the program now so /generate only has to assemble the PDF
+        ramp_data = session.get("ramp_data")
+        if ramp_data:
+            try:
+                precompute_program(session.get("unit", "mph"), ramp_data,
+                                   session.get("wingate_data") or None, training,
+                                   session.get("threshold_method", "band"))
+            except Exception as e:
+                incr("errors", stage="precompute_program")
+                print(f"Could not precompute {training_type} program: {e}")
+
         return render_template("programs.html", message="Training added successfully!", trainings=trainings)
 
     except Exception as e:
@@ -90,70 +121,133 @@ def generate():
     try:
         client_name = session.get("client_name", "client")
         unit = session.get("unit", "mph")
-        ramp_df = pd.DataFrame(session.get("ramp_data", []))
-        wingate_df = pd.DataFrame(session.get("wingate_data", [])) if session.get("wingate_data") else None
+        ramp_data = session.get("ramp_data", [])
+        wingate_data = session.get("wingate_data") or None
         trainings = session.get("trainings", [])
+        threshold_method = session.get("threshold_method", "band")
 
-        if ramp_df.empty and not trainings:
+        if not ramp_data and not trainings:
             return render_template("error.html", message="No ramp test or training data available."), 400
         
         # ✅ Must have at least one program
         if not trainings:
             return render_template("error.html", message="You must add at least one training before generating the PDF."), 400
 
-        # Compute metrics
-        metrics = calculate_metrics(ramp_df, wingate_df, unit)
-
-        ramp_speeds = ramp_df['Speed'] if ramp_df is not None else []
-        max_speed = ramp_speeds.max() if len(ramp_speeds) > 0 else 12  # default fallback
-
-
-        # Build training programs
-        programs = {}
-        for i, tr in enumerate(trainings, 1):
-            from cardio_app.logic.program_builder import CardioProgramBuilder
-
-            aerobic_thres = metrics.get(f"Aerobic Threshold ({unit})")
-
-            builder = CardioProgramBuilder(
-                total_time=tr["duration"],
-                max_speed=max_speed,
-                aerobic_thres=metrics.get(f"Aerobic Threshold ({unit})"),
-                anaerobic_thres=metrics.get(f"Anaerobic Threshold ({unit})"),
-                recovery_speed=aerobic_thres if aerobic_thres else 6.0,  # fallback if not available
-                wingate_peak_speed=metrics.get(f"Wingate Peak Speed ({unit})"),
-                unit=unit
-            )
-
-            program = builder.build_program(tr["training_type"])
-            programs[tr["training_type"].capitalize()] = program
- 
-
-        # PDF output path
-        output_dir = os.path.join(os.getcwd(), "output")
-        os.makedirs(output_dir, exist_ok=True)
-        safe_name = safe_filename(client_name)
-        output_path = os.path.join(output_dir, f"{safe_name}_cardio_report.pdf")
-
-        # Build PDF
-        from cardio_app.reports.pdf_report import PDFReportBuilder
-        pdf_builder = PDFReportBuilder(
-            metrics=metrics,
-            programs=programs,
-            username=client_name,
-            unit=unit,
-            ramp_df=ramp_df,
-            filename=output_path
-        )
-        pdf_builder.build_pdf()
-        pdf_builder.save_pdf()
-
-        if not os.path.exists(output_path):
+        if "history_session" not in session:
+            session["history_session"] = uuid.uuid4().hex
+        record_history(client_name, unit, ramp_data, wingate_data, trainings, threshold_method,
+                       session_id=session["history_session"])
+
+        download_name = report_filename(client_name)
+        key = report_key(client_name, unit, ramp_data, wingate_data, trainings, threshold_method)
+
+        if _flag_requested("async", "CARDIO_ASYNC_REPORTS"):
+            try:
+                job_id = get_job_queue().submit(stored_report, client_name, unit, ramp_data,
+                                                wingate_data, trainings, key, threshold_method,
+                                                filename=download_name, store_key=key)
+            except QueueFull as e:
+                response = jsonify({"error": str(e)})
+                response.headers["Retry-After"] = "5"
+                return response, 503
+            return jsonify({
+                "job_id": job_id,
+                "status_url": url_for("routes.job_status", job_id=job_id),
+                "download_url": url_for("routes.job_download", job_id=job_id),
+            }), 202
+
+        # Build PDF entirely in memory, or serve it from the report store;
+        # send_file hands the body to the server in chunks
+        with timed("generate"):
+            pdf_bytes = stored_report(client_name, unit, ramp_data, wingate_data, trainings, key=key,
+                                      threshold_method=threshold_method)
+
+        if not pdf_bytes:
             return render_template("error.html", message="PDF was not created."), 500
 
-        return send_file(output_path, as_attachment=True)
+        return _send_report(pdf_bytes, key, download_name)
 
     except Exception as e:
+        incr("errors", stage="generate_route")
         return render_template("error.html", message=f"Unhandled error in /generate: {e}"), 500
 
 
+def _send_report(pdf_bytes, key, download_name):
+    """PDF download tagged with its content key; /reports/<key> serves it again"""
+    response = send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True,
+                         download_name=download_name, etag=key)
+    response.headers["Content-Location"] = url_for("routes.report_download", key=key)
+    return response
+
+
+def _flag_requested(param, env_var):
+    """True if the request parameter (or, failing that, the env var) is set"""
+    flag = request.values.get(param, os.environ.get(env_var, "0"))
+    return flag.lower() in ("1", "true", "yes")
+
+
+@bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """Report the state of a queued report job"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    return jsonify(status)
+
+
+@bp.route("/jobs/<job_id>/download", methods=["GET"])
+def job_download(job_id):
+    """Download the PDF of a finished report job"""
+    status = get_job_queue().status(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    if status["status"] == "failed":
+        return jsonify({"error": status["error"]}), 500
+    if status["status"] != "done":
+        return jsonify(status), 202
+
+    pdf_bytes, download_name = get_job_queue().result(job_id)
+    return send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True,
+                     download_name=download_name)
+
+
+@bp.route("/reports/<key>", methods=["GET"])
+def report_download(key):
+    """
+    Download a stored report again. The key is a hash of the report's
+    inputs, so a client already holding that ETag gets 304 without a lookup.
+    """
+    if not re.fullmatch(r"[0-9a-f]{64}", key):
+        return jsonify({"error": "Unknown report."}), 404
+    if key in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(key)
+        return response
+    pdf_bytes = report_store.get(key)
+    if pdf_bytes is None:
+        return jsonify({"error": "Unknown or expired report."}), 404
+    return _send_report(pdf_bytes, key, report_store.filename(key) or report_filename("client"))
+
+
+@bp.route("/progress", methods=["GET"])
+def progress_report():
+    """Progress PDF charting every stored test of an athlete (needs CARDIO_HISTORY_DB)"""
+    client_name = request.args.get("client_name") or session.get("client_name", "")
+    unit = (request.args.get("unit") or session.get("unit", "mph")).lower()
+    try:
+        pdf_bytes = render_progress_report(client_name, unit)
+    except Exception as e:
+        incr("errors", stage="progress_route")
+        return render_template("error.html", message=f"Unhandled error in /progress: {e}"), 500
+    if pdf_bytes is None:
+        return render_template("error.html", message=f"No test history for {client_name or 'this client'}."), 404
+    return send_file(BytesIO(pdf_bytes), mimetype="application/pdf", as_attachment=True,
+                     download_name=progress_report_filename(client_name))
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-process stage timings and counters in Prometheus text format"""
+    if not metrics_enabled():
+        return Response("Instrumentation is disabled (set CARDIO_METRICS=1).\n", status=404, mimetype="text/plain")
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
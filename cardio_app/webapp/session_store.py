@@ -0,0 +1,191 @@
+# cardio_app/webapp/session_store.py
+"""
+Server-side Flask sessions.
+
+The cookie only carries a random session id; the session data lives in a
+pluggable backend with TTL expiry:
+
+    sqlite  a SQLite file shared by every worker on the host (default)
+    memory  bounded in-process LRU; opt-in for one worker or development,
+            sessions are lost on restart
+    cookie  Flask's signed-cookie sessions, unchanged
+
+Configured with CARDIO_SESSION_BACKEND, CARDIO_SESSION_TTL (seconds),
+CARDIO_SESSION_MAX_ENTRIES (memory) and CARDIO_SESSION_DB (sqlite; a file
+in the system temp directory by default).
+"""
+
+import os
+import secrets
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SESSION_BACKENDS = ("sqlite", "memory", "cookie")
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(session):
+            session.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class MemorySessionBackend:
+    """Serialized sessions in a bounded LRU; the oldest session is evicted first"""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sid -> (expires_at, payload)
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return entry[1]
+
+    def store(self, sid, payload, ttl):
+        with self._lock:
+            self._entries[sid] = (time.time() + ttl, payload)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for sid in [sid for sid, (expires, _) in self._entries.items() if expires <= now]:
+                del self._entries[sid]
+
+
+class SQLiteSessionBackend:
+    """Sessions in a SQLite file, so several worker processes share them"""
+
+    # Expired rows are swept on every Nth write rather than on every request
+    PURGE_EVERY = 100
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions "
+                         "(sid TEXT PRIMARY KEY, expires REAL NOT NULL, data TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires > ?", (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def store(self, sid, payload, ttl):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (sid, expires, data) VALUES (?, ?, ?)",
+                         (sid, time.time() + ttl, payload))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, sid):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge_expired(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
+
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            payload = self.backend.load(sid)
+            if payload is not None:
+                try:
+                    return ServerSideSession(self.serializer.loads(payload), sid=sid)
+                except ValueError:
+                    self.backend.delete(sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        # Emptied session: drop the server copy and the cookie
+        if not session:
+            if session.modified and not session.new:
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+                response.vary.add("Cookie")
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.backend.store(session.sid, self.serializer.dumps(dict(session)), self.ttl)
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=httponly, domain=domain, path=path, secure=secure,
+                            samesite=samesite)
+        response.vary.add("Cookie")
+
+
+def create_session_interface(backend=None):
+    """
+    Return the session interface selected by backend (or
+    CARDIO_SESSION_BACKEND), or None to keep Flask's cookie sessions.
+    """
+    backend = (backend or os.environ.get("CARDIO_SESSION_BACKEND", "sqlite")).lower()
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"CARDIO_SESSION_BACKEND must be one of {SESSION_BACKENDS}, got {backend!r}")
+    ttl = int(os.environ.get("CARDIO_SESSION_TTL", "3600"))
+
+    if backend == "cookie":
+        return None
+    if backend == "sqlite":
+        path = os.environ.get("CARDIO_SESSION_DB") or os.path.join(tempfile.gettempdir(),
+                                                                   "cardio_sessions.sqlite3")
+        return ServerSideSessionInterface(SQLiteSessionBackend(path), ttl=ttl)
+    max_entries = int(os.environ.get("CARDIO_SESSION_MAX_ENTRIES", "10000"))
+    return ServerSideSessionInterface(MemorySessionBackend(max_entries), ttl=ttl)